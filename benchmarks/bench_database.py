@@ -0,0 +1,233 @@
+import numpy as np
+
+from rball import ResponseDatabase
+from rball.point_location import PointLocator
+from rball.utils import GridGenerator
+from rball.utils.synthetic import synthetic_energies, synthetic_matrices
+
+from .common import (
+    get_database,
+    n_channels,
+    n_mc,
+    random_positions,
+    refinement_levels,
+)
+
+
+class Construction:
+    """
+    building a database from a stack of matrices
+    """
+
+    params = (refinement_levels, n_channels, n_mc, ["dense", "sparse"])
+    param_names = ["refinement", "channels", "mc", "storage_type"]
+
+    def setup(self, refinement, channels, mc, storage_type):
+
+        self.grid = GridGenerator(refinement_levels=refinement)
+
+        ebounds, mc_energies = synthetic_energies(channels, mc)
+
+        self.arguments = dict(
+            list_of_matrices=synthetic_matrices(
+                self.grid, ebounds, mc_energies, seed=1234
+            ),
+            theta=self.grid.theta,
+            phi=self.grid.phi,
+            ebounds=ebounds,
+            monte_carlo_energies=mc_energies,
+            storage_type=storage_type,
+        )
+
+        self.locator = PointLocator(self.grid.theta, self.grid.phi)
+
+    def time_construction(self, refinement, channels, mc, storage_type):
+
+        ResponseDatabase(locator=self.locator, **self.arguments)
+
+    def peakmem_construction(self, refinement, channels, mc, storage_type):
+
+        ResponseDatabase(locator=self.locator, **self.arguments)
+
+
+class Triangulation:
+    """
+    triangulating the grid and reading it from the cache
+    """
+
+    params = (refinement_levels,)
+    param_names = ["refinement"]
+
+    def setup(self, refinement):
+
+        self.grid = GridGenerator(refinement_levels=refinement)
+
+        # make sure the cache exists for the cached timing
+
+        PointLocator.from_cache(self.grid.theta, self.grid.phi)
+
+    def time_triangulation(self, refinement):
+
+        PointLocator(self.grid.theta, self.grid.phi)
+
+    def time_cached_triangulation(self, refinement):
+
+        PointLocator.from_cache(self.grid.theta, self.grid.phi)
+
+
+class Interpolation:
+    """
+    interpolating the response at one and at many positions
+    """
+
+    params = (refinement_levels, n_channels, n_mc)
+    param_names = ["refinement", "channels", "mc"]
+
+    def setup(self, refinement, channels, mc):
+
+        self.database = get_database(refinement, channels, mc)
+
+        self.ra, self.dec = random_positions(256)
+
+        self.out = np.empty((256,) + tuple(self.database.storage.matrix_shape))
+
+    def time_locate(self, refinement, channels, mc):
+
+        # neighbouring positions as in a sampler
+
+        for i in range(64):
+
+            self.database.locate(150.0 + 0.01 * i, 10.0)
+
+    def time_interpolate_to_position(self, refinement, channels, mc):
+
+        for i in range(64):
+
+            self.database.interpolate_to_position(150.0 + 0.01 * i, 10.0)
+
+    def time_interpolate_random_positions(self, refinement, channels, mc):
+
+        for i in range(64):
+
+            self.database.interpolate_to_position(self.ra[i], self.dec[i])
+
+    def time_interpolate_to_positions(self, refinement, channels, mc):
+
+        self.database.interpolate_to_positions(self.ra, self.dec, out=self.out)
+
+
+class Storage:
+    """
+    the storage types against each other at the size of the demo
+    database, e.g. the speed up of the sparse storage
+    """
+
+    params = (["dense", "sparse", "low_rank", "float32", "float16", "uint16"],)
+    param_names = ["storage"]
+
+    def setup(self, storage):
+
+        if storage in ("float32", "float16", "uint16"):
+
+            self.database = get_database(2, 128, 140, precision=storage)
+
+        else:
+
+            self.database = get_database(2, 128, 140, storage_type=storage)
+
+        self.ra, self.dec = random_positions(256)
+
+        self.out = np.empty((256,) + tuple(self.database.storage.matrix_shape))
+
+    def time_interpolate_to_position(self, storage):
+
+        for i in range(64):
+
+            self.database.interpolate_to_position(150.0 + 0.01 * i, 10.0)
+
+    def time_interpolate_to_positions(self, storage):
+
+        self.database.interpolate_to_positions(self.ra, self.dec, out=self.out)
+
+    def track_nbytes(self, storage):
+
+        return self.database.storage.nbytes
+
+    track_nbytes.unit = "bytes"
+
+
+class PixelCache:
+    """
+    the pre interpolated pixel cache against the triangulation
+    """
+
+    params = ([None, 5.0, 2.0], [False, True])
+    param_names = ["resolution", "refine"]
+
+    def setup(self, resolution, refine):
+
+        self.database = get_database(2, 128, 140)
+
+        if resolution is not None:
+
+            self.database.enable_pixel_cache(resolution, refine=refine)
+
+        self.ra, self.dec = random_positions(256)
+
+        self.out = np.empty((256,) + tuple(self.database.storage.matrix_shape))
+
+    def teardown(self, resolution, refine):
+
+        self.database.disable_pixel_cache()
+
+    def time_interpolate_random_positions(self, resolution, refine):
+
+        for i in range(64):
+
+            self.database.interpolate_to_position(self.ra[i], self.dec[i])
+
+    def time_interpolate_to_positions(self, resolution, refine):
+
+        self.database.interpolate_to_positions(self.ra, self.dec, out=self.out)
+
+    def track_nbytes(self, resolution, refine):
+
+        return self.database.stats()["memory"]["nbytes"]
+
+    track_nbytes.unit = "bytes"
+
+
+class BlockInterpolation:
+    """
+    blending only the active channels and an MC energy window
+    against the full matrix
+    """
+
+    params = (["dense", "sparse"], [1.0, 0.8, 0.5])
+    param_names = ["storage_type", "fraction"]
+
+    def setup(self, storage_type, fraction):
+
+        self.database = get_database(2, 128, 140, storage_type=storage_type)
+
+        self.handle = self.database.create_handle()
+
+        n_rows, n_columns = self.database.storage.matrix_shape
+
+        if fraction < 1.0:
+
+            # keep the middle of the channels and the MC bins
+
+            first = int(n_rows * (1 - fraction) / 2)
+
+            start = int(n_columns * (1 - fraction) / 2)
+
+            self.handle.restrict(
+                np.arange(first, n_rows - first), (start, n_columns - start)
+            )
+
+    def time_interpolate_to_position(self, storage_type, fraction):
+
+        for i in range(64):
+
+            self.handle.interpolate_to_position(150.0 + 0.01 * i, 10.0)
@@ -0,0 +1,14 @@
+class Import:
+    """
+    the time to import rball in a fresh interpreter, which is paid
+    by every worker process. threeML, astromodels and the plotting
+    libraries must stay out of it
+    """
+
+    def timeraw_import_rball(self):
+
+        return "import rball"
+
+    def timeraw_import_rball_like(self):
+
+        return "from rball import RBallLike"
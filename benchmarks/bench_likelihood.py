@@ -0,0 +1,123 @@
+import numpy as np
+from astromodels import Model, PointSource, Powerlaw
+from threeML.plugins.DispersionSpectrumLike import DispersionSpectrumLike
+
+from rball import RBallLike
+
+from .common import (
+    get_database,
+    n_channels,
+    n_mc,
+    random_positions,
+    refinement_levels,
+)
+
+
+def synthetic_plugin(database, ra: float = 150.0, dec: float = 10.0):
+    """
+    an RBallLike observing a power law at a position with the
+    response of a synthetic database
+    """
+
+    database.interpolate_to_position(ra, dec)
+
+    simulation = DispersionSpectrumLike.from_function(
+        "synthetic",
+        source_function=Powerlaw(K=10.0, index=-1.5, piv=100.0),
+        response=database.current_response,
+        background_function=Powerlaw(K=1.0, index=-1.0, piv=100.0),
+    )
+
+    plugin = RBallLike.from_spectrumlike(simulation, database)
+
+    model = Model(
+        PointSource("ps", ra, dec, spectral_shape=Powerlaw(K=10.0, piv=100.0))
+    )
+
+    plugin.set_model(model)
+
+    return plugin, model
+
+
+class Likelihood:
+    """
+    the model counts and the log likelihood of an RBallLike
+    while the position and the spectrum change as in a fit
+    """
+
+    params = (refinement_levels, n_channels, n_mc, [False, True])
+    param_names = ["refinement", "channels", "mc", "fold_then_blend"]
+
+    def setup(self, refinement, channels, mc, fold_then_blend):
+
+        database = get_database(refinement, channels, mc)
+
+        self.plugin, self.model = synthetic_plugin(database)
+
+        self.plugin.fold_then_blend = fold_then_blend
+
+        self.ps = self.model.ps
+
+    def time_get_model(self, refinement, channels, mc, fold_then_blend):
+
+        for i in range(32):
+
+            self.ps.position.ra.value = 150.0 + 0.01 * i
+
+            self.plugin.get_model()
+
+    def time_log_like(self, refinement, channels, mc, fold_then_blend):
+
+        spectrum = self.ps.spectrum.main.Powerlaw
+
+        for i in range(32):
+
+            self.ps.position.ra.value = 150.0 + 0.01 * i
+
+            spectrum.index.value = -1.5 - 0.01 * i
+
+            self.plugin.get_log_like()
+
+
+class BatchLikelihood:
+    """
+    the log likelihood of many parameter sets at once
+    """
+
+    params = (refinement_levels, [64, 512])
+    param_names = ["refinement", "n_samples"]
+
+    def setup(self, refinement, n_samples):
+
+        database = get_database(refinement, 128, 140)
+
+        self.plugin, self.model = synthetic_plugin(database)
+
+        ra, dec = random_positions(n_samples)
+
+        rows = {
+            "ps.position.ra": ra,
+            "ps.position.dec": dec,
+            "ps.spectrum.main.Powerlaw.K": np.full(n_samples, 10.0),
+            "ps.spectrum.main.Powerlaw.index": np.linspace(-2, -1, n_samples),
+        }
+
+        self.values = np.column_stack(
+            [rows[name] for name in self.model.free_parameters]
+        )
+
+    def time_log_like_batch(self, refinement, n_samples):
+
+        self.plugin.get_log_like_batch(self.values)
+
+    def time_log_like_loop(self, refinement, n_samples):
+
+        for row in self.values:
+
+            for parameter, value in zip(
+                self.model.free_parameters.values(), row
+            ):
+
+                parameter.value = value
+
+            self.plugin.get_log_like()
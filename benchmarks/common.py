@@ -0,0 +1,51 @@
+from functools import lru_cache
+from typing import Optional
+
+import numpy as np
+
+from rball.utils.synthetic import generate_synthetic_database
+
+# the sizes the suites are parameterised over. The largest stack
+# is 1922 x 128 x 280 float64 or ~550 MB
+
+refinement_levels = (1, 2, 3)
+n_channels = (32, 128)
+n_mc = (70, 280)
+
+
+@lru_cache(maxsize=4)
+def get_database(
+    refinement: int,
+    channels: int,
+    mc: int,
+    storage_type: str = "auto",
+    precision: Optional[str] = None,
+):
+    """
+    one synthetic database per size and storage. asv runs every
+    benchmark in a fresh process so this only saves the setup of
+    repeats
+    """
+
+    return generate_synthetic_database(
+        refinement_levels=refinement,
+        n_channels=channels,
+        n_mc=mc,
+        seed=1234,
+        storage_type=storage_type,
+        storage_options=dict(precision=precision) if precision else None,
+    )
+
+
+def random_positions(n: int, seed: int = 1234):
+    """
+    uniform positions on the sky in degree
+    """
+
+    rng = np.random.default_rng(seed)
+
+    ra = rng.uniform(0.0, 360.0, n)
+
+    dec = np.rad2deg(np.arcsin(rng.uniform(-1.0, 1.0, n)))
+
+    return ra, dec
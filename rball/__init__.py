@@ -3,9 +3,38 @@
 """Top-level package for rball."""
 
 from .response_database import ResponseDatabase
-from .rballlike import RBallLike
+from .response_handle import ResponseHandle
+from .multi_response_database import MultiResponseDatabase
 from .utils import GridGenerator
 
+# these need threeML and astromodels, which take seconds to import,
+# so they are only imported when they are first used
+
+_lazy_objects = {
+    "RBallLike": "rball.rballlike",
+    "InterpolatedResponse": "rball.interpolated_response",
+}
+
+
+def __getattr__(name: str):
+
+    if name in _lazy_objects:
+
+        from importlib import import_module
+
+        value = getattr(import_module(_lazy_objects[name]), name)
+
+        globals()[name] = value
+
+        return value
+
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+
+    return sorted(list(globals()) + list(_lazy_objects))
+
 
 __author__ = """J. Michael Burgess"""
 __email__ = "jburgess@mpe.mpg.de"
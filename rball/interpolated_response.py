@@ -0,0 +1,73 @@
+import numpy as np
+from threeML.utils.OGIP.response import InstrumentResponse
+
+from .utils.logging import setup_logger
+
+log = setup_logger(__name__)
+
+
+class InterpolatedResponse(InstrumentResponse):
+    def __init__(
+        self,
+        matrix: np.ndarray,
+        ebounds: np.ndarray,
+        monte_carlo_energies: np.ndarray,
+    ):
+        """
+        An InstrumentResponse that owns its matrix. The matrix is
+        checked once here and afterwards the interpolation writes
+        straight into it, so moving the response to a new position
+        neither validates nor copies nor swaps the matrix. The
+        transpose used when folding is a view of the same memory and
+        so always follows.
+
+        :param matrix: the initial (N ebounds, N mc) matrix, it is copied
+        :type matrix: np.ndarray
+        :param ebounds: the edges of the channels
+        :type ebounds: np.ndarray
+        :param monte_carlo_energies: the edges of the MC bins
+        :type monte_carlo_energies: np.ndarray
+        :returns:
+
+        """
+
+        super(InterpolatedResponse, self).__init__(
+            matrix=matrix,
+            ebounds=ebounds,
+            monte_carlo_energies=monte_carlo_energies,
+        )
+
+        # the parent copied the matrix into a new float array which
+        # now is the buffer. make sure it is C contiguous for the
+        # interpolation kernels
+
+        self._matrix = np.ascontiguousarray(self._matrix)
+
+        self._matrix_transpose = self._matrix.T
+
+    @property
+    def buffer(self) -> np.ndarray:
+        """
+        the matrix to write the interpolation to
+        """
+
+        return self._matrix
+
+    def replace_matrix(self, new_matrix: np.ndarray) -> None:
+        """
+        copy a matrix into the buffer. Anything holding the matrix
+        of this response sees the new values
+
+        :param new_matrix: a matrix of the same shape
+        :type new_matrix: np.ndarray
+        :returns:
+
+        """
+
+        if new_matrix.shape != self._matrix.shape:
+
+            log.error("matrix is not the right shape!")
+
+            raise RuntimeError()
+
+        np.copyto(self._matrix, new_matrix)
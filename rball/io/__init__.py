@@ -0,0 +1,3 @@
+from .hdf5 import read_response_database, write_response_database
+
+__all__ = ["read_response_database", "write_response_database"]
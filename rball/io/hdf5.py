@@ -0,0 +1,311 @@
+from pathlib import Path
+from typing import Any, Dict, Optional, Union
+
+import h5py
+import numpy as np
+
+from ..point_location import PointLocator, grid_hash
+from ..response_database import ResponseDatabase
+from ..storage import LazyMatrixStorage
+from ..utils.logging import setup_logger
+
+log = setup_logger(__name__)
+
+# the version of the on disk layout. It is written as an attribute
+# of the root group so that older files can be recognized later
+
+FORMAT_VERSION: int = 1
+
+_valid_compression = (None, "gzip", "lzf")
+
+
+def write_response_database(
+    response_database: ResponseDatabase,
+    file_name: Union[str, Path],
+    compression: Optional[str] = None,
+    compression_opts: Optional[int] = None,
+    shuffle: Optional[bool] = None,
+    overwrite: bool = False,
+) -> None:
+    """
+    write a response database to an HDF5 file.
+
+    The layout is:
+
+    * matrix: (N grid points, N ebounds, N mc) chunked per grid point
+    * theta, phi: the grid coordinates in radian
+    * ebounds, mc_energies: the energy edges of the matrices
+    * triangulation: the points, simplices and neighbours of the
+      grid triangulation with the hash of the grid as attribute
+    * the metadata of the database as attributes of the root group
+
+    Each grid point is its own chunk so that the three vertex
+    matrices needed for an interpolation can be read (and
+    decompressed) without touching the rest of the stack.
+
+    :param response_database: the database to write
+    :type response_database: ResponseDatabase
+    :param file_name: the name of the file
+    :type file_name: Union[str, Path]
+    :param compression: None, gzip or lzf
+    :type compression: Optional[str]
+    :param compression_opts: the gzip level (0-9)
+    :type compression_opts: Optional[int]
+    :param shuffle: apply the shuffle filter, defaults to True
+    when compressing
+    :type shuffle: Optional[bool]
+    :param overwrite: overwrite an existing file
+    :type overwrite: bool
+    :returns:
+
+    """
+
+    file_name: Path = Path(file_name)
+
+    if file_name.exists() and not overwrite:
+
+        log.error(f"{file_name} exists! set overwrite=True")
+
+        raise RuntimeError()
+
+    if compression not in _valid_compression:
+
+        log.error(
+            f"compression must be one of {_valid_compression} not {compression}"
+        )
+
+        raise RuntimeError()
+
+    if shuffle is None:
+
+        shuffle = compression is not None
+
+    # check the metadata before the file is created so that
+    # a bad value does not leave a half written file behind
+
+    metadata: Dict[str, Any] = _check_metadata(response_database.metadata)
+
+    storage = response_database.storage
+
+    shape = (storage.n_grid_points,) + tuple(storage.matrix_shape)
+
+    chunks = (1,) + shape[1:]
+
+    with h5py.File(file_name, "w") as f:
+
+        f.attrs["rball_format_version"] = FORMAT_VERSION
+
+        for k, v in metadata.items():
+
+            f.attrs[k] = v
+
+        dset = f.create_dataset(
+            "matrix",
+            shape=shape,
+            dtype=storage.dtype,
+            chunks=chunks,
+            compression=compression,
+            compression_opts=compression_opts,
+            shuffle=shuffle,
+        )
+
+        # go chunk by chunk so that databases which are
+        # not in memory are never fully read
+
+        for i in range(storage.n_grid_points):
+
+            dset[i] = storage.get_matrix(i)
+
+        f.create_dataset("theta", data=response_database.theta)
+        f.create_dataset("phi", data=response_database.phi)
+        f.create_dataset("ebounds", data=response_database.ebounds)
+        f.create_dataset(
+            "mc_energies", data=response_database.monte_carlo_energies
+        )
+
+        # store the triangulation so that it does not have
+        # to be built again when the file is read
+
+        locator = response_database.locator
+
+        grp = f.create_group("triangulation")
+
+        grp.attrs["grid_hash"] = locator.grid_hash
+
+        grp.create_dataset("points", data=locator.points)
+        grp.create_dataset("simplices", data=locator.simplices)
+        grp.create_dataset("neighbours", data=locator.neighbours)
+
+    log.debug(f"wrote response database to {file_name}")
+
+
+def read_response_database(
+    file_name: Union[str, Path],
+    lazy: bool = False,
+    max_resident: int = 64,
+    prefetch: bool = False,
+    storage_type: str = "auto",
+    storage_options: Optional[Dict[str, Any]] = None,
+) -> ResponseDatabase:
+    """
+    read a response database from an HDF5 file written
+    with write_response_database (or any file with the
+    matrix, theta, phi, ebounds and mc_energies datasets)
+
+    :param file_name: the name of the file
+    :type file_name: Union[str, Path]
+    :param lazy: keep the matrices on disk and only read
+    the vertices that are needed
+    :type lazy: bool
+    :param max_resident: the max number of vertex matrices
+    kept in memory when lazy
+    :type max_resident: int
+    :param prefetch: read the neighbours of the last simplex
+    in the background when lazy
+    :type prefetch: bool
+    :param storage_type: dense, sparse, low_rank or auto when not lazy
+    :type storage_type: str
+    :param storage_options: options of the storage, e.g. the
+    tolerance of the low rank storage
+    :type storage_options: Optional[Dict[str, Any]]
+    :returns: ResponseDatabase
+
+    """
+
+    with h5py.File(file_name, "r") as f:
+
+        metadata: Dict[str, Any] = {
+            k: _to_python(v)
+            for k, v in f.attrs.items()
+            if k != "rball_format_version"
+        }
+
+        if lazy:
+
+            list_of_matrices = LazyMatrixStorage.from_hdf5(
+                file_name,
+                dataset="matrix",
+                max_resident=max_resident,
+                prefetch=prefetch,
+            )
+
+        else:
+
+            dset = f["matrix"]
+
+            # read straight into the final array so that the
+            # stack only exists once in memory
+
+            list_of_matrices = np.empty(dset.shape, dtype=dset.dtype)
+
+            dset.read_direct(list_of_matrices)
+
+        theta = f["theta"][()]
+
+        phi = f["phi"][()]
+
+        ebounds = f["ebounds"][()]
+
+        mc_energies = f["mc_energies"][()]
+
+        locator = _read_locator(f, theta, phi)
+
+    log.debug(f"read response database from {file_name}")
+
+    return ResponseDatabase(
+        list_of_matrices=list_of_matrices,
+        theta=theta,
+        phi=phi,
+        ebounds=ebounds,
+        monte_carlo_energies=mc_energies,
+        metadata=metadata,
+        storage_type=storage_type,
+        storage_options=storage_options,
+        locator=locator,
+    )
+
+
+def _read_locator(
+    f: h5py.File, theta: np.ndarray, phi: np.ndarray
+) -> Optional[PointLocator]:
+    """
+    the point locator stored with the database if it
+    belongs to its grid
+    """
+
+    if "triangulation" not in f:
+
+        return None
+
+    grp = f["triangulation"]
+
+    if _to_python(grp.attrs.get("grid_hash")) != grid_hash(theta, phi):
+
+        log.warning("the stored triangulation is for a different grid")
+
+        return None
+
+    return PointLocator.from_arrays(
+        theta,
+        phi,
+        grp["points"][()],
+        grp["simplices"][()],
+        grp["neighbours"][()],
+    )
+
+
+def _check_metadata(metadata: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    the metadata that can be stored as HDF5 attributes. None
+    values are skipped, anything else that HDF5 can not store
+    is an error
+    """
+
+    checked: Dict[str, Any] = {}
+
+    # write into a file that only lives in memory to find out
+    # what h5py accepts
+
+    with h5py.File(
+        "rball_metadata_check", "w", driver="core", backing_store=False
+    ) as f:
+
+        for k, v in metadata.items():
+
+            if v is None:
+
+                log.warning(f"skipping the metadata {k} as it is None")
+
+                continue
+
+            try:
+
+                f.attrs[k] = v
+
+            except (TypeError, ValueError):
+
+                log.error(
+                    f"the metadata {k} of type {type(v)} can not be stored in HDF5"
+                )
+
+                raise RuntimeError()
+
+            checked[k] = v
+
+    return checked
+
+
+def _to_python(value):
+    """
+    h5py returns numpy scalars and bytes for attributes
+    """
+
+    if isinstance(value, bytes):
+
+        return value.decode()
+
+    if isinstance(value, np.generic):
+
+        return value.item()
+
+    return value
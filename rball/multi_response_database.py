@@ -0,0 +1,184 @@
+from typing import Any, Dict, Iterator, List, Optional, Type, Union
+
+import numpy as np
+
+from .point_location import PointLocator
+from .response_database import ResponseDatabase
+from .storage import MatrixStorage
+from .utils.logging import setup_logger
+
+log = setup_logger(__name__)
+
+
+class MultiResponseDatabase:
+    def __init__(
+        self,
+        matrices: Dict[str, Union[np.ndarray, MatrixStorage]],
+        theta: np.ndarray,
+        phi: np.ndarray,
+        ebounds: Union[np.ndarray, Dict[str, np.ndarray]],
+        monte_carlo_energies: Union[np.ndarray, Dict[str, np.ndarray]],
+        metadata: Optional[Dict[str, Any]] = None,
+        storage_type: str = "auto",
+        storage_options: Optional[Dict[str, Any]] = None,
+        database_class: Type[ResponseDatabase] = ResponseDatabase,
+        cache_triangulation: bool = True,
+    ):
+        """
+        The response databases of several detectors that were
+        simulated on the same grid. They share one triangulation
+        and one point locator, so a position is only searched for
+        once no matter how many detectors are interpolated to it.
+
+        Each detector can have its own ebounds and monte carlo
+        energies. The database of a single detector is accessed
+        with its name and can be handed to an RBallLike.
+
+        :param matrices: the matrix stack of each detector
+        :type matrices: Dict[str, Union[np.ndarray, MatrixStorage]]
+        :param theta: the lat of the grid points in radian
+        :type theta: np.ndarray
+        :param phi: the lon of the grid points in radian
+        :type phi: np.ndarray
+        :param ebounds: the ebounds of all or of each detector
+        :type ebounds: Union[np.ndarray, Dict[str, np.ndarray]]
+        :param monte_carlo_energies: the mc energies of all or of
+        each detector
+        :type monte_carlo_energies: Union[np.ndarray, Dict[str, np.ndarray]]
+        :param metadata: optional information about the databases
+        :type metadata: Optional[Dict[str, Any]]
+        :param storage_type: how to store the arrays of matrices
+        :type storage_type: str
+        :param storage_options: options of the storage
+        :type storage_options: Optional[Dict[str, Any]]
+        :param database_class: the ResponseDatabase (sub)class used
+        for each detector, e.g. one that transforms to the frame of
+        the instrument
+        :type database_class: Type[ResponseDatabase]
+        :param cache_triangulation: load the triangulation of the grid
+        from the cache in the user config directory
+        :type cache_triangulation: bool
+        :returns:
+
+        """
+
+        if len(matrices) == 0:
+
+            log.error("no detectors were given")
+
+            raise AssertionError()
+
+        if cache_triangulation:
+
+            self._locator: PointLocator = PointLocator.from_cache(
+                theta=theta, phi=phi
+            )
+
+        else:
+
+            self._locator: PointLocator = PointLocator(theta=theta, phi=phi)
+
+        self._databases: Dict[str, ResponseDatabase] = {}
+
+        for name, list_of_matrices in matrices.items():
+
+            log.debug(f"creating the database of {name}")
+
+            self._databases[name] = database_class(
+                list_of_matrices=list_of_matrices,
+                theta=theta,
+                phi=phi,
+                ebounds=_for_detector(ebounds, name),
+                monte_carlo_energies=_for_detector(monte_carlo_energies, name),
+                metadata=metadata,
+                storage_type=storage_type,
+                storage_options=storage_options,
+                locator=self._locator,
+            )
+
+    @property
+    def detectors(self) -> List[str]:
+
+        return list(self._databases.keys())
+
+    @property
+    def locator(self) -> PointLocator:
+        """
+        the point locator shared by all detectors
+        """
+        return self._locator
+
+    def __getitem__(self, name: str) -> ResponseDatabase:
+
+        return self._databases[name]
+
+    def __iter__(self) -> Iterator[str]:
+
+        return iter(self._databases)
+
+    def __len__(self) -> int:
+
+        return len(self._databases)
+
+    def interpolate_to_position(self, ra: float, dec: float) -> None:
+        """
+        interpolate the responses of all detectors to a position
+
+        :param ra: the RA in degree
+        :type ra: float
+        :param dec: the Dec in degree
+        :type dec: float
+        :returns:
+
+        """
+
+        # the first one searches, the others reuse the simplex
+
+        for database in self._databases.values():
+
+            database.interpolate_to_position(ra, dec)
+
+    def interpolate_to_positions(
+        self, ra: np.ndarray, dec: np.ndarray
+    ) -> Dict[str, np.ndarray]:
+        """
+        interpolate the responses of all detectors to many
+        positions with a single search
+
+        :param ra: the RAs in degree
+        :type ra: np.ndarray
+        :param dec: the Decs in degree
+        :type dec: np.ndarray
+        :returns: the (N, N ebounds, N mc) stack of each detector
+
+        """
+
+        ra = np.atleast_1d(np.asarray(ra, dtype=float))
+        dec = np.atleast_1d(np.asarray(dec, dtype=float))
+
+        first = next(iter(self._databases.values()))
+
+        theta, phi = first._transform_to_instrument_coordinates(ra, dec)
+
+        bbc, tri = self._locator.locate_many(theta, phi)
+
+        out = {}
+
+        for name, database in self._databases.items():
+
+            stack = np.empty(
+                (ra.shape[0],) + tuple(database.storage.matrix_shape)
+            )
+
+            out[name] = database.storage.interpolate_many(bbc, tri, stack)
+
+        return out
+
+
+def _for_detector(value: Union[np.ndarray, Dict[str, np.ndarray]], name: str):
+
+    if isinstance(value, dict):
+
+        return value[name]
+
+    return value
@@ -0,0 +1,147 @@
+"""
+Plotting of the grids of response databases. The plotting libraries
+(matplotlib, ipyvolume and pythreejs) are only imported when a plot
+is made, install them with the plotting extra: pip install rball[plotting]
+"""
+
+from typing import TYPE_CHECKING, Iterable, Optional
+
+import numpy as np
+
+from .point_location import lonlat2xyz
+
+if TYPE_CHECKING:
+
+    from .response_database import ResponseDatabase
+
+
+def plot_verticies(response_database: "ResponseDatabase"):
+    """
+    plot the grid points and the edges of the
+    triangulation of a database in 3D
+
+    :param response_database: the database
+    :type response_database: ResponseDatabase
+    :returns: the matplotlib figure
+
+    """
+
+    import matplotlib.pyplot as plt
+    from mpl_toolkits.mplot3d import Axes3D
+
+    fig, ax = plt.subplots(subplot_kw=dict(projection="3d"))
+
+    points = response_database.locator.points
+    segs = response_database.locator.segments
+
+    ax.scatter(points[:, 0], points[:, 1], points[:, 2], color="k", alpha=0.1)
+
+    # plot the verticies
+
+    for s1, s2 in segs:
+
+        ax.plot(
+            [points[s1, 0], points[s2, 0]],
+            [points[s1, 1], points[s2, 1]],
+            [points[s1, 2], points[s2, 2]],
+            color="grey",
+            alpha=0.5,
+        )
+
+    xyzlim = np.array([ax.get_xlim3d(), ax.get_ylim3d(), ax.get_zlim3d()]).T
+    XYZlim = [min(xyzlim[0]), max(xyzlim[1])]
+    ax.set_xlim3d(XYZlim)
+    ax.set_ylim3d(XYZlim)
+    ax.set_zlim3d(XYZlim)
+    ax.set_box_aspect(
+        [ub - lb for lb, ub in (getattr(ax, f"get_{a}lim")() for a in "xyz")]
+    )
+
+    return fig
+
+
+def plot_verticies_ipv(
+    response_database: "ResponseDatabase",
+    selected_location: Optional[Iterable[float]] = None,
+) -> None:
+    """
+    show the grid points and the edges of the triangulation
+    of a database with ipyvolume
+
+    :param response_database: the database
+    :type response_database: ResponseDatabase
+    :param selected_location: ra, dec tuple in degree
+
+    """
+
+    import ipyvolume as ipv
+    import pythreejs
+
+    background_color = "#2E0E49"
+    grid_color = "#FDFF8D"
+    grid_color2 = "#FDFEAE"
+    selected_color = "#FF6563"
+    point_color = "#63FFA3"
+
+    fig = ipv.figure(width=800, height=600)
+    ipv.pylab.style.box_off()
+    # ipv.pylab.style.axes_off()
+    ipv.pylab.style.set_style_dark()
+    ipv.pylab.style.background_color(background_color)
+
+    points = response_database.locator.points
+    segs = response_database.locator.segments
+
+    scatter = ipv.pylab.scatter(
+        points[:, 0],
+        points[:, 1],
+        points[:, 2],
+        color=grid_color,
+        alpha=1,
+        size=1,
+        color_selected="red",
+        marker="sphere",
+    )
+
+    # scatter.selected = tri[0]
+
+    for s1, s2 in segs:
+        ipv.plot(
+            [points[s1, 0], points[s2, 0]],
+            [points[s1, 1], points[s2, 1]],
+            [points[s1, 2], points[s2, 2]],
+            color=grid_color2,
+            alpha=0.5,
+        )
+
+    if selected_location is not None:
+
+        theta, phi = response_database._transform_to_instrument_coordinates(
+            *selected_location
+        )
+
+        this_point = lonlat2xyz(phi, theta)
+
+        bbc, tri = response_database.locator.locate(theta, phi)
+
+        ipv.scatter(
+            points[tri, 0],
+            points[tri, 1],
+            points[tri, 2],
+            color=selected_color,
+            marker="sphere",
+        )
+
+        ipv.pylab.scatter(*this_point, color=point_color, marker="sphere")
+
+    ipv.xyzlim(1.1)
+    ipv.pylab.style.box_off()
+
+    fig.camera.up = [0, 0, 1]
+    control = pythreejs.OrbitControls(controlling=fig.camera)
+    fig.controls = control
+    control.autoRotate = True
+    fig.render_continuous = True
+
+    ipv.show()
+
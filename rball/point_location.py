@@ -0,0 +1,972 @@
+import hashlib
+import os
+from pathlib import Path
+from typing import Dict, Optional, Tuple, Union
+
+import numba as nb
+import numpy as np
+
+from .utils.logging import setup_logger
+from .utils.package_data import get_path_of_triangulation_cache
+
+log = setup_logger(__name__)
+
+# the version of the layout of the cached triangulations. Caches of
+# another version (e.g. other simplex orientation) are rebuilt
+
+CACHE_VERSION: int = 1
+
+
+def lonlat2xyz(lon, lat) -> np.ndarray:
+    """
+    convert lon, lat in radian to points on the unit sphere
+
+    :param lon: the lon(s) in radian
+    :param lat: the lat(s) in radian
+    :returns: (..., 3) array of xyz
+
+    """
+
+    lon = np.asarray(lon, dtype=float)
+    lat = np.asarray(lat, dtype=float)
+
+    cos_lat = np.cos(lat)
+
+    return np.stack(
+        [cos_lat * np.cos(lon), cos_lat * np.sin(lon), np.sin(lat)], axis=-1
+    )
+
+
+def grid_hash(theta: np.ndarray, phi: np.ndarray) -> str:
+    """
+    a hash of the grid coordinates which identifies
+    its triangulation
+
+    :param theta: the lat of the grid points in radian
+    :type theta: np.ndarray
+    :param phi: the lon of the grid points in radian
+    :type phi: np.ndarray
+    :returns:
+
+    """
+
+    h = hashlib.sha1()
+
+    for x in (theta, phi):
+
+        h.update(np.ascontiguousarray(x, dtype=np.float64).tobytes())
+
+    return h.hexdigest()
+
+
+class PointLocator:
+    def __init__(
+        self,
+        theta: np.ndarray,
+        phi: np.ndarray,
+        warm_start: bool = True,
+        max_walk_steps: Optional[int] = None,
+    ):
+        """
+        Finds the simplex of the grid triangulation that contains a
+        point and the normalized barycentric weights of its vertices.
+
+        The triangulation is only built (with stripy) when the
+        locator is created. After that it is kept as plain arrays of
+        the vertices, the simplices and their neighbours and all
+        searches run in compiled code without the GIL, so a locator
+        is cheap to pickle to worker processes.
+
+        Consecutive positions of a sampler are close to each other,
+        so with warm_start the search walks across the triangles
+        starting from the last simplex that was found. Otherwise, or
+        if the walk does not arrive within max_walk_steps, it walks
+        from a triangle close to the point, which is looked up in a
+        coarse index of equal area cells on the sphere.
+
+        The result of the last single point query is remembered so
+        that several databases sharing one locator only search once
+        per position.
+
+        :param theta: the lat of the grid points in radian
+        :type theta: np.ndarray
+        :param phi: the lon of the grid points in radian
+        :type phi: np.ndarray
+        :param warm_start: walk from the last simplex
+        :type warm_start: bool
+        :param max_walk_steps: the max number of triangles visited,
+        by default a few times the triangles across the grid
+        :type max_walk_steps: Optional[int]
+        :returns:
+
+        """
+
+        log.debug("generating the triangulation")
+
+        points, simplices = _triangulate(theta, phi)
+
+        self._setup(
+            theta,
+            phi,
+            points,
+            simplices,
+            _find_neighbours(points, simplices),
+            warm_start,
+            max_walk_steps,
+        )
+
+    @classmethod
+    def from_arrays(
+        cls,
+        theta: np.ndarray,
+        phi: np.ndarray,
+        points: np.ndarray,
+        simplices: np.ndarray,
+        neighbours: np.ndarray,
+        warm_start: bool = True,
+        max_walk_steps: Optional[int] = None,
+    ) -> "PointLocator":
+        """
+        create the locator from an already exported triangulation
+        without building it again
+
+        :param theta: the lat of the grid points in radian
+        :type theta: np.ndarray
+        :param phi: the lon of the grid points in radian
+        :type phi: np.ndarray
+        :param points: (N, 3) xyz of the grid points
+        :type points: np.ndarray
+        :param simplices: (M, 3) counter clockwise vertex indices
+        :type simplices: np.ndarray
+        :param neighbours: (M, 3) the simplex opposite each vertex
+        :type neighbours: np.ndarray
+        :returns:
+
+        """
+
+        locator = cls.__new__(cls)
+
+        locator._setup(
+            theta,
+            phi,
+            points,
+            simplices,
+            neighbours,
+            warm_start,
+            max_walk_steps,
+        )
+
+        return locator
+
+    @classmethod
+    def from_cache(
+        cls,
+        theta: np.ndarray,
+        phi: np.ndarray,
+        cache_dir: Optional[Union[str, Path]] = None,
+        warm_start: bool = True,
+        max_walk_steps: Optional[int] = None,
+    ) -> "PointLocator":
+        """
+        load the triangulation of the grid from the cache or build
+        and store it there when it is not cached yet. The files are
+        named by the hash of the grid coordinates.
+
+        :param theta: the lat of the grid points in radian
+        :type theta: np.ndarray
+        :param phi: the lon of the grid points in radian
+        :type phi: np.ndarray
+        :param cache_dir: the cache directory, by default
+        triangulations/ in the user config directory
+        :type cache_dir: Optional[Union[str, Path]]
+        :returns:
+
+        """
+
+        if cache_dir is None:
+
+            cache_dir = get_path_of_triangulation_cache()
+
+        expected_hash: str = grid_hash(theta, phi)
+
+        file_name: Path = Path(cache_dir) / f"{expected_hash}.npz"
+
+        if file_name.exists():
+
+            arrays = _read_cache(file_name, expected_hash)
+
+            if arrays is not None:
+
+                log.debug(f"loaded the triangulation from {file_name}")
+
+                return cls.from_arrays(
+                    theta,
+                    phi,
+                    *arrays,
+                    warm_start=warm_start,
+                    max_walk_steps=max_walk_steps,
+                )
+
+            log.warning(
+                f"ignoring the broken or outdated triangulation cache {file_name}"
+            )
+
+        locator = cls(
+            theta, phi, warm_start=warm_start, max_walk_steps=max_walk_steps
+        )
+
+        try:
+
+            locator.save(file_name)
+
+        except OSError:
+
+            log.warning(f"could not cache the triangulation in {file_name}")
+
+        return locator
+
+    def save(self, file_name: Union[str, Path]) -> None:
+        """
+        save the triangulation arrays to a .npz file. The file is
+        written next to its destination and then moved there so
+        that processes reading it never see a partial file
+
+        :param file_name: the name of the file
+        :type file_name: Union[str, Path]
+        :returns:
+
+        """
+
+        file_name: Path = Path(file_name)
+
+        tmp_name: Path = file_name.with_name(
+            f".{file_name.stem}.{os.getpid()}.npz"
+        )
+
+        np.savez(
+            tmp_name,
+            version=CACHE_VERSION,
+            grid_hash=self.grid_hash,
+            points=self._points,
+            simplices=self._simplices,
+            neighbours=self._neighbours,
+        )
+
+        os.replace(tmp_name, file_name)
+
+        log.debug(f"saved the triangulation to {file_name}")
+
+    def _setup(
+        self,
+        theta: np.ndarray,
+        phi: np.ndarray,
+        points: np.ndarray,
+        simplices: np.ndarray,
+        neighbours: np.ndarray,
+        warm_start: bool,
+        max_walk_steps: Optional[int],
+    ) -> None:
+
+        self._theta: np.ndarray = theta
+        self._phi: np.ndarray = phi
+
+        self._points: np.ndarray = np.ascontiguousarray(points, dtype=float)
+        self._simplices: np.ndarray = np.ascontiguousarray(
+            simplices, dtype=np.int64
+        )
+        self._neighbours: np.ndarray = np.ascontiguousarray(
+            neighbours, dtype=np.int64
+        )
+
+        # one simplex of each vertex and from those one for each
+        # cell of the coarse index to start walking from
+
+        vertex_simplices = np.zeros(self._points.shape[0], dtype=np.int64)
+
+        vertex_simplices[self._simplices.ravel()] = np.repeat(
+            np.arange(self._simplices.shape[0]), 3
+        )
+
+        self._cell_simplices: np.ndarray = _build_cell_index(
+            self._points, vertex_simplices
+        )
+
+        self._warm_start: bool = warm_start
+
+        if max_walk_steps is None:
+
+            max_walk_steps = int(4 * np.sqrt(self._simplices.shape[0]))
+
+        self._max_walk_steps: int = max_walk_steps
+
+        self._triangulation = None
+
+        self._last = None
+
+        self._last_simplex: int = 0
+
+        self._n_queries: int = 0
+        self._n_fallbacks: int = 0
+        self._walk_lengths: np.ndarray = np.zeros(
+            max_walk_steps + 1, dtype=np.int64
+        )
+
+    def __getstate__(self):
+
+        state = self.__dict__.copy()
+
+        # the stripy object is rebuilt on demand
+
+        state["_triangulation"] = None
+
+        state["_last"] = None
+
+        return state
+
+    @property
+    def triangulation(self):
+        """
+        a stripy triangulation of the grid. This is only
+        needed for plotting and is built on first access
+        """
+
+        if self._triangulation is None:
+
+            import stripy
+
+            self._triangulation = stripy.spherical.sTriangulation(
+                lons=self._phi, lats=self._theta, permute=True, tree=True
+            )
+
+        return self._triangulation
+
+    @property
+    def points(self) -> np.ndarray:
+        """
+        (N, 3) xyz of the grid points
+        """
+        return self._points
+
+    @property
+    def simplices(self) -> np.ndarray:
+        """
+        (M, 3) vertex indices of the simplices in
+        counter clockwise order
+        """
+        return self._simplices
+
+    @property
+    def neighbours(self) -> np.ndarray:
+        """
+        (M, 3) the simplex sharing the edge opposite
+        of each vertex
+        """
+        return self._neighbours
+
+    @property
+    def segments(self) -> np.ndarray:
+        """
+        (K, 2) the unique edges of the triangulation
+        """
+
+        edges = np.sort(
+            self._simplices[:, [0, 1, 1, 2, 2, 0]].reshape(-1, 2), axis=1
+        )
+
+        return np.unique(edges, axis=0)
+
+    @property
+    def n_grid_points(self) -> int:
+
+        return self._theta.shape[0]
+
+    @property
+    def grid_hash(self) -> str:
+        """
+        the hash of the grid coordinates
+        """
+        return grid_hash(self._theta, self._phi)
+
+    @property
+    def walk_statistics(self) -> Dict[str, float]:
+        """
+        the number of queries, how many could not be walked to
+        from the previous simplex and the distribution of the
+        number of triangles walked over
+        """
+
+        steps = np.arange(self._walk_lengths.shape[0])
+
+        n_walks = self._walk_lengths.sum()
+
+        return dict(
+            n_queries=self._n_queries,
+            n_fallbacks=self._n_fallbacks,
+            mean_walk_length=float(
+                (steps * self._walk_lengths).sum() / max(n_walks, 1)
+            ),
+            max_walk_length=int(
+                steps[self._walk_lengths > 0].max() if n_walks > 0 else 0
+            ),
+            walk_length_histogram=self._walk_lengths.tolist(),
+        )
+
+    def reset_statistics(self) -> None:
+
+        self._n_queries = 0
+        self._n_fallbacks = 0
+        self._walk_lengths[:] = 0
+
+    def locate(self, lon: float, lat: float) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        find the simplex containing a single point
+
+        :param lon: the lon of the point in radian
+        :type lon: float
+        :param lat: the lat of the point in radian
+        :type lat: float
+        :returns: (weights, vertex indices)
+
+        """
+
+        key = (float(lon), float(lat))
+
+        # read once so that another thread can not swap it in between
+
+        last = self._last
+
+        if last is not None and last[0] == key:
+
+            return last[1]
+
+        self._n_queries += 1
+
+        weights = np.empty(3)
+
+        simplex, steps = locate_point(
+            key[0],
+            key[1],
+            self._points,
+            self._simplices,
+            self._neighbours,
+            self._cell_simplices,
+            self._last_simplex if self._warm_start else -1,
+            self._max_walk_steps,
+            weights,
+        )
+
+        if steps >= 0:
+
+            self._walk_lengths[steps] += 1
+
+        else:
+
+            self._n_fallbacks += 1
+
+        self._last_simplex = simplex
+
+        result = (weights, self._simplices[simplex])
+
+        self._last = (key, result)
+
+        return result
+
+    def locate_with_gradient(
+        self, lon: float, lat: float
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        find the simplex containing a single point and the
+        derivatives of its barycentric weights. Inside a simplex
+        the weights are w_i = (p . n_i) / (p . N) with the normals
+        n_i of the planes through the origin and the opposite edges
+        and N their sum, so the derivatives are closed form.
+
+        :param lon: the lon of the point in radian
+        :type lon: float
+        :param lat: the lat of the point in radian
+        :type lat: float
+        :returns: (weights, vertex indices, (3, 2) derivatives of
+        the weights with respect to lon and lat)
+
+        """
+
+        weights, vertices = self.locate(lon, lat)
+
+        gradients = np.empty((3, 2))
+
+        _weight_gradients(
+            float(lon), float(lat), self._points, vertices, gradients
+        )
+
+        return weights, vertices, gradients
+
+    def locate_many(
+        self, lon: np.ndarray, lat: np.ndarray
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        find the simplices containing many points. Each point
+        is walked to from the simplex of the one before
+
+        :param lon: the lons of the points in radian
+        :type lon: np.ndarray
+        :param lat: the lats of the points in radian
+        :type lat: np.ndarray
+        :returns: (N, 3) weights and (N, 3) vertex indices
+
+        """
+
+        lon = np.ascontiguousarray(np.atleast_1d(lon), dtype=float)
+        lat = np.ascontiguousarray(np.atleast_1d(lat), dtype=float)
+
+        weights = np.empty((lon.shape[0], 3))
+
+        found, walked = _locate_many(
+            lon,
+            lat,
+            self._points,
+            self._simplices,
+            self._neighbours,
+            self._cell_simplices,
+            self._last_simplex if self._warm_start else -1,
+            self._max_walk_steps,
+            self._warm_start,
+            weights,
+        )
+
+        self._n_queries += lon.shape[0]
+
+        self._n_fallbacks += int((walked < 0).sum())
+
+        np.add.at(self._walk_lengths, walked[walked >= 0], 1)
+
+        return weights, self._simplices[found]
+
+
+def _read_cache(
+    file_name: Path, expected_hash: str
+) -> Optional[Tuple[np.ndarray, np.ndarray, np.ndarray]]:
+    """
+    the points, simplices and neighbours of a cached triangulation
+    or None if the file can not be read or is for another version
+    or grid
+    """
+
+    try:
+
+        with np.load(file_name) as f:
+
+            if int(f["version"]) != CACHE_VERSION:
+
+                return None
+
+            if str(f["grid_hash"]) != expected_hash:
+
+                return None
+
+            return f["points"], f["simplices"], f["neighbours"]
+
+    except Exception:
+
+        # a partial or otherwise broken file can raise about
+        # anything from the zip or the npy layer
+
+        return None
+
+
+def _triangulate(
+    theta: np.ndarray, phi: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    build the spherical delaunay triangulation of the grid and
+    export it as points and counter clockwise simplices
+    """
+
+    import stripy
+
+    triangulation = stripy.spherical.sTriangulation(
+        lons=phi, lats=theta, permute=True
+    )
+
+    points = np.ascontiguousarray(triangulation.points)
+
+    simplices = np.array(triangulation.simplices, dtype=np.int64)
+
+    orientation = np.einsum(
+        "ij,ij->i",
+        points[simplices[:, 0]],
+        np.cross(points[simplices[:, 1]], points[simplices[:, 2]]),
+    )
+
+    flip = orientation < 0
+
+    simplices[flip] = simplices[flip][:, [0, 2, 1]]
+
+    return points, simplices
+
+
+def _build_cell_index(
+    points: np.ndarray, vertex_simplices: np.ndarray
+) -> np.ndarray:
+    """
+    split the sphere into cells of equal area (equal steps in z
+    and in lon) with a few grid points each and store a simplex
+    of a vertex in or close to each cell to start walking from
+    """
+
+    n_z = max(1, int(np.sqrt(points.shape[0] / 8)))
+    n_lon = 2 * n_z
+
+    iz, il = _cell_of(points[:, 0], points[:, 1], points[:, 2], n_z, n_lon)
+
+    cells = np.full((n_z, n_lon), -1, dtype=np.int64)
+
+    cells[iz, il] = vertex_simplices
+
+    # give empty cells the simplex of the closest filled
+    # cell of their ring
+
+    j = np.arange(n_lon)
+
+    for ring in cells:
+
+        filled = np.flatnonzero(ring >= 0)
+
+        if filled.shape[0] == 0:
+
+            continue
+
+        distance = np.abs(j[:, None] - filled[None, :])
+
+        distance = np.minimum(distance, n_lon - distance)
+
+        ring[:] = ring[filled[distance.argmin(axis=1)]]
+
+    # and rings without any vertex that of the closest ring
+
+    filled = np.flatnonzero(cells[:, 0] >= 0)
+
+    for r in np.flatnonzero(cells[:, 0] < 0):
+
+        cells[r] = cells[filled[np.abs(filled - r).argmin()]]
+
+    return cells
+
+
+@nb.njit(cache=True, nogil=True)
+def _cell_of(x, y, z, n_z: int, n_lon: int):
+    """
+    the ring and lon index of the cell of points on the sphere
+    """
+
+    iz = np.minimum((0.5 * (z + 1.0) * n_z).astype(np.int64), n_z - 1)
+    iz = np.maximum(iz, 0)
+
+    il = (0.5 * (np.arctan2(y, x) / np.pi + 1.0) * n_lon).astype(np.int64)
+    il = np.minimum(np.maximum(il, 0), n_lon - 1)
+
+    return iz, il
+
+
+def _find_neighbours(points: np.ndarray, simplices: np.ndarray) -> np.ndarray:
+    """
+    match the edges of the triangles. The edge opposite
+    of vertex k is made of the other two vertices and is
+    shared with the neighbour in reversed order
+    """
+
+    n_simplices = simplices.shape[0]
+
+    edges = np.stack(
+        [simplices[:, [1, 2]], simplices[:, [2, 0]], simplices[:, [0, 1]]],
+        axis=1,
+    ).reshape(-1, 2)
+
+    n = np.int64(points.shape[0])
+
+    forward = edges[:, 0] * n + edges[:, 1]
+    backward = edges[:, 1] * n + edges[:, 0]
+
+    order = np.argsort(forward)
+
+    match = np.searchsorted(forward[order], backward)
+
+    match = np.minimum(match, forward.shape[0] - 1)
+
+    found = forward[order][match] == backward
+
+    neighbours = np.full(n_simplices * 3, -1, dtype=np.int64)
+
+    neighbours[found] = order[match[found]] // 3
+
+    return neighbours.reshape(n_simplices, 3)
+
+
+@nb.njit(cache=True, nogil=True)
+def locate_point(
+    lon: float,
+    lat: float,
+    points: np.ndarray,
+    simplices: np.ndarray,
+    neighbours: np.ndarray,
+    cell_simplices: np.ndarray,
+    start: int,
+    max_steps: int,
+    weights: np.ndarray,
+) -> Tuple[int, int]:
+    """
+    find the simplex containing lon, lat (in radian) and
+    write the barycentric weights of its vertices
+
+    :param start: the simplex to walk from or -1
+    :returns: (the simplex, the steps walked or -1 if the walk
+    from start did not arrive)
+
+    """
+
+    point = np.empty(3)
+
+    cos_lat = np.cos(lat)
+
+    point[0] = cos_lat * np.cos(lon)
+    point[1] = cos_lat * np.sin(lon)
+    point[2] = np.sin(lat)
+
+    if start >= 0:
+
+        simplex, steps = _walk(
+            point, points, simplices, neighbours, start, max_steps, weights
+        )
+
+        if simplex >= 0:
+
+            return simplex, steps
+
+    # start again from a triangle in the cell of the point
+
+    n_z, n_lon = cell_simplices.shape
+
+    iz, il = _cell_of(point[0:1], point[1:2], point[2:3], n_z, n_lon)
+
+    simplex, _ = _walk(
+        point,
+        points,
+        simplices,
+        neighbours,
+        cell_simplices[iz[0], il[0]],
+        max_steps,
+        weights,
+    )
+
+    if simplex >= 0:
+
+        return simplex, -1
+
+    # this can only happen on degenerate grids
+
+    for simplex in range(simplices.shape[0]):
+
+        if _barycentric(point, points, simplices, simplex, weights) < 0:
+
+            return simplex, -1
+
+    return 0, -1
+
+
+@nb.njit(cache=True, nogil=True)
+def _locate_many(
+    lon: np.ndarray,
+    lat: np.ndarray,
+    points: np.ndarray,
+    simplices: np.ndarray,
+    neighbours: np.ndarray,
+    cell_simplices: np.ndarray,
+    start: int,
+    max_steps: int,
+    warm_start: bool,
+    weights: np.ndarray,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    locate the points one after the other
+
+    :returns: (the simplices, the steps walked or -1 for each point)
+
+    """
+
+    found = np.empty(lon.shape[0], dtype=np.int64)
+
+    walked = np.empty(lon.shape[0], dtype=np.int64)
+
+    for n in range(lon.shape[0]):
+
+        simplex, steps = locate_point(
+            lon[n],
+            lat[n],
+            points,
+            simplices,
+            neighbours,
+            cell_simplices,
+            start,
+            max_steps,
+            weights[n],
+        )
+
+        found[n] = simplex
+
+        walked[n] = steps
+
+        if warm_start:
+
+            start = simplex
+
+    return found, walked
+
+
+@nb.njit(cache=True, nogil=True)
+def _walk(
+    point: np.ndarray,
+    points: np.ndarray,
+    simplices: np.ndarray,
+    neighbours: np.ndarray,
+    start: int,
+    max_steps: int,
+    weights: np.ndarray,
+) -> Tuple[int, int]:
+    """
+    walk across the triangulation towards the point, always
+    crossing the edge the point is furthest behind
+
+    :returns: (the containing simplex or -1, the number of steps)
+
+    """
+
+    simplex = start
+
+    for step in range(max_steps + 1):
+
+        worst = _barycentric(point, points, simplices, simplex, weights)
+
+        if worst < 0:
+
+            return simplex, step
+
+        simplex = neighbours[simplex, worst]
+
+        if simplex < 0:
+
+            return -1, step
+
+    return -1, max_steps
+
+
+@nb.njit(cache=True, nogil=True)
+def _barycentric(
+    point: np.ndarray,
+    points: np.ndarray,
+    simplices: np.ndarray,
+    simplex: int,
+    weights: np.ndarray,
+) -> int:
+    """
+    the (unnormalized) barycentric coordinates of the central
+    projection of the point onto the triangle. If they are all
+    positive the normalized weights are written and -1 is
+    returned, otherwise the vertex with the most negative one
+    """
+
+    a = points[simplices[simplex, 0]]
+    b = points[simplices[simplex, 1]]
+    c = points[simplices[simplex, 2]]
+
+    b0 = _triple(point, b, c)
+    b1 = _triple(point, c, a)
+    b2 = _triple(point, a, b)
+
+    worst = 0
+    lowest = b0
+
+    if b1 < lowest:
+
+        worst = 1
+        lowest = b1
+
+    if b2 < lowest:
+
+        worst = 2
+        lowest = b2
+
+    if lowest < -1e-14:
+
+        return worst
+
+    total = b0 + b1 + b2
+
+    weights[0] = b0 / total
+    weights[1] = b1 / total
+    weights[2] = b2 / total
+
+    return -1
+
+
+@nb.njit(cache=True, nogil=True)
+def _weight_gradients(
+    lon: float,
+    lat: float,
+    points: np.ndarray,
+    vertices: np.ndarray,
+    gradients: np.ndarray,
+) -> np.ndarray:
+    """
+    write the derivatives of the normalized barycentric weights
+    w_i = (p . n_i) / (p . N) of the point with respect to its lon
+    and lat into the (3, 2) gradients.
+
+    dw_i / dp = (n_i - w_i N) / (p . N) which is projected onto the
+    derivatives of p with respect to lon and lat
+    """
+
+    cos_lat = np.cos(lat)
+    sin_lat = np.sin(lat)
+    cos_lon = np.cos(lon)
+    sin_lon = np.sin(lon)
+
+    point = np.array([cos_lat * cos_lon, cos_lat * sin_lon, sin_lat])
+
+    d_lon = np.array([-cos_lat * sin_lon, cos_lat * cos_lon, 0.0])
+
+    d_lat = np.array([-sin_lat * cos_lon, -sin_lat * sin_lon, cos_lat])
+
+    normals = np.empty((3, 3))
+
+    for i in range(3):
+
+        u = points[vertices[(i + 1) % 3]]
+        v = points[vertices[(i + 2) % 3]]
+
+        normals[i, 0] = u[1] * v[2] - u[2] * v[1]
+        normals[i, 1] = u[2] * v[0] - u[0] * v[2]
+        normals[i, 2] = u[0] * v[1] - u[1] * v[0]
+
+    total = normals[0] + normals[1] + normals[2]
+
+    projection = np.dot(point, total)
+
+    for i in range(3):
+
+        weight = np.dot(point, normals[i]) / projection
+
+        derivative = (normals[i] - weight * total) / projection
+
+        gradients[i, 0] = np.dot(derivative, d_lon)
+        gradients[i, 1] = np.dot(derivative, d_lat)
+
+    return gradients
+
+
+@nb.njit(inline="always", nogil=True)
+def _triple(p: np.ndarray, u: np.ndarray, v: np.ndarray) -> float:
+
+    return (
+        p[0] * (u[1] * v[2] - u[2] * v[1])
+        + p[1] * (u[2] * v[0] - u[0] * v[2])
+        + p[2] * (u[0] * v[1] - u[1] * v[0])
+    )
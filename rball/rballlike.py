@@ -1,13 +1,19 @@
-from typing import Optional
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
 
 from threeML.plugins.DispersionSpectrumLike import DispersionSpectrumLike
 from threeML.plugins.OGIPLike import OGIPLike
 from astromodels import Model
+from astromodels.core.parameter import SettingOutOfBounds
 
 from astromodels.functions.priors import Cosine_Prior, Uniform_prior
 
 from .response_database import ResponseDatabase
+from .response_handle import ResponseHandle
+from .sky_scan import SkyScan, sky_scan_positions
 
+from .utils.instrumentation import StageTimers, perf_counter
 from .utils.logging import setup_logger
 from rball import response_database
 
@@ -23,19 +29,95 @@ class RBallLike(DispersionSpectrumLike):
         response_database: ResponseDatabase,
         background=None,
         free_position: bool = True,
+        fold_then_blend: bool = False,
+        restrict_response: bool = True,
+        mc_energy_window: Optional[Tuple[float, float]] = None,
         **kwargs,
     ):
+        """
+        A DispersionSpectrumLike whose response is interpolated
+        from a ResponseDatabase at the position of the point source.
+
+        By default only the rows of the active channels are
+        interpolated, the others are zero. With an MC energy window
+        also only the MC bins overlapping it are interpolated, which
+        assumes that the spectrum has negligible flux outside of it.
+
+        :param name: the name of the plugin
+        :type name: str
+        :param observation: the observed spectrum
+        :param response_database: the response database
+        :type response_database: ResponseDatabase
+        :param background: the background spectrum
+        :param free_position: if the position should be free
+        :type free_position: bool
+        :param fold_then_blend: fold the model through the vertex
+        matrices and blend the counts instead of blending the matrices
+        :type fold_then_blend: bool
+        :param restrict_response: only interpolate the active channels
+        and the MC energy window
+        :type restrict_response: bool
+        :param mc_energy_window: the (min, max) MC energy in keV
+        :type mc_energy_window: Optional[Tuple[float, float]]
+        :returns:
+
+        """
 
         self._free_position: bool = free_position
 
-        # we replace the response of the observation
+        # the block of the matrix that is interpolated follows the
+        # mask of the active channels. The mask it was made for is
+        # kept to see when the mask changes
+
+        self._restrict_response: bool = restrict_response
+
+        self._mc_energy_window: Optional[Tuple[float, float]] = None
+
+        self._block_mask: Optional[np.ndarray] = None
+
+        # because the response is linear in the matrix, the counts
+        # at a position are the blend of the counts of the vertices.
+        # the vertex counts are cached for the current spectrum
+
+        self._fold_then_blend: bool = fold_then_blend
+
+        self._current_simplex: Optional[Tuple[np.ndarray, np.ndarray]] = None
+
+        self._current_position: Optional[Tuple[float, float]] = None
+
+        self._spectral_parameters: List = []
+
+        self._folded_key: Optional[Tuple[float, ...]] = None
+
+        self._folded_counts: Dict[int, np.ndarray] = {}
+
+        # the counts of a row while a batch is evaluated
+
+        self._batch_counts: Optional[np.ndarray] = None
+
+        # the stage timers when instrumentation is enabled
+
+        self._timers: Optional[StageTimers] = None
+
+        # we replace the response of the observation with the one
+        # of our own handle so that plugins can share the database
 
         self._response_database: ResponseDatabase = response_database
 
-        observation._response = response_database.current_response
+        self._response_handle: ResponseHandle = (
+            response_database.create_handle()
+        )
+
+        self._response_handle.interpolate_to_position(
+            *response_database.current_sky_position
+        )
+
+        observation._response = self._response_handle.current_response
 
         super(RBallLike, self).__init__(name, observation, background, **kwargs)
 
+        self.mc_energy_window = mc_energy_window
+
     def set_model(self, likelihood_model: Model) -> None:
         """
         Set the model and free the location parameters
@@ -92,10 +174,218 @@ class RBallLike(DispersionSpectrumLike):
                 ra = self._like_model.point_sources[key].position.ra.value
                 dec = self._like_model.point_sources[key].position.dec.value
 
-        self._response_database.interpolate_to_position(ra, dec)
+        # the folded vertex counts depend on all
+        # parameters but the position
+
+        self._spectral_parameters = [
+            par
+            for path, par in self._like_model.parameters.items()
+            if ".position." not in path
+        ]
+
+        self._folded_key = None
+
+        self._update_position(ra, dec)
+
+    @property
+    def response_handle(self) -> ResponseHandle:
+        """
+        the handle of the database holding the response of this plugin
+        """
+        return self._response_handle
+
+    @property
+    def fold_then_blend(self) -> bool:
+
+        return self._fold_then_blend
+
+    @fold_then_blend.setter
+    def fold_then_blend(self, value: bool) -> None:
+
+        if value and not self._fold_then_blend:
+
+            self._current_position = self._response_handle.current_sky_position
+
+            self._current_simplex = self._response_handle.locate(
+                *self._current_position
+            )
+
+        elif not value:
+
+            # make sure the matrix is where the source is
+
+            self._sync_response()
+
+            self._current_simplex = None
+
+        self._fold_then_blend = value
+
+        self._folded_key = None
+
+    @property
+    def restrict_response(self) -> bool:
+
+        return self._restrict_response
+
+    @restrict_response.setter
+    def restrict_response(self, value: bool) -> None:
+
+        self._restrict_response = value
+
+        self._block_mask = None
+
+    @property
+    def mc_energy_window(self) -> Optional[Tuple[float, float]]:
+        """
+        the (min, max) MC energy in keV that is interpolated
+        when the response is restricted
+        """
+
+        return self._mc_energy_window
+
+    @mc_energy_window.setter
+    def mc_energy_window(self, value: Optional[Tuple[float, float]]) -> None:
+
+        if value is not None:
+
+            value = (float(value[0]), float(value[1]))
+
+            if not value[0] < value[1]:
+
+                log.error(f"the MC energy window {value} is empty")
+
+                raise RuntimeError()
+
+        self._mc_energy_window = value
+
+        self._block_mask = None
+
+    def _sync_block(self) -> None:
+        """
+        restrict the handle to the active channels and the
+        MC energy window if the mask has changed
+        """
+
+        if self._block_mask is not None and np.array_equal(
+            self._block_mask, self._mask
+        ):
+
+            return
+
+        self._block_mask = np.array(self._mask, copy=True)
+
+        if not self._restrict_response:
+
+            self._response_handle.restrict()
+
+            return
+
+        columns = None
+
+        if self._mc_energy_window is not None:
+
+            edges = self._response_database.monte_carlo_energies
+
+            emin, emax = self._mc_energy_window
+
+            # the bins that overlap the window
+
+            columns = (
+                int(np.searchsorted(edges[1:], emin, side="right")),
+                int(np.searchsorted(edges[:-1], emax, side="left")),
+            )
+
+        self._response_handle.restrict(np.flatnonzero(self._mask), columns)
+
+    @property
+    def instrumentation_enabled(self) -> bool:
+
+        return self._timers is not None
+
+    def enable_instrumentation(self, reset: bool = False) -> None:
+        """
+        time the folding of the model and the stages of the
+        response database (lookup, blend)
+
+        :param reset: reset the counters
+        :type reset: bool
+        :returns:
+
+        """
+
+        if self._timers is None:
+
+            self._timers = StageTimers()
+
+        elif reset:
+
+            self._timers.reset()
+
+        self._response_database.enable_instrumentation(reset=reset)
+
+    def disable_instrumentation(self) -> None:
+
+        self._timers = None
+
+        self._response_database.disable_instrumentation()
+
+    def stats(self) -> Dict:
+        """
+        the stats of the response database with the
+        fold stages of this plugin added
+
+        :returns: the stats
+
+        """
+
+        stats = self._response_database.stats()
+
+        if self._timers is not None:
+
+            stats["stages"].update(self._timers.stats())
+
+        stats["fold_then_blend"] = self._fold_then_blend
+
+        return stats
+
+    def set_model_integrate_method(self, method: str) -> None:
+
+        super().set_model_integrate_method(method)
+
+        self._folded_key = None
+
+    def _update_position(self, ra: float, dec: float) -> None:
+
+        if self._fold_then_blend:
+
+            self._current_simplex = self._response_handle.locate(ra, dec)
+
+            self._current_position = (ra, dec)
+
+        else:
+
+            self._response_handle.interpolate_to_position(ra, dec)
+
+    def _sync_response(self) -> None:
+        """
+        bring the response of the database to the current
+        position if it was skipped by fold then blend
+        """
+
+        if self._current_simplex is not None:
+
+            self._response_handle.interpolate_to_position(
+                *self._current_position
+            )
 
     def get_model(self, precalc_fluxes=None):
 
+        if self._batch_counts is not None:
+
+            return super().get_model(precalc_fluxes)
+
+        self._sync_block()
+
         # Here we update the GBM drm parameters which creates and new DRM for that location
         # we should only be dealing with one source for GBM
 
@@ -106,10 +396,431 @@ class RBallLike(DispersionSpectrumLike):
             # assumes that the is only one point source which is how it should be!
             ra, dec = self._like_model.get_point_source_position(0)
 
-            self._response_database.interpolate_to_position(ra, dec)
+            self._update_position(ra, dec)
 
         return super().get_model(precalc_fluxes)
 
+    def _evaluate_model(self, precalc_fluxes=None) -> np.ndarray:
+
+        if self._batch_counts is not None:
+
+            return self._batch_counts
+
+        timers = self._timers
+
+        if timers is None:
+
+            return self._fold(precalc_fluxes)
+
+        start = perf_counter()
+
+        counts = self._fold(precalc_fluxes)
+
+        timers.record("fold", start)
+
+        return counts
+
+    def _fold(self, precalc_fluxes=None) -> np.ndarray:
+
+        if not self._fold_then_blend:
+
+            return super()._evaluate_model(precalc_fluxes=precalc_fluxes)
+
+        weights, simplex = self._current_simplex
+
+        storage = self._response_database.storage
+
+        if precalc_fluxes is not None:
+
+            # we do not know which spectrum these are from
+
+            fluxes = self._clean_fluxes(precalc_fluxes)
+
+            return sum(
+                w * storage.fold(v, fluxes) for w, v in zip(weights, simplex)
+            )
+
+        key = tuple(par.value for par in self._spectral_parameters)
+
+        if key != self._folded_key:
+
+            self._folded_counts.clear()
+
+            self._folded_key = key
+
+            self._fluxes = self._clean_fluxes(self._evaluate_fluxes())
+
+        counts = 0.0
+
+        for w, v in zip(weights, simplex):
+
+            folded = self._folded_counts.get(v)
+
+            if folded is None:
+
+                folded = storage.fold(v, self._fluxes)
+
+                self._folded_counts[v] = folded
+
+            counts = counts + w * folded
+
+        return counts
+
+    def get_log_like_batch(
+        self, parameter_values: np.ndarray, chunk_size: int = 128
+    ) -> np.ndarray:
+        """
+        the log likelihood for many sets of parameters at once, e.g.
+        for the vectorized proposals of a sampler. Each row holds the
+        values of the free parameters of the likelihood model in the
+        order of likelihood_model.free_parameters.
+
+        The responses of all positions are interpolated in one step
+        and all spectra are folded with one batched contraction. Only
+        the spectra and the statistic are evaluated row by row. Rows
+        with parameters out of their bounds get -inf. The parameters
+        of the model are restored afterwards.
+
+        :param parameter_values: (N, N free parameters) array
+        :type parameter_values: np.ndarray
+        :param chunk_size: the number of responses interpolated at once
+        :type chunk_size: int
+        :returns: (N,) array of log likelihoods
+
+        """
+
+        if self._like_model is None:
+
+            log.error("the model has to be set first")
+
+            raise RuntimeError()
+
+        free_parameters = list(self._like_model.free_parameters.values())
+
+        parameter_values = np.atleast_2d(
+            np.asarray(parameter_values, dtype=float)
+        )
+
+        if parameter_values.shape[1] != len(free_parameters):
+
+            log.error(
+                f"expected {len(free_parameters)} parameters per row"
+                f" not {parameter_values.shape[1]}"
+            )
+
+            raise RuntimeError()
+
+        n_rows = parameter_values.shape[0]
+
+        # the position is not set in the model but interpolated
+        # for all rows together
+
+        position = self._like_model.point_sources[
+            self._like_model.get_point_source_name(0)
+        ].position
+
+        ra = np.full(n_rows, position.ra.value)
+        dec = np.full(n_rows, position.dec.value)
+
+        spectral = []
+
+        for i, par in enumerate(free_parameters):
+
+            if par is position.ra:
+
+                ra = parameter_values[:, i]
+
+            elif par is position.dec:
+
+                dec = parameter_values[:, i]
+
+            else:
+
+                spectral.append((i, par))
+
+        original = [par.value for _, par in spectral]
+
+        # the position is never set in the model, so its
+        # bounds have to be checked here
+
+        in_bounds = _within_bounds(position.ra, ra) & _within_bounds(
+            position.dec, dec
+        )
+
+        log_likes = np.full(n_rows, -np.inf)
+
+        try:
+
+            for start in range(0, n_rows, chunk_size):
+
+                rows = slice(start, min(start + chunk_size, n_rows))
+
+                responses = self._response_database.interpolate_to_positions(
+                    ra[rows], dec[rows]
+                )
+
+                fluxes = np.zeros((responses.shape[0], responses.shape[2]))
+
+                valid = in_bounds[rows].copy()
+
+                for n, values in enumerate(parameter_values[rows]):
+
+                    if not valid[n]:
+
+                        continue
+
+                    try:
+
+                        for i, par in spectral:
+
+                            par.value = values[i]
+
+                    except SettingOutOfBounds:
+
+                        valid[n] = False
+
+                        continue
+
+                    fluxes[n] = self._clean_fluxes(self._evaluate_fluxes())
+
+                if self._timers is not None:
+
+                    fold_start = perf_counter()
+
+                counts = np.matmul(responses, fluxes[:, :, None])[:, :, 0]
+
+                if self._timers is not None:
+
+                    self._timers.record("batch_fold", fold_start)
+
+                for n in np.flatnonzero(valid):
+
+                    self._batch_counts = counts[n]
+
+                    log_likes[start + n] = self.get_log_like()
+
+        finally:
+
+            self._batch_counts = None
+
+            for (_, par), value in zip(spectral, original):
+
+                par.value = value
+
+            self._folded_key = None
+
+        return log_likes
+
+    def get_log_like_gradient(self) -> np.ndarray:
+        """
+        the derivatives of the log likelihood with respect to the RA
+        and Dec of the point source at the current parameters, e.g.
+        for gradient based optimizers and HMC.
+
+        The derivatives of the model counts are exact as the response
+        is linear on each simplex of the grid. The statistic is smooth
+        in the counts and is differentiated along them with a central
+        difference that changes no channel by more than 1e-4 of its
+        counts, so that any statistic of the plugin can be used.
+
+        :returns: [dlogL/dRA, dlogL/dDec] per degree
+
+        """
+
+        if self._like_model is None:
+
+            log.error("the model has to be set first")
+
+            raise RuntimeError()
+
+        ra, dec = self._like_model.get_point_source_position(0)
+
+        responses = self._response_database.interpolate_with_gradient(ra, dec)
+
+        fluxes = self._clean_fluxes(self._evaluate_fluxes())
+
+        counts = responses[0].dot(fluxes)
+
+        gradient = np.zeros(2)
+
+        try:
+
+            for i in range(2):
+
+                d_counts = responses[i + 1].dot(fluxes)
+
+                moving = (d_counts != 0) & (counts > 0)
+
+                if not np.any(moving):
+
+                    continue
+
+                step = 1e-4 * np.min(
+                    counts[moving] / np.abs(d_counts[moving])
+                )
+
+                self._batch_counts = counts + step * d_counts
+
+                up = self.get_log_like()
+
+                self._batch_counts = counts - step * d_counts
+
+                down = self.get_log_like()
+
+                gradient[i] = (up - down) / (2 * step)
+
+        finally:
+
+            self._batch_counts = None
+
+        return gradient
+
+    def scan_sky(
+        self,
+        subdivisions: int = 0,
+        max_log_scale: float = 4.0,
+        chunk_size: int = 128,
+        set_position: bool = False,
+    ) -> SkyScan:
+        """
+        a quick look localization: the profile likelihood of the point
+        source at the grid points of the database and optionally a
+        finer sub grid (see sky_scan_positions).
+
+        The shape of the spectrum is kept at the current parameters
+        and only its normalization is fit at each position, as a
+        bounded 1D fit of a scale factor of the folded counts. The
+        responses of all positions are interpolated and folded in
+        batches, so no parameter of the model is changed and the
+        statistic of the plugin is used as is. The best positions
+        are good starting points for a sampler or a fit.
+
+        :param subdivisions: the number of extra points per edge of
+        the triangulation
+        :type subdivisions: int
+        :param max_log_scale: the scale factor is fit between
+        10**-max_log_scale and 10**max_log_scale
+        :type max_log_scale: float
+        :param chunk_size: the number of responses interpolated at once
+        :type chunk_size: int
+        :param set_position: move the point source of the model to
+        the best position
+        :type set_position: bool
+        :returns: SkyScan
+
+        """
+
+        from scipy.optimize import minimize_scalar
+
+        if self._like_model is None:
+
+            log.error("the model has to be set first")
+
+            raise RuntimeError()
+
+        ra, dec = sky_scan_positions(self._response_database, subdivisions)
+
+        position = self._like_model.point_sources[
+            self._like_model.get_point_source_name(0)
+        ].position
+
+        in_bounds = _within_bounds(position.ra, ra) & _within_bounds(
+            position.dec, dec
+        )
+
+        fluxes = self._clean_fluxes(self._evaluate_fluxes())
+
+        n_positions = len(ra)
+
+        log_likes = np.full(n_positions, -np.inf)
+
+        scales = np.zeros(n_positions)
+
+        def negative_log_like(log_scale: float) -> float:
+
+            self._batch_counts = counts * 10**log_scale
+
+            value = self.get_log_like()
+
+            return -value if np.isfinite(value) else np.inf
+
+        try:
+
+            self._batch_counts = np.zeros(len(self._response.ebounds) - 1)
+
+            null_log_like = self.get_log_like()
+
+            for start in range(0, n_positions, chunk_size):
+
+                rows = np.arange(start, min(start + chunk_size, n_positions))
+
+                rows = rows[in_bounds[rows]]
+
+                if len(rows) == 0:
+
+                    continue
+
+                responses = self._response_database.interpolate_to_positions(
+                    ra[rows], dec[rows]
+                )
+
+                for n, counts in zip(rows, responses.dot(fluxes)):
+
+                    if not np.any(counts > 0):
+
+                        log_likes[n] = null_log_like
+
+                        continue
+
+                    result = minimize_scalar(
+                        negative_log_like,
+                        bounds=(-max_log_scale, max_log_scale),
+                        method="bounded",
+                        options=dict(xatol=1e-3),
+                    )
+
+                    log_likes[n] = -result.fun
+
+                    scales[n] = 10**result.x
+
+        finally:
+
+            self._batch_counts = None
+
+        scan = SkyScan(ra, dec, log_likes, null_log_like, scales)
+
+        if set_position:
+
+            position.ra.value, position.dec.value = scan.best_position
+
+        return scan
+
+    def _evaluate_fluxes(self) -> np.ndarray:
+        """
+        the integrated photon fluxes in the monte carlo bins
+        """
+
+        try:
+
+            return self._integral_flux()
+
+        except TypeError:
+
+            mc_energies = self._response.monte_carlo_energies
+
+            return self._integral_flux(mc_energies[:-1], mc_energies[1:])
+
+    @staticmethod
+    def _clean_fluxes(fluxes: np.ndarray) -> np.ndarray:
+
+        # as in the InstrumentResponse, inf * 0 must be 0
+
+        fluxes = np.array(fluxes, dtype=float)
+
+        fluxes[~np.isfinite(fluxes)] = 0
+
+        return fluxes
+
     @classmethod
     def from_spectrumlike(
         cls,
@@ -200,8 +911,45 @@ class RBallLike(DispersionSpectrumLike):
         )
 
     def get_simulated_dataset(self, new_name=None, **kwargs):
-        return super().get_simulated_dataset(
-            new_name=new_name,
-            response_database=self._response_database,
-            **kwargs,
-        )
+
+        self._sync_response()
+
+        # the simulation needs all channels
+
+        block = self._response_handle.block
+
+        self._response_handle.restrict()
+
+        try:
+
+            return super().get_simulated_dataset(
+                new_name=new_name,
+                response_database=self._response_database,
+                **kwargs,
+            )
+
+        finally:
+
+            if block is not None:
+
+                rows, start, stop = block
+
+                self._response_handle.restrict(rows, (start, stop))
+
+
+def _within_bounds(parameter, values: np.ndarray) -> np.ndarray:
+    """
+    which values lie within the bounds of a parameter
+    """
+
+    inside = np.ones(values.shape[0], dtype=bool)
+
+    if parameter.min_value is not None:
+
+        inside &= values >= parameter.min_value
+
+    if parameter.max_value is not None:
+
+        inside &= values <= parameter.max_value
+
+    return inside
@@ -1,21 +1,30 @@
 from os import replace
-from typing import Optional, Iterable, Tuple
+from pathlib import Path
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Dict,
+    Optional,
+    Iterable,
+    List,
+    Set,
+    Tuple,
+    Union,
+)
 import numpy as np
-import numba as nb
-import stripy
-from stripy.spherical import lonlat2xyz
 
-import matplotlib.pyplot as plt
-from mpl_toolkits.mplot3d import Axes3D
-import ipyvolume as ipv
-import pythreejs
 
-from threeML.utils.OGIP.response import InstrumentResponse
+from .point_location import PointLocator
+from .response_handle import ResponseHandle
+from .storage import MatrixStorage, build_storage
+from .utils.instrumentation import StageTimers, hit_ratio, perf_counter
+from .utils.interpolation_cache import InterpolationCache
+from .utils.logging import TRACE, setup_logger
+from .utils.pixel_cache import PixelCache, pixel_nodes
 
-import h5py
+if TYPE_CHECKING:
 
-
-from .utils.logging import setup_logger
+    from .interpolated_response import InterpolatedResponse
 
 
 log = setup_logger(__name__)
@@ -24,16 +33,22 @@ log = setup_logger(__name__)
 class ResponseDatabase:
     def __init__(
         self,
-        list_of_matrices: np.ndarray,
+        list_of_matrices: Union[np.ndarray, MatrixStorage],
         theta: np.ndarray,
         phi: np.ndarray,
         ebounds: np.ndarray,
         monte_carlo_energies: np.ndarray,
+        metadata: Optional[Dict[str, Any]] = None,
+        storage_type: str = "auto",
+        storage_options: Optional[Dict[str, Any]] = None,
+        locator: Optional[PointLocator] = None,
+        cache_triangulation: bool = True,
     ):
         """
 
-        :param list_of_matrices:
-        :type list_of_matrices: np.ndarray
+        :param list_of_matrices: the (N grid points, N ebounds, N mc)
+        stack or a MatrixStorage holding it
+        :type list_of_matrices: Union[np.ndarray, MatrixStorage]
         :param theta:
         :type theta: np.ndarray
         :param phi:
@@ -42,20 +57,50 @@ class ResponseDatabase:
         :type ebounds: np.ndarray
         :param monte_carlo_energies:
         :type monte_carlo_energies: np.ndarray
-        ::
+        :param metadata: optional information about the database
+        such as the grid refinement level or the frame
+        :type metadata: Optional[Dict[str, Any]]
+        :param storage_type: how to store an array of matrices: dense,
+        sparse (only the non zero band), low_rank (a compressed basis)
+        or auto to choose from the sparsity of the matrices
+        :type storage_type: str
+        :param storage_options: options of the storage, e.g. the
+        tolerance of the low rank storage
+        :type storage_options: Optional[Dict[str, Any]]
+        :param locator: an existing point locator for the same
+        grid, e.g. shared with the databases of other detectors
+        :type locator: Optional[PointLocator]
+        :param cache_triangulation: load the triangulation of the grid
+        from the cache in the user config directory (and store it
+        there the first time)
+        :type cache_triangulation: bool
         :returns:
 
         """
 
-        self._matrices: np.ndarray = list_of_matrices
+        if isinstance(list_of_matrices, MatrixStorage):
+
+            self._storage: MatrixStorage = list_of_matrices
+
+        else:
+
+            self._storage: MatrixStorage = build_storage(
+                list_of_matrices,
+                storage_type=storage_type,
+                **(storage_options or {}),
+            )
 
         self._ebounds: np.ndarray = ebounds
 
         self._monte_carlo_energies: np.ndarray = monte_carlo_energies
 
-        self._n_grid_points: int = self._matrices.shape[0]
+        self._metadata: Dict[str, Any] = (
+            dict(metadata) if metadata is not None else {}
+        )
+
+        self._n_grid_points: int = self._storage.n_grid_points
 
-        self._matrix_shape = self._matrices.shape[1:]
+        self._matrix_shape = self._storage.matrix_shape
 
         self._occulted_matrix = np.zeros(self._matrix_shape)
 
@@ -89,29 +134,185 @@ class ResponseDatabase:
 
         # create the triangulation
 
-        self._generate_triangulation()
+        self._generate_triangulation(locator, cache_triangulation)
+
+        self._vertex_neighbours: Optional[List[Set[int]]] = None
+
+        self._cache: Optional[InterpolationCache] = None
+
+        self._pixel_cache: Optional[PixelCache] = None
+
+        # the stage timers when instrumentation is enabled
+
+        self._timers: Optional[StageTimers] = None
+
+        # the database has its own handle, further ones can be
+        # created for each consumer. It holds a threeML response,
+        # so it is only created when it is first used
+
+        self._default_handle: Optional[ResponseHandle] = None
+
+    @classmethod
+    def from_hdf5(
+        cls,
+        file_name: Union[str, Path],
+        lazy: bool = False,
+        max_resident: int = 64,
+        prefetch: bool = False,
+        storage_type: str = "auto",
+        storage_options: Optional[Dict[str, Any]] = None,
+    ) -> "ResponseDatabase":
+        """
+        read a response database from an HDF5 file
+
+        :param file_name: the name of the file
+        :type file_name: Union[str, Path]
+        :param lazy: keep the matrices on disk and only read
+        the vertices that are needed
+        :type lazy: bool
+        :param max_resident: the max number of vertex matrices
+        kept in memory when lazy
+        :type max_resident: int
+        :param prefetch: read the neighbours of the last simplex
+        in the background when lazy
+        :type prefetch: bool
+        :param storage_type: dense, sparse, low_rank or auto when not lazy
+        :type storage_type: str
+        :param storage_options: options of the storage, e.g. the
+        tolerance of the low rank storage
+        :type storage_options: Optional[Dict[str, Any]]
+        :returns: ResponseDatabase
+
+        """
+
+        from .io import read_response_database
+
+        return read_response_database(
+            file_name,
+            lazy=lazy,
+            max_resident=max_resident,
+            prefetch=prefetch,
+            storage_type=storage_type,
+            storage_options=storage_options,
+        )
+
+    def to_hdf5(
+        self,
+        file_name: Union[str, Path],
+        compression: Optional[str] = None,
+        compression_opts: Optional[int] = None,
+        shuffle: Optional[bool] = None,
+        overwrite: bool = False,
+    ) -> None:
+        """
+        write the response database to an HDF5 file with
+        one chunk per grid point
+
+        :param file_name: the name of the file
+        :type file_name: Union[str, Path]
+        :param compression: None, gzip or lzf
+        :type compression: Optional[str]
+        :param compression_opts: the gzip level (0-9)
+        :type compression_opts: Optional[int]
+        :param shuffle: apply the shuffle filter, defaults to True
+        when compressing
+        :type shuffle: Optional[bool]
+        :param overwrite: overwrite an existing file
+        :type overwrite: bool
+        :returns:
 
-        # now intitialize the current matrix
+        """
 
-        log.debug(f" setting the current matrix to the first data point")
+        from .io import write_response_database
 
-        self._current_matrix: InstrumentResponse = InstrumentResponse(
-            matrix=list_of_matrices[0],
-            ebounds=self._ebounds,
-            monte_carlo_energies=self._monte_carlo_energies,
+        write_response_database(
+            self,
+            file_name,
+            compression=compression,
+            compression_opts=compression_opts,
+            shuffle=shuffle,
+            overwrite=overwrite,
         )
 
-        self.interpolate_to_position(0.1, 0.1)
+    @property
+    def storage(self) -> MatrixStorage:
+        """
+        the storage holding the grid point matrices
+        """
+        return self._storage
+
+    @property
+    def matrices(self) -> np.ndarray:
+        """
+        the (N grid points, N ebounds, N mc) stack. If the
+        storage keeps the matrices on disk this reads them all!
+        """
+        return self._storage.to_array()
+
+    @property
+    def theta(self) -> np.ndarray:
+
+        return self._theta
+
+    @property
+    def phi(self) -> np.ndarray:
+
+        return self._phi
+
+    @property
+    def ebounds(self) -> np.ndarray:
+
+        return self._ebounds
+
+    @property
+    def monte_carlo_energies(self) -> np.ndarray:
+
+        return self._monte_carlo_energies
+
+    @property
+    def metadata(self) -> Dict[str, Any]:
+        """
+        information about the database such as the
+        grid refinement level and the frame
+        """
+        return self._metadata
+
+    @property
+    def current_response(self) -> "InterpolatedResponse":
+
+        return self._handle.current_response
 
     @property
-    def current_response(self) -> InstrumentResponse:
+    def _handle(self) -> ResponseHandle:
+
+        if self._default_handle is None:
+
+            log.debug("setting the current matrix to the first data point")
+
+            handle = ResponseHandle(self)
+
+            handle.interpolate_to_position(0.1, 0.1)
+
+            self._default_handle = handle
+
+        return self._default_handle
+
+    def create_handle(self) -> ResponseHandle:
+        """
+        create a handle with its own interpolated response and
+        position which shares the matrices of this database. Give
+        each plugin or thread its own handle.
 
-        return self._current_matrix
+        :returns: ResponseHandle
+
+        """
+
+        return ResponseHandle(self)
 
     @property
     def grid_points(self) -> np.ndarray:
 
-        return self._triangulation.points
+        return self._locator.points
 
     @property
     def n_grid_points(self) -> int:
@@ -123,13 +324,34 @@ class ResponseDatabase:
         """
         return self._n_grid_points
 
-    def _generate_triangulation(self) -> None:
+    def _generate_triangulation(
+        self,
+        locator: Optional[PointLocator] = None,
+        cache_triangulation: bool = True,
+    ) -> None:
 
-        log.debug("generating the triangulation")
+        if locator is None and cache_triangulation:
 
-        self._triangulation = stripy.spherical.sTriangulation(
-            lons=self._phi, lats=self._theta, permute=True, tree=True
-        )
+            locator = PointLocator.from_cache(theta=self._theta, phi=self._phi)
+
+        elif locator is None:
+
+            locator = PointLocator(theta=self._theta, phi=self._phi)
+
+        elif locator.n_grid_points != self._n_grid_points:
+
+            log.error("the locator is for a different grid")
+
+            raise AssertionError()
+
+        self._locator: PointLocator = locator
+
+    @property
+    def locator(self) -> PointLocator:
+        """
+        the point locator of the grid
+        """
+        return self._locator
 
     def _transform_to_instrument_coordinates(
         self, ra: float, dec: float
@@ -153,161 +375,654 @@ class ResponseDatabase:
 
         return np.deg2rad([dec, ra])
 
-    def interpolate_to_position(self, ra: float, dec: float) -> None:
+    def _transform_to_sky_coordinates(
+        self, theta: np.ndarray, phi: np.ndarray
+    ) -> Tuple[np.ndarray]:
+        """
+        the inverse of _transform_to_instrument_coordinates, e.g. to
+        put the grid points on the sky
+
+        :param theta: the theta(s) in radian
+        :param phi: the phi(s) in radian
+
+        :returns: (ra, dec) in degrees
+
+        """
+
+        return np.rad2deg(phi) % 360.0, np.rad2deg(theta)
+
+    def locate(self, ra: float, dec: float) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        find the simplex containing a position and the normalized
+        barycentric weights of its vertices. The response at the
+        position is the weighted sum of the vertex matrices
+
+        :param ra: the RA in degree
+        :type ra: float
+        :param dec: the Dec in degree
+        :type dec: float
+        :returns: (weights, vertex indices)
+
+        """
 
         theta, phi = self._transform_to_instrument_coordinates(ra, dec)
 
         # obtain the surrounding matricies and their normalized
         # barycenters
 
-        bbc, tri = self._triangulation.containing_simplex_and_bcc(theta, phi)
+        weights, simplex = self._locator.locate(theta, phi)
 
-        log.debug(f"weights: {bbc[0]}, indices: {tri[0]}")
+        if log.isEnabledFor(TRACE):
 
-        matrix = _linear_interpolation(bbc[0], self._matrices[tri[0]])
+            log.log(TRACE, "weights: %s, indices: %s", weights, simplex)
 
-        # update teh 3ML matrix
+        if self._storage.wants_prefetch:
 
-        self._current_matrix.replace_matrix(matrix)
+            self._storage.prefetch(self._get_simplex_neighbours(simplex))
 
-        self._current_ra: float = ra
-        self._current_dec: float = dec
+        return weights, simplex
 
-    @property
-    def current_sky_position(self) -> Tuple[float]:
-        return self._current_ra, self._current_dec
+    def _instrument_coordinate_jacobian(
+        self, ra: float, dec: float
+    ) -> np.ndarray:
+        """
+        the derivatives of the instrument coordinates returned by
+        _transform_to_instrument_coordinates with respect to RA and
+        Dec. This has to change together with the transformation.
+
+        :param ra: the RA in degree
+        :type ra: float
+        :param dec: the Dec in degree
+        :type dec: float
+        :returns: [[dtheta/dra, dtheta/ddec], [dphi/dra, dphi/ddec]]
+        in radian per degree
+
+        """
 
-    def plot_verticies(self) -> plt.Figure:
+        scale = np.deg2rad(1.0)
 
-        fig, ax = plt.subplots(subplot_kw=dict(projection="3d"))
+        return np.array([[0.0, scale], [scale, 0.0]])
+
+    def locate_with_gradient(
+        self, ra: float, dec: float
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        find the simplex containing a position, the barycentric
+        weights of its vertices and their derivatives with respect
+        to RA and Dec. The interpolation is linear on each simplex,
+        so the derivatives are exact but jump between simplices.
+
+        :param ra: the RA in degree
+        :type ra: float
+        :param dec: the Dec in degree
+        :type dec: float
+        :returns: (weights, vertex indices, (3, 2) derivatives of the
+        weights with respect to RA and Dec per degree)
+
+        """
 
-        points = self._triangulation.points
-        segs = self._triangulation.identify_segments()
+        theta, phi = self._transform_to_instrument_coordinates(ra, dec)
 
-        ax.scatter(
-            points[:, 0], points[:, 1], points[:, 2], color="k", alpha=0.1
+        weights, simplex, gradients = self._locator.locate_with_gradient(
+            theta, phi
         )
 
-        # plot the verticies
+        # the chain rule through the instrument coordinates
 
-        for s1, s2 in segs:
+        gradients = gradients.dot(self._instrument_coordinate_jacobian(ra, dec))
 
-            ax.plot(
-                [points[s1, 0], points[s2, 0]],
-                [points[s1, 1], points[s2, 1]],
-                [points[s1, 2], points[s2, 2]],
-                color="grey",
-                alpha=0.5,
-            )
+        return weights, simplex, gradients
 
-        xyzlim = np.array([ax.get_xlim3d(), ax.get_ylim3d(), ax.get_zlim3d()]).T
-        XYZlim = [min(xyzlim[0]), max(xyzlim[1])]
-        ax.set_xlim3d(XYZlim)
-        ax.set_ylim3d(XYZlim)
-        ax.set_zlim3d(XYZlim)
-        ax.set_box_aspect(
-            [
-                ub - lb
-                for lb, ub in (getattr(ax, f"get_{a}lim")() for a in "xyz")
-            ]
+    def interpolate_with_gradient(
+        self, ra: float, dec: float, out: Optional[np.ndarray] = None
+    ) -> np.ndarray:
+        """
+        interpolate the response to a position together with its
+        derivatives with respect to RA and Dec. As the blend is linear
+        in the weights, the derivatives are the blends of the vertex
+        matrices with the derivatives of the weights. The current
+        response is not touched.
+
+        :param ra: the RA in degree
+        :type ra: float
+        :param dec: the Dec in degree
+        :type dec: float
+        :param out: an optional (3, N ebounds, N mc) buffer to write to
+        :type out: Optional[np.ndarray]
+        :returns: (3, N ebounds, N mc) array of the matrix, its
+        derivative with respect to RA and with respect to Dec per degree
+
+        """
+
+        shape = (3,) + tuple(self._matrix_shape)
+
+        if out is None:
+
+            out = np.empty(shape)
+
+        elif out.shape != shape or out.dtype != np.float64:
+
+            log.error(f"out must be a float64 array of shape {shape}")
+
+            raise AssertionError()
+
+        weights, simplex, gradients = self.locate_with_gradient(ra, dec)
+
+        self._storage.interpolate(weights, simplex, out[0])
+
+        self._storage.interpolate(
+            np.ascontiguousarray(gradients[:, 0]), simplex, out[1]
         )
 
-        return fig
+        self._storage.interpolate(
+            np.ascontiguousarray(gradients[:, 1]), simplex, out[2]
+        )
 
-    def plot_verticies_ipv(
-        self, selected_location: Optional[Iterable[float]] = None
-    ):
+        return out
+
+    def enable_cache(
+        self, max_size: int = 128, resolution: Optional[float] = None
+    ) -> None:
         """
+        cache the interpolated matrices by position so that
+        revisited positions skip the simplex search and the blend.
 
-        :param selected_location: ra, dec tuple in degree
+        By default only exactly equal positions are reused. If a
+        resolution (in degree) is given, positions closer than that
+        are considered equal and the first one's matrix is returned.
+
+        :param max_size: the max number of cached matrices
+        :type max_size: int
+        :param resolution: the quantization of the positions in degree
+        :type resolution: Optional[float]
+        :returns:
 
         """
 
-        background_color = "#2E0E49"
-        grid_color = "#FDFF8D"
-        grid_color2 = "#FDFEAE"
-        selected_color = "#FF6563"
-        point_color = "#63FFA3"
+        if max_size < 1:
+
+            log.error("the cache must be able to hold at least one matrix")
 
-        fig = ipv.figure(width=800, height=600)
-        ipv.pylab.style.box_off()
-        # ipv.pylab.style.axes_off()
-        ipv.pylab.style.set_style_dark()
-        ipv.pylab.style.background_color(background_color)
+            raise RuntimeError()
 
-        points = self._triangulation.points
-        segs = self._triangulation.identify_segments()
+        log.debug(f"caching up to {max_size} matrices")
 
-        scatter = ipv.pylab.scatter(
-            points[:, 0],
-            points[:, 1],
-            points[:, 2],
-            color=grid_color,
-            alpha=1,
-            size=1,
-            color_selected="red",
-            marker="sphere",
+        self._cache = InterpolationCache(
+            max_size=max_size, resolution=resolution
         )
 
-        # scatter.selected = tri[0]
+    def disable_cache(self) -> None:
 
-        for s1, s2 in segs:
-            ipv.plot(
-                [points[s1, 0], points[s2, 0]],
-                [points[s1, 1], points[s2, 1]],
-                [points[s1, 2], points[s2, 2]],
-                color=grid_color2,
-                alpha=0.5,
-            )
+        self._cache = None
 
-        if selected_location is not None:
+    def enable_pixel_cache(
+        self,
+        resolution: float = 5.0,
+        refine: bool = False,
+        file_name: Optional[Union[str, Path]] = None,
+        storage_type: str = "auto",
+        storage_options: Optional[Dict[str, Any]] = None,
+        chunk_size: int = 256,
+    ) -> None:
+        """
+        pre interpolate the database onto an equal area pixelization
+        of the sky (equally spaced in RA and sin(Dec), see
+        utils.pixel_cache) so that interpolate_to_position(s) find
+        the matrix by index arithmetic instead of a simplex search.
+        This costs the memory of one matrix per node (~ 41000 nodes
+        at 1 deg) and a one time build.
+
+        The nodes can be kept in a .npy file that is memory mapped,
+        so only the pages of the visited pixels are read. An
+        existing file is reused if it holds the right number of
+        nodes and a few of them match the database, otherwise it
+        is rebuilt.
+
+        The point location (locate, locate_with_gradient) and so
+        fold then blend still use the triangulation.
+
+        :param resolution: the width of the pixels in degree
+        :type resolution: float
+        :param refine: blend the three nodes around a position
+        instead of using the nearest node
+        :type refine: bool
+        :param file_name: the .npy file to memory map the nodes from
+        :type file_name: Optional[Union[str, Path]]
+        :param storage_type: how to store the nodes in memory, see
+        the ResponseDatabase. Memory mapped nodes stay dense
+        :type storage_type: str
+        :param storage_options: options of the storage
+        :type storage_options: Optional[Dict[str, Any]]
+        :param chunk_size: the number of nodes interpolated at once
+        :type chunk_size: int
+        :returns:
 
-            theta, phi = self._transform_to_instrument_coordinates(
-                *selected_location
-            )
+        """
 
-            this_point = lonlat2xyz(phi, theta)
+        if resolution <= 0:
 
-            bbc, tri = self._triangulation.containing_simplex_and_bcc(
-                phi, theta
-            )
+            log.error("the resolution must be positive")
 
-            ipv.scatter(
-                points[tri, 0],
-                points[tri, 1],
-                points[tri, 2],
-                color=selected_color,
-                marker="sphere",
-            )
+            raise RuntimeError()
+
+        # the nodes are made with the triangulation
+
+        self._pixel_cache = None
+
+        _, _, ra, dec = pixel_nodes(resolution)
+
+        shape = (len(ra),) + tuple(self._matrix_shape)
+
+        nodes = None
+
+        if file_name is not None and Path(file_name).exists():
+
+            nodes = np.load(file_name, mmap_mode="r")
+
+            if nodes.shape != shape or not self._check_nodes(ra, dec, nodes):
+
+                log.info(f"{file_name} does not match, rebuilding it")
+
+                nodes = None
+
+        if nodes is None:
+
+            log.info(f"interpolating the database onto {len(ra)} nodes")
+
+            if file_name is None:
+
+                nodes = np.empty(shape)
+
+            else:
+
+                nodes = np.lib.format.open_memmap(
+                    file_name, mode="w+", dtype=np.float64, shape=shape
+                )
+
+            for start in range(0, len(ra), chunk_size):
+
+                rows = slice(start, min(start + chunk_size, len(ra)))
+
+                self.interpolate_to_positions(ra[rows], dec[rows], nodes[rows])
+
+            if file_name is not None:
+
+                nodes.flush()
+
+                del nodes
+
+                nodes = np.load(file_name, mmap_mode="r")
+
+        self._pixel_cache = PixelCache(
+            build_storage(
+                nodes, storage_type=storage_type, **(storage_options or {})
+            ),
+            resolution=resolution,
+            refine=refine,
+        )
+
+    def _check_nodes(
+        self, ra: np.ndarray, dec: np.ndarray, nodes: np.ndarray
+    ) -> bool:
 
-            ipv.pylab.scatter(*this_point, color=point_color, marker="sphere")
+        check = np.linspace(0, len(ra) - 1, 3).astype(int)
 
-        ipv.xyzlim(1.1)
-        ipv.pylab.style.box_off()
+        expected = self.interpolate_to_positions(ra[check], dec[check])
 
-        fig.camera.up = [0, 0, 1]
-        control = pythreejs.OrbitControls(controlling=fig.camera)
-        fig.controls = control
-        control.autoRotate = True
-        fig.render_continuous = True
+        return np.allclose(nodes[check], expected)
 
-        ipv.show()
+    def disable_pixel_cache(self) -> None:
 
+        self._pixel_cache = None
 
-#        return fig
+    @property
+    def pixel_cache_info(self) -> Optional[Dict[str, Any]]:
+        """
+        the resolution, refinement, nodes and bytes
+        of the pixel cache if it is enabled
+        """
+
+        if self._pixel_cache is None:
+
+            return None
+
+        return self._pixel_cache.info
+
+    @property
+    def cache_info(self) -> Optional[Dict[str, int]]:
+        """
+        the hits, misses and size of the
+        interpolation cache if it is enabled
+        """
+
+        if self._cache is None:
+
+            return None
+
+        return self._cache.info
+
+    @property
+    def instrumentation_enabled(self) -> bool:
+
+        return self._timers is not None
+
+    def enable_instrumentation(self, reset: bool = False) -> None:
+        """
+        count the calls and time the stages of the interpolation
+        (cache_hit, lookup, blend and their batch versions) and
+        track the peak memory. This costs a few us per
+        interpolation, when disabled only an is None check remains.
+
+        :param reset: reset the counters, including those of
+        the cache and the point location
+        :type reset: bool
+        :returns:
+
+        """
+
+        if self._timers is None:
+
+            self._timers = StageTimers()
+
+        elif reset:
+
+            self._timers.reset()
+
+        if reset:
+
+            # the cache and the locator count all the time
+
+            if self._cache is not None:
+
+                self._cache.reset_info()
+
+            self._locator.reset_statistics()
+
+    def disable_instrumentation(self) -> None:
+
+        self._timers = None
+
+    def _nbytes(self) -> int:
+
+        nbytes = self._storage.nbytes
+
+        if self._cache is not None:
+
+            nbytes += self._cache.nbytes
+
+        if self._pixel_cache is not None:
+
+            nbytes += self._pixel_cache.nbytes
+
+        return nbytes
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        the stats of the database: the calls and wall time of each
+        stage when instrumentation is enabled, the hit ratio of the
+        interpolation cache, the walks of the point location and the
+        memory of the matrices and the cache in bytes. Use
+        utils.instrumentation.to_json to export them
+
+        :returns: the stats
+
+        """
+
+        stages = self._timers.stats() if self._timers is not None else {}
+
+        cache = None
+
+        if self._cache is not None:
+
+            cache = self._cache.info
+
+            cache["hit_ratio"] = hit_ratio(cache["hits"], cache["misses"])
+
+        nbytes = self._nbytes()
+
+        peak = self._timers.peak_nbytes if self._timers is not None else 0
+
+        return dict(
+            instrumentation=self._timers is not None,
+            stages=stages,
+            cache=cache,
+            pixel_cache=self.pixel_cache_info,
+            locator=self._locator.walk_statistics,
+            memory=dict(
+                storage=type(self._storage).__name__,
+                storage_nbytes=self._storage.nbytes,
+                nbytes=nbytes,
+                peak_nbytes=max(peak, nbytes),
+            ),
+        )
+
+    def interpolate_to_position(self, ra: float, dec: float) -> None:
+
+        self._handle.interpolate_to_position(ra, dec)
+
+    def _interpolate_into(
+        self,
+        ra: float,
+        dec: float,
+        out: np.ndarray,
+        block: Optional[Tuple[np.ndarray, int, int]] = None,
+    ) -> None:
+        """
+        interpolate the matrix at a position into a buffer without
+        touching the current response
+
+        :param ra: the RA in degree
+        :type ra: float
+        :param dec: the Dec in degree
+        :type dec: float
+        :param out: the buffer to write the matrix to
+        :type out: np.ndarray
+        :param block: only write these (rows, start column, stop
+        column) of the matrix, the rest of out must be zero
+        :type block: Optional[Tuple[np.ndarray, int, int]]
+        :returns:
+
+        """
+
+        timers = self._timers
+
+        if timers is not None:
+
+            start = perf_counter()
+
+        if self._pixel_cache is not None:
+
+            self._pixel_cache.interpolate(ra, dec, out, block)
+
+            if timers is not None:
+
+                timers.record("pixel_lookup", start)
+
+            return
+
+        if self._cache is not None:
+
+            key = self._cache.key(ra, dec)
+
+            if block is not None:
+
+                # the matrices of a block are zero outside of it
+
+                key = (key, block[0].tobytes(), block[1], block[2])
+
+            matrix = self._cache.get(key)
+
+            if matrix is not None:
+
+                np.copyto(out, matrix)
+
+                if timers is not None:
+
+                    timers.record("cache_hit", start)
 
+                return
 
-# @nb.njit(fastmath=True)
-def _linear_interpolation(
-    weights: np.ndarray, super_matrix: np.ndarray
-) -> np.ndarray:
+        weights, simplex = self.locate(ra, dec)
 
-    shape = super_matrix[0].shape
+        if timers is not None:
 
-    out = np.zeros((shape[0], shape[1]))
+            start = timers.record("lookup", start)
 
-    for i in range(3):
+        if block is None:
+
+            self._storage.interpolate(weights, simplex, out)
+
+        else:
+
+            self._storage.interpolate_block(weights, simplex, *block, out)
+
+        if self._cache is not None:
+
+            self._cache.put(key, out)
+
+        if timers is not None:
+
+            timers.record("blend", start)
+
+            timers.update_peak(self._nbytes())
+
+    def interpolate_to_positions(
+        self,
+        ra: np.ndarray,
+        dec: np.ndarray,
+        out: Optional[np.ndarray] = None,
+    ) -> np.ndarray:
+        """
+        interpolate the response to many positions at once. The
+        current response is not touched.
+
+        :param ra: the RAs in degree
+        :type ra: np.ndarray
+        :param dec: the Decs in degree
+        :type dec: np.ndarray
+        :param out: an optional (N, N ebounds, N mc) buffer to write to
+        :type out: Optional[np.ndarray]
+        :returns: the (N, N ebounds, N mc) stack of matrices
+
+        """
+
+        ra = np.atleast_1d(np.asarray(ra, dtype=float))
+        dec = np.atleast_1d(np.asarray(dec, dtype=float))
+
+        if ra.shape != dec.shape:
+
+            log.error("ra and dec must have the same shape")
+
+            raise AssertionError()
+
+        shape = (ra.shape[0],) + tuple(self._matrix_shape)
+
+        if out is None:
+
+            out = np.empty(shape)
+
+        elif out.shape != shape or out.dtype != np.float64:
+
+            log.error(f"out must be a float64 array of shape {shape}")
+
+            raise AssertionError()
+
+        timers = self._timers
+
+        if timers is not None:
+
+            start = perf_counter()
+
+        if self._pixel_cache is not None:
+
+            self._pixel_cache.interpolate_many(ra, dec, out)
+
+            if timers is not None:
+
+                timers.record("batch_pixel_lookup", start)
+
+            return out
+
+        theta, phi = self._transform_to_instrument_coordinates(ra, dec)
+
+        # a single search for all points
+
+        bbc, tri = self._locator.locate_many(theta, phi)
+
+        if timers is not None:
+
+            start = timers.record("batch_lookup", start)
+
+        self._storage.interpolate_many(bbc, tri, out)
+
+        if timers is not None:
+
+            timers.record("batch_blend", start)
+
+            timers.update_peak(self._nbytes())
+
+        return out
+
+    def _get_simplex_neighbours(self, simplex: np.ndarray) -> np.ndarray:
+        """
+        the vertices that share an edge with the vertices
+        of the simplex, i.e. those of the neighbouring triangles
+
+        :param simplex: the indices of the vertices of the simplex
+        :type simplex: np.ndarray
+        :returns:
+
+        """
+
+        if self._vertex_neighbours is None:
+
+            self._vertex_neighbours = [
+                set() for _ in range(self._n_grid_points)
+            ]
+
+            for a, b in self._locator.segments:
+
+                self._vertex_neighbours[a].add(b)
+                self._vertex_neighbours[b].add(a)
+
+        neighbours = set()
+
+        for v in simplex:
+
+            neighbours.update(self._vertex_neighbours[v])
+
+        neighbours.difference_update(simplex)
+
+        return np.fromiter(neighbours, dtype=int)
+
+    @property
+    def current_sky_position(self) -> Tuple[float]:
+        return self._handle.current_sky_position
+
+    def plot_verticies(self):
+        """
+        plot the grid and its triangulation with matplotlib. Needs
+        the plotting extra, see rball.plotting
+
+        :returns: the figure
+
+        """
+
+        from .plotting import plot_verticies
+
+        return plot_verticies(self)
+
+    def plot_verticies_ipv(
+        self, selected_location: Optional[Iterable[float]] = None
+    ) -> None:
+        """
+        show the grid and its triangulation with ipyvolume. Needs
+        the plotting extra, see rball.plotting
+
+        :param selected_location: ra, dec tuple in degree
+
+        """
 
-        out += weights[i] * super_matrix[i]
+        from .plotting import plot_verticies_ipv
 
-    return out
+        plot_verticies_ipv(self, selected_location=selected_location)
@@ -0,0 +1,193 @@
+from typing import TYPE_CHECKING, Optional, Tuple
+
+import numpy as np
+
+from .utils.logging import setup_logger
+
+if TYPE_CHECKING:
+
+    from .interpolated_response import InterpolatedResponse
+    from .response_database import ResponseDatabase
+
+log = setup_logger(__name__)
+
+
+class ResponseHandle:
+    def __init__(self, response_database: "ResponseDatabase"):
+        """
+        A view of a ResponseDatabase at one position. The matrices,
+        the triangulation and the cache are shared with the database
+        while the interpolated matrix, its 3ML response and the
+        position belong to the handle. Several plugins or threads
+        can therefore each hold a handle of the same database
+        without overwriting each others response.
+
+        Handles are created with ResponseDatabase.create_handle
+
+        :param response_database: the database
+        :type response_database: ResponseDatabase
+        :returns:
+
+        """
+
+        self._database: "ResponseDatabase" = response_database
+
+        # the interpolation is written straight into the matrix of
+        # the response so that no new matrices are allocated and
+        # the response does not have to be updated in the hot path
+
+        # the response is a threeML object, so threeML is only
+        # imported once a handle is needed
+
+        from .interpolated_response import InterpolatedResponse
+
+        self._current_matrix: InterpolatedResponse = InterpolatedResponse(
+            matrix=response_database.storage.get_matrix(0),
+            ebounds=response_database.ebounds,
+            monte_carlo_energies=response_database.monte_carlo_energies,
+        )
+
+        self._current_ra: Optional[float] = None
+        self._current_dec: Optional[float] = None
+
+        # the (rows, start column, stop column) that are interpolated
+        # or None for the full matrix
+
+        self._block: Optional[Tuple[np.ndarray, int, int]] = None
+
+    @property
+    def database(self) -> "ResponseDatabase":
+        """
+        the database this handle views
+        """
+        return self._database
+
+    @property
+    def current_response(self) -> "InterpolatedResponse":
+
+        return self._current_matrix
+
+    @property
+    def current_sky_position(self) -> Tuple[float]:
+
+        return self._current_ra, self._current_dec
+
+    def locate(self, ra: float, dec: float) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        find the simplex containing a position and the normalized
+        barycentric weights of its vertices
+
+        :param ra: the RA in degree
+        :type ra: float
+        :param dec: the Dec in degree
+        :type dec: float
+        :returns: (weights, vertex indices)
+
+        """
+
+        return self._database.locate(ra, dec)
+
+    def interpolate_to_position(self, ra: float, dec: float) -> None:
+        """
+        interpolate the response of this handle to a position
+
+        :param ra: the RA in degree
+        :type ra: float
+        :param dec: the Dec in degree
+        :type dec: float
+        :returns:
+
+        """
+
+        self._database._interpolate_into(
+            ra, dec, self._current_matrix.buffer, self._block
+        )
+
+        self._current_ra = ra
+        self._current_dec = dec
+
+    @property
+    def block(self) -> Optional[Tuple[np.ndarray, int, int]]:
+        """
+        the (rows, start column, stop column) of the matrix that
+        are interpolated or None if it is the full matrix
+        """
+
+        return self._block
+
+    def restrict(
+        self,
+        rows: Optional[np.ndarray] = None,
+        columns: Optional[Tuple[int, int]] = None,
+    ) -> None:
+        """
+        only interpolate a block of the matrix, e.g. the active
+        channels and the MC bins where the spectrum has flux. The
+        rest of the matrix is set to zero once here, so folding a
+        spectrum gives the counts of the block. Call without
+        arguments to interpolate the full matrix again.
+
+        :param rows: the rows (channels) to interpolate, all if None
+        :type rows: Optional[np.ndarray]
+        :param columns: the (start, stop) of the columns (MC bins)
+        to interpolate, all if None
+        :type columns: Optional[Tuple[int, int]]
+        :returns:
+
+        """
+
+        n_rows, n_columns = self._current_matrix.buffer.shape
+
+        if rows is None:
+
+            rows = np.arange(n_rows)
+
+        rows = np.ascontiguousarray(rows, dtype=np.int64)
+
+        start, stop = (0, n_columns) if columns is None else columns
+
+        if not (0 <= start <= stop <= n_columns):
+
+            log.error(f"the columns {start}, {stop} are not within the matrix")
+
+            raise RuntimeError()
+
+        if len(rows) > 0 and (rows.min() < 0 or rows.max() >= n_rows):
+
+            log.error("the rows are not within the matrix")
+
+            raise RuntimeError()
+
+        if len(rows) == n_rows and start == 0 and stop == n_columns:
+
+            block = None
+
+        else:
+
+            block = (rows, int(start), int(stop))
+
+        if _same_block(block, self._block):
+
+            return
+
+        self._block = block
+
+        if block is not None:
+
+            self._current_matrix.buffer[:] = 0.0
+
+        if self._current_ra is not None:
+
+            self.interpolate_to_position(self._current_ra, self._current_dec)
+
+
+def _same_block(
+    a: Optional[Tuple[np.ndarray, int, int]],
+    b: Optional[Tuple[np.ndarray, int, int]],
+) -> bool:
+
+    if a is None or b is None:
+
+        return a is b
+
+    return a[1:] == b[1:] and np.array_equal(a[0], b[0])
@@ -0,0 +1,187 @@
+from itertools import product
+from typing import TYPE_CHECKING, Tuple
+
+import numpy as np
+
+from .point_location import lonlat2xyz
+from .utils.logging import setup_logger
+
+if TYPE_CHECKING:
+
+    from .response_database import ResponseDatabase
+
+log = setup_logger(__name__)
+
+
+def sky_scan_positions(
+    database: "ResponseDatabase", subdivisions: int = 0
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    the sky positions of the grid points of a database and, if
+    subdivisions > 0, of a finer grid that splits every edge of the
+    triangulation into subdivisions + 1 parts and fills the
+    simplices accordingly. Points shared by neighbouring simplices
+    are only returned once.
+
+    :param database: the database to scan
+    :type database: ResponseDatabase
+    :param subdivisions: the number of extra points per edge
+    :type subdivisions: int
+    :returns: (ra, dec) in degrees
+
+    """
+
+    if subdivisions < 0:
+
+        log.error("subdivisions must be >= 0")
+
+        raise AssertionError()
+
+    ra, dec = database._transform_to_sky_coordinates(
+        database.theta, database.phi
+    )
+
+    if subdivisions == 0:
+
+        return ra, dec
+
+    n = subdivisions + 1
+
+    # the barycentric coordinates of the new points of a simplex,
+    # i.e. all but the corners
+
+    barycentric = np.array(
+        [
+            (i, j, n - i - j)
+            for i, j in product(range(n + 1), repeat=2)
+            if i + j <= n and max(i, j, n - i - j) < n
+        ],
+        dtype=float,
+    ) / float(n)
+
+    # subdivide on the sky so that the new points lie between
+    # the sky positions of the vertices
+
+    corners = lonlat2xyz(np.deg2rad(ra), np.deg2rad(dec))[
+        database.locator.simplices
+    ]
+
+    xyz = np.einsum("pk,skx->spx", barycentric, corners).reshape(-1, 3)
+
+    xyz /= np.linalg.norm(xyz, axis=1)[:, np.newaxis]
+
+    xyz = np.unique(np.round(xyz, 10), axis=0)
+
+    sub_ra = np.rad2deg(np.arctan2(xyz[:, 1], xyz[:, 0])) % 360.0
+
+    sub_dec = np.rad2deg(np.arcsin(np.clip(xyz[:, 2], -1.0, 1.0)))
+
+    return np.concatenate([ra, sub_ra]), np.concatenate([dec, sub_dec])
+
+
+class SkyScan:
+    def __init__(
+        self,
+        ra: np.ndarray,
+        dec: np.ndarray,
+        log_like: np.ndarray,
+        null_log_like: float,
+        scale: np.ndarray,
+    ):
+        """
+        The profile likelihood of a point source over a set of sky
+        positions as made by RBallLike.scan_sky
+
+        :param ra: the RA of the positions in degrees
+        :type ra: np.ndarray
+        :param dec: the Dec of the positions in degrees
+        :type dec: np.ndarray
+        :param log_like: the profile log likelihood at each position
+        :type log_like: np.ndarray
+        :param null_log_like: the log likelihood without the source
+        :type null_log_like: float
+        :param scale: the factor of the best fit spectrum at each
+        position relative to the spectrum of the model
+        :type scale: np.ndarray
+        :returns:
+
+        """
+
+        self._ra: np.ndarray = ra
+        self._dec: np.ndarray = dec
+        self._log_like: np.ndarray = log_like
+        self._null_log_like: float = null_log_like
+        self._scale: np.ndarray = scale
+
+    @property
+    def ra(self) -> np.ndarray:
+
+        return self._ra
+
+    @property
+    def dec(self) -> np.ndarray:
+
+        return self._dec
+
+    @property
+    def log_like(self) -> np.ndarray:
+
+        return self._log_like
+
+    @property
+    def null_log_like(self) -> float:
+
+        return self._null_log_like
+
+    @property
+    def scale(self) -> np.ndarray:
+
+        return self._scale
+
+    @property
+    def ts(self) -> np.ndarray:
+        """
+        the test statistic 2 (logL - logL without the source). It is
+        inf if the data cannot be explained without the source, e.g.
+        when there is no background
+        """
+
+        return np.clip(2.0 * (self._log_like - self._null_log_like), 0, None)
+
+    @property
+    def delta_log_like(self) -> np.ndarray:
+        """
+        the log likelihood below the best position
+        """
+
+        return self._log_like.max() - self._log_like
+
+    @property
+    def n_positions(self) -> int:
+
+        return len(self._ra)
+
+    @property
+    def best_position(self) -> Tuple[float, float]:
+        """
+        the (ra, dec) with the highest likelihood
+        """
+
+        idx = np.argmax(self._log_like)
+
+        return float(self._ra[idx]), float(self._dec[idx])
+
+    def best_positions(self, n: int = 5) -> np.ndarray:
+        """
+        the positions with the highest likelihood, e.g. to seed the
+        walkers of a sampler near the mode
+
+        :param n: the number of positions
+        :type n: int
+        :returns: (n, 2) array of (ra, dec), the best first
+
+        """
+
+        idx = np.argsort(self._log_like)[::-1][:n]
+
+        return np.stack([self._ra[idx], self._dec[idx]], axis=1)
@@ -0,0 +1,17 @@
+from .base import MatrixStorage
+from .dense import DenseMatrixStorage
+from .factory import build_storage
+from .lazy import LazyMatrixStorage
+from .low_rank import LowRankMatrixStorage
+from .shared import SharedMatrixStorage
+from .sparse import SparseMatrixStorage
+
+__all__ = [
+    "MatrixStorage",
+    "DenseMatrixStorage",
+    "LazyMatrixStorage",
+    "LowRankMatrixStorage",
+    "SharedMatrixStorage",
+    "SparseMatrixStorage",
+    "build_storage",
+]
@@ -0,0 +1,202 @@
+from typing import Tuple
+
+import numpy as np
+
+from .kernels import _blend_three
+
+
+class MatrixStorage:
+    """
+    The base class for the storage of the grid point matrices
+    of a ResponseDatabase. A storage knows how to hand out single
+    vertex matrices and how to blend the three matrices of a
+    simplex into an output buffer.
+
+    Subclasses must implement get_matrix and the n_grid_points,
+    matrix_shape and dtype properties and should override
+    interpolate when they can blend faster than by
+    fetching the vertex matrices one by one.
+    """
+
+    @property
+    def n_grid_points(self) -> int:
+
+        raise NotImplementedError()
+
+    @property
+    def matrix_shape(self) -> Tuple[int, int]:
+
+        raise NotImplementedError()
+
+    @property
+    def dtype(self) -> np.dtype:
+
+        raise NotImplementedError()
+
+    @property
+    def nbytes(self) -> int:
+        """
+        the number of bytes of matrix data held in memory
+        """
+
+        raise NotImplementedError()
+
+    def get_matrix(self, index: int) -> np.ndarray:
+        """
+        get the matrix of a single grid point
+
+        :param index: the index of the grid point
+        :type index: int
+        :returns: the (N ebounds, N mc) matrix
+
+        """
+
+        raise NotImplementedError()
+
+    def to_array(self) -> np.ndarray:
+        """
+        the full (N grid points, N ebounds, N mc) stack.
+        For storages that do not keep the stack in memory
+        this materializes it!
+
+        :returns:
+
+        """
+
+        out = np.empty((self.n_grid_points,) + self.matrix_shape, self.dtype)
+
+        for i in range(self.n_grid_points):
+
+            out[i] = self.get_matrix(i)
+
+        return out
+
+    def interpolate(
+        self, weights: np.ndarray, indices: np.ndarray, out: np.ndarray
+    ) -> np.ndarray:
+        """
+        blend the matrices of the three vertices of a simplex
+        into out. The blend must be linear in the weights, they
+        are not normalized when the derivatives of the weights
+        are blended
+
+        :param weights: the barycentric weights
+        :type weights: np.ndarray
+        :param indices: the indices of the vertices
+        :type indices: np.ndarray
+        :param out: the (N ebounds, N mc) output buffer
+        :type out: np.ndarray
+        :returns: out
+
+        """
+
+        return _blend_three(
+            weights,
+            self.get_matrix(indices[0]),
+            self.get_matrix(indices[1]),
+            self.get_matrix(indices[2]),
+            out,
+        )
+
+    def interpolate_many(
+        self, weights: np.ndarray, indices: np.ndarray, out: np.ndarray
+    ) -> np.ndarray:
+        """
+        blend the simplices of many points at once
+
+        :param weights: the (N points, 3) barycentric weights
+        :type weights: np.ndarray
+        :param indices: the (N points, 3) vertex indices
+        :type indices: np.ndarray
+        :param out: the (N points, N ebounds, N mc) output buffer
+        :type out: np.ndarray
+        :returns: out
+
+        """
+
+        for n in range(weights.shape[0]):
+
+            self.interpolate(weights[n], indices[n], out[n])
+
+        return out
+
+    def interpolate_block(
+        self,
+        weights: np.ndarray,
+        indices: np.ndarray,
+        rows: np.ndarray,
+        start: int,
+        stop: int,
+        out: np.ndarray,
+    ) -> np.ndarray:
+        """
+        blend only a block of the matrices of the three vertices of
+        a simplex into out, e.g. the active channels and a window of
+        MC energies. The rest of out is not touched
+
+        :param weights: the barycentric weights
+        :type weights: np.ndarray
+        :param indices: the indices of the vertices
+        :type indices: np.ndarray
+        :param rows: the rows (channels) to blend
+        :type rows: np.ndarray
+        :param start: the first column (MC bin) to blend
+        :type start: int
+        :param stop: one past the last column to blend
+        :type stop: int
+        :param out: the (N ebounds, N mc) output buffer
+        :type out: np.ndarray
+        :returns: out
+
+        """
+
+        block = 0.0
+
+        for w, index in zip(weights, indices):
+
+            block = block + w * self.get_matrix(index)[rows, start:stop]
+
+        out[rows, start:stop] = block
+
+        return out
+
+    def fold(self, index: int, fluxes: np.ndarray) -> np.ndarray:
+        """
+        fold the photon fluxes through the matrix of a single
+        grid point
+
+        :param index: the index of the grid point
+        :type index: int
+        :param fluxes: the fluxes in the N mc bins
+        :type fluxes: np.ndarray
+        :returns: the counts in the N ebounds channels
+
+        """
+
+        return self.get_matrix(index).dot(fluxes)
+
+    @property
+    def wants_prefetch(self) -> bool:
+        """
+        if the storage would like to be told which
+        vertices are likely to be needed next
+        """
+
+        return False
+
+    def prefetch(self, indices: np.ndarray) -> None:
+        """
+        hint that the given vertices are likely to be
+        needed soon. Does nothing by default
+
+        :param indices: the indices of the vertices
+        :type indices: np.ndarray
+        :returns:
+
+        """
+
+        pass
+
+    def __len__(self) -> int:
+
+        return self.n_grid_points
@@ -0,0 +1,360 @@
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+
+from ..utils.logging import setup_logger
+from .base import MatrixStorage
+from .kernels import (
+    _batch_decoded_interpolation,
+    _batch_linear_interpolation,
+    _block_interpolation,
+    _decoded_block_interpolation,
+    _decoded_interpolation,
+    _linear_interpolation,
+)
+
+log = setup_logger(__name__)
+
+_precisions = (None, "float64", "float32", "float16", "uint16")
+
+# the float64 value of every float16 bit pattern
+
+_float16_table: Optional[np.ndarray] = None
+
+
+def _get_float16_table() -> np.ndarray:
+
+    global _float16_table
+
+    if _float16_table is None:
+
+        _float16_table = (
+            np.arange(2**16, dtype=np.uint16)
+            .view(np.float16)
+            .astype(np.float64)
+        )
+
+    return _float16_table
+
+
+class DenseMatrixStorage(MatrixStorage):
+
+    # reduced precision is only set up in __init__, subclasses
+    # that build the stack themselves keep full precision
+
+    _precision: Optional[str] = None
+    _scales: Optional[np.ndarray] = None
+    _table: Optional[np.ndarray] = None
+    _precision_error: Optional[Dict[str, Any]] = None
+
+    def __init__(self, matrices: np.ndarray, precision: Optional[str] = None):
+        """
+        Keeps the full (N grid points, N ebounds, N mc) stack as
+        a single array. This can also be a read only memory map
+        (e.g. from np.load(file_name, mmap_mode="r")) in which case
+        only the pages of the vertices that are used are read.
+
+        The stack can be stored with a reduced precision to save
+        memory and bandwidth. The blend is always accumulated in
+        float64.
+
+        * float32: the values are cast
+        * float16: the float16 bit patterns are decoded with a
+          lookup table as numba has no float16 arithmetic
+        * uint16: each matrix is quantized linearly between zero
+          and its maximum, the scale is folded into the weights
+
+        :param matrices: the stack of matrices
+        :type matrices: np.ndarray
+        :param precision: None or float64 to keep the stack as it
+        is, float32, float16 or uint16
+        :type precision: Optional[str]
+        :returns:
+
+        """
+
+        if precision not in _precisions:
+
+            log.error(f"precision must be one of {_precisions} not {precision}")
+
+            raise RuntimeError()
+
+        if precision == "float64":
+
+            precision = None
+
+        self._is_memory_mapped: bool = (
+            isinstance(matrices, np.memmap) and precision is None
+        )
+
+        if self._is_memory_mapped:
+
+            # remember where the map came from so that
+            # pickling does not copy the whole stack
+
+            self._mmap_info = dict(
+                filename=matrices.filename,
+                dtype=matrices.dtype,
+                offset=matrices.offset,
+                shape=matrices.shape,
+            )
+
+        if precision is not None:
+
+            matrices = self._encode(np.asarray(matrices), precision)
+
+        # the compiled kernel gathers the vertex matrices straight
+        # out of the stack, so we want it contiguous in memory
+
+        self._matrices: np.ndarray = np.ascontiguousarray(matrices)
+
+    def _encode(self, matrices: np.ndarray, precision: str) -> np.ndarray:
+
+        original = matrices
+
+        if not np.all(np.isfinite(original)):
+
+            log.error("the matrices must be finite for a reduced precision")
+
+            raise RuntimeError()
+
+        if precision == "float32":
+
+            encoded = original.astype(np.float32)
+
+        elif precision == "float16":
+
+            if np.abs(original).max() > np.finfo(np.float16).max:
+
+                log.error("the matrices exceed the range of float16")
+
+                raise RuntimeError()
+
+            self._table = _get_float16_table()
+
+            encoded = original.astype(np.float16).view(np.uint16)
+
+        else:
+
+            if np.any(original < 0):
+
+                log.error("uint16 storage needs non negative matrices")
+
+                raise RuntimeError()
+
+            peaks = original.reshape(len(original), -1).max(axis=1)
+
+            self._scales = np.where(peaks > 0, peaks / (2**16 - 1), 1.0)
+
+            encoded = np.rint(
+                original / self._scales[:, np.newaxis, np.newaxis]
+            ).astype(np.uint16)
+
+        self._precision = precision
+
+        self._matrices = encoded
+
+        self._precision_error = self._compare(original)
+
+        log.info(
+            f"stored the matrices as {precision} with a max relative "
+            f"error of {self._precision_error['max_relative_error']:.2e} "
+            f"at {self._precision_error['compression']:.1f}x compression"
+        )
+
+        return encoded
+
+    def _compare(self, original: np.ndarray) -> Dict[str, Any]:
+
+        errors = np.empty(len(original))
+
+        for i in range(len(original)):
+
+            peak = np.abs(original[i]).max()
+
+            difference = np.abs(self.get_matrix(i) - original[i]).max()
+
+            errors[i] = difference / peak if peak > 0 else difference
+
+        return dict(
+            precision=self._precision,
+            max_relative_error=float(errors.max()),
+            mean_relative_error=float(errors.mean()),
+            compression=original.nbytes / self.nbytes,
+        )
+
+    @property
+    def precision(self) -> str:
+        """
+        the precision the matrices are stored with
+        """
+
+        if self._precision is None:
+
+            return self._matrices.dtype.name
+
+        return self._precision
+
+    @property
+    def precision_error(self) -> Optional[Dict[str, Any]]:
+        """
+        the error of the reduced precision: the max and mean over
+        the matrices of max|stored - original| / max|original| and
+        the compression. None for full precision
+        """
+
+        return self._precision_error
+
+    @property
+    def n_grid_points(self) -> int:
+
+        return self._matrices.shape[0]
+
+    @property
+    def matrix_shape(self) -> Tuple[int, int]:
+
+        return self._matrices.shape[1:]
+
+    @property
+    def dtype(self) -> np.dtype:
+
+        # reduced precision matrices are handed out as float64
+
+        if self._precision is not None:
+
+            return np.dtype(np.float64)
+
+        return self._matrices.dtype
+
+    @property
+    def nbytes(self) -> int:
+
+        if self._is_memory_mapped:
+
+            return 0
+
+        if self._scales is not None:
+
+            return self._matrices.nbytes + self._scales.nbytes
+
+        return self._matrices.nbytes
+
+    def get_matrix(self, index: int) -> np.ndarray:
+
+        if self._precision is None:
+
+            return self._matrices[index]
+
+        if self._precision == "float16":
+
+            return self._table[self._matrices[index]]
+
+        if self._precision == "uint16":
+
+            return self._matrices[index] * self._scales[index]
+
+        return self._matrices[index].astype(np.float64)
+
+    def to_array(self) -> np.ndarray:
+
+        if self._precision is None:
+
+            return self._matrices
+
+        if self._precision == "float16":
+
+            return self._table[self._matrices]
+
+        if self._precision == "uint16":
+
+            return self._matrices * self._scales[:, np.newaxis, np.newaxis]
+
+        return self._matrices.astype(np.float64)
+
+    def interpolate(
+        self, weights: np.ndarray, indices: np.ndarray, out: np.ndarray
+    ) -> np.ndarray:
+
+        if self._table is not None:
+
+            return _decoded_interpolation(
+                weights, indices, self._matrices, self._table, out
+            )
+
+        if self._scales is not None:
+
+            # the quantization scale of each vertex is
+            # folded into its weight
+
+            weights = weights * self._scales[indices]
+
+        return _linear_interpolation(weights, indices, self._matrices, out)
+
+    def interpolate_many(
+        self, weights: np.ndarray, indices: np.ndarray, out: np.ndarray
+    ) -> np.ndarray:
+
+        if self._table is not None:
+
+            return _batch_decoded_interpolation(
+                weights, indices, self._matrices, self._table, out
+            )
+
+        if self._scales is not None:
+
+            weights = weights * self._scales[indices]
+
+        return _batch_linear_interpolation(
+            weights, indices, self._matrices, out
+        )
+
+    def interpolate_block(
+        self,
+        weights: np.ndarray,
+        indices: np.ndarray,
+        rows: np.ndarray,
+        start: int,
+        stop: int,
+        out: np.ndarray,
+    ) -> np.ndarray:
+
+        if self._table is not None:
+
+            return _decoded_block_interpolation(
+                weights,
+                indices,
+                self._matrices,
+                self._table,
+                rows,
+                start,
+                stop,
+                out,
+            )
+
+        if self._scales is not None:
+
+            weights = weights * self._scales[indices]
+
+        return _block_interpolation(
+            weights, indices, self._matrices, rows, start, stop, out
+        )
+
+    def __getstate__(self):
+
+        if not self._is_memory_mapped:
+
+            return self.__dict__
+
+        state = self.__dict__.copy()
+
+        del state["_matrices"]
+
+        return state
+
+    def __setstate__(self, state):
+
+        self.__dict__.update(state)
+
+        if self._is_memory_mapped:
+
+            self._matrices = np.memmap(mode="r", **self._mmap_info)
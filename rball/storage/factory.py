@@ -0,0 +1,83 @@
+import numpy as np
+
+from ..utils.logging import setup_logger
+from .base import MatrixStorage
+from .dense import DenseMatrixStorage
+from .low_rank import LowRankMatrixStorage
+from .shared import SharedMatrixStorage
+from .sparse import SparseMatrixStorage, band_density
+
+log = setup_logger(__name__)
+
+_storage_types = ("auto", "dense", "sparse", "low_rank", "shared")
+
+
+def build_storage(
+    matrices: np.ndarray,
+    storage_type: str = "auto",
+    density_threshold: float = 0.25,
+    **storage_options,
+) -> MatrixStorage:
+    """
+    build the storage for a stack of matrices.
+
+    With auto, the matrices are stored sparsely if the band that
+    the sparse storage keeps, from the first to the last non zero
+    column of each row in any matrix, covers less than
+    density_threshold of a matrix. Memory maps always stay dense
+    as finding the pattern would read the whole file, as do
+    matrices with a reduced precision (storage_options
+    precision=float32, float16 or uint16). Low rank storage is
+    never chosen automatically as it is lossy. Shared storage puts
+    the dense stack into shared memory for the workers of a process
+    pool.
+
+    :param matrices: the (N grid points, N ebounds, N mc) stack
+    :type matrices: np.ndarray
+    :param storage_type: auto, dense, sparse, low_rank or shared
+    :type storage_type: str
+    :param density_threshold: the max density for sparse storage
+    :type density_threshold: float
+    :param storage_options: passed to the storage, e.g. the
+    tolerance of the low rank storage
+    :returns: MatrixStorage
+
+    """
+
+    if storage_type not in _storage_types:
+
+        log.error(
+            f"storage_type must be one of {_storage_types} not {storage_type}"
+        )
+
+        raise RuntimeError()
+
+    if storage_type == "dense":
+
+        return DenseMatrixStorage(matrices, **storage_options)
+
+    if storage_type == "sparse":
+
+        return SparseMatrixStorage(matrices)
+
+    if storage_type == "low_rank":
+
+        return LowRankMatrixStorage(matrices, **storage_options)
+
+    if storage_type == "shared":
+
+        return SharedMatrixStorage(matrices, **storage_options)
+
+    if isinstance(matrices, np.memmap) or "precision" in storage_options:
+
+        return DenseMatrixStorage(matrices, **storage_options)
+
+    density = band_density(matrices)
+
+    if density < density_threshold:
+
+        log.debug(f"the matrices have a density of {density}, storing sparse")
+
+        return SparseMatrixStorage(matrices)
+
+    return DenseMatrixStorage(matrices)
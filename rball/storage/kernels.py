@@ -0,0 +1,526 @@
+import numba as nb
+import numpy as np
+
+
+@nb.njit(fastmath=True, cache=True, nogil=True)
+def _linear_interpolation(
+    weights: np.ndarray,
+    indices: np.ndarray,
+    matrices: np.ndarray,
+    out: np.ndarray,
+) -> np.ndarray:
+    """
+    blend the three vertex matrices of a simplex with their
+    barycentric weights. The matrices are read directly out of the
+    stack via their indices and the result is written into out
+    in a single pass
+
+    :param weights: the three normalized barycentric weights
+    :type weights: np.ndarray
+    :param indices: the indices of the three vertices
+    :type indices: np.ndarray
+    :param matrices: the (N grid points, N ebounds, N mc) stack
+    :type matrices: np.ndarray
+    :param out: the (N ebounds, N mc) output buffer
+    :type out: np.ndarray
+    :returns: out
+
+    """
+
+    return _blend_three(
+        weights,
+        matrices[indices[0]],
+        matrices[indices[1]],
+        matrices[indices[2]],
+        out,
+    )
+
+
+@nb.njit(fastmath=True, cache=True, nogil=True)
+def _blend_three(
+    weights: np.ndarray,
+    m0: np.ndarray,
+    m1: np.ndarray,
+    m2: np.ndarray,
+    out: np.ndarray,
+) -> np.ndarray:
+    """
+    blend three matrices that do not live in the same
+    stack with their barycentric weights into out
+
+    :param weights: the three normalized barycentric weights
+    :type weights: np.ndarray
+    :param m0: the first vertex matrix
+    :type m0: np.ndarray
+    :param m1: the second vertex matrix
+    :type m1: np.ndarray
+    :param m2: the third vertex matrix
+    :type m2: np.ndarray
+    :param out: the output buffer
+    :type out: np.ndarray
+    :returns: out
+
+    """
+
+    w0 = weights[0]
+    w1 = weights[1]
+    w2 = weights[2]
+
+    for i in range(out.shape[0]):
+
+        for j in range(out.shape[1]):
+
+            out[i, j] = w0 * m0[i, j] + w1 * m1[i, j] + w2 * m2[i, j]
+
+    return out
+
+
+@nb.njit(fastmath=True, parallel=True, cache=True, nogil=True)
+def _batch_linear_interpolation(
+    weights: np.ndarray,
+    indices: np.ndarray,
+    matrices: np.ndarray,
+    out: np.ndarray,
+) -> np.ndarray:
+    """
+    blend many simplices at once. Each point is independent
+    so they are spread over the available threads
+
+    :param weights: the (N points, 3) barycentric weights
+    :type weights: np.ndarray
+    :param indices: the (N points, 3) vertex indices
+    :type indices: np.ndarray
+    :param matrices: the (N grid points, N ebounds, N mc) stack
+    :type matrices: np.ndarray
+    :param out: the (N points, N ebounds, N mc) output buffer
+    :type out: np.ndarray
+    :returns: out
+
+    """
+
+    for n in nb.prange(weights.shape[0]):
+
+        _blend_three(
+            weights[n],
+            matrices[indices[n, 0]],
+            matrices[indices[n, 1]],
+            matrices[indices[n, 2]],
+            out[n],
+        )
+
+    return out
+
+
+@nb.njit(fastmath=True, cache=True, nogil=True)
+def _decoded_interpolation(
+    weights: np.ndarray,
+    indices: np.ndarray,
+    codes: np.ndarray,
+    table: np.ndarray,
+    out: np.ndarray,
+) -> np.ndarray:
+    """
+    blend the three vertex matrices of a simplex which are stored
+    as 16 bit codes, e.g. the bits of float16 values. Each code is
+    decoded to float64 with a lookup table and the blend is
+    accumulated in float64
+
+    :param weights: the three normalized barycentric weights
+    :type weights: np.ndarray
+    :param indices: the indices of the three vertices
+    :type indices: np.ndarray
+    :param codes: the (N grid points, N ebounds, N mc) uint16 codes
+    :type codes: np.ndarray
+    :param table: the 65536 float64 values of the codes
+    :type table: np.ndarray
+    :param out: the (N ebounds, N mc) output buffer
+    :type out: np.ndarray
+    :returns: out
+
+    """
+
+    w0 = weights[0]
+    w1 = weights[1]
+    w2 = weights[2]
+
+    c0 = codes[indices[0]]
+    c1 = codes[indices[1]]
+    c2 = codes[indices[2]]
+
+    for i in range(out.shape[0]):
+
+        for j in range(out.shape[1]):
+
+            out[i, j] = (
+                w0 * table[c0[i, j]]
+                + w1 * table[c1[i, j]]
+                + w2 * table[c2[i, j]]
+            )
+
+    return out
+
+
+@nb.njit(fastmath=True, parallel=True, cache=True, nogil=True)
+def _batch_decoded_interpolation(
+    weights: np.ndarray,
+    indices: np.ndarray,
+    codes: np.ndarray,
+    table: np.ndarray,
+    out: np.ndarray,
+) -> np.ndarray:
+
+    for n in nb.prange(weights.shape[0]):
+
+        _decoded_interpolation(weights[n], indices[n], codes, table, out[n])
+
+    return out
+
+
+@nb.njit(fastmath=True, cache=True, nogil=True)
+def _block_interpolation(
+    weights: np.ndarray,
+    indices: np.ndarray,
+    matrices: np.ndarray,
+    rows: np.ndarray,
+    start: int,
+    stop: int,
+    out: np.ndarray,
+) -> np.ndarray:
+    """
+    blend only the given rows and the columns start to stop of
+    the three vertex matrices of a simplex. The rest of out is
+    not touched
+
+    :param weights: the three barycentric weights
+    :type weights: np.ndarray
+    :param indices: the indices of the three vertices
+    :type indices: np.ndarray
+    :param matrices: the (N grid points, N ebounds, N mc) stack
+    :type matrices: np.ndarray
+    :param rows: the rows to blend
+    :type rows: np.ndarray
+    :param start: the first column to blend
+    :type start: int
+    :param stop: one past the last column to blend
+    :type stop: int
+    :param out: the (N ebounds, N mc) output buffer
+    :type out: np.ndarray
+    :returns: out
+
+    """
+
+    w0 = weights[0]
+    w1 = weights[1]
+    w2 = weights[2]
+
+    m0 = matrices[indices[0]]
+    m1 = matrices[indices[1]]
+    m2 = matrices[indices[2]]
+
+    for r in range(rows.shape[0]):
+
+        # slices of the rows keep the inner loop free of
+        # index checks so that it is vectorized
+
+        i = rows[r]
+
+        row = out[i, start:stop]
+
+        a0 = m0[i, start:stop]
+        a1 = m1[i, start:stop]
+        a2 = m2[i, start:stop]
+
+        for k in range(row.shape[0]):
+
+            row[k] = w0 * a0[k] + w1 * a1[k] + w2 * a2[k]
+
+    return out
+
+
+@nb.njit(fastmath=True, cache=True, nogil=True)
+def _decoded_block_interpolation(
+    weights: np.ndarray,
+    indices: np.ndarray,
+    codes: np.ndarray,
+    table: np.ndarray,
+    rows: np.ndarray,
+    start: int,
+    stop: int,
+    out: np.ndarray,
+) -> np.ndarray:
+    """
+    _block_interpolation of 16 bit codes, see _decoded_interpolation
+    """
+
+    w0 = weights[0]
+    w1 = weights[1]
+    w2 = weights[2]
+
+    c0 = codes[indices[0]]
+    c1 = codes[indices[1]]
+    c2 = codes[indices[2]]
+
+    for r in range(rows.shape[0]):
+
+        i = rows[r]
+
+        row = out[i, start:stop]
+
+        a0 = c0[i, start:stop]
+        a1 = c1[i, start:stop]
+        a2 = c2[i, start:stop]
+
+        for k in range(row.shape[0]):
+
+            row[k] = w0 * table[a0[k]] + w1 * table[a1[k]] + w2 * table[a2[k]]
+
+    return out
+
+
+@nb.njit(fastmath=True, cache=True, nogil=True)
+def _banded_interpolation(
+    weights: np.ndarray,
+    indices: np.ndarray,
+    data: np.ndarray,
+    offsets: np.ndarray,
+    first_columns: np.ndarray,
+    out: np.ndarray,
+) -> np.ndarray:
+    """
+    blend the three vertex matrices of a simplex which are
+    stored as the values of a shared banded pattern and write
+    the result densely into out. Each row i holds the columns
+    first_columns[i] to first_columns[i] + offsets[i + 1] - offsets[i].
+    Only the stored values are read, the rest of out is set
+    to zero in the same pass
+
+    :param weights: the three normalized barycentric weights
+    :type weights: np.ndarray
+    :param indices: the indices of the three vertices
+    :type indices: np.ndarray
+    :param data: the (N grid points, N stored) values
+    :type data: np.ndarray
+    :param offsets: where each row starts in the values
+    :type offsets: np.ndarray
+    :param first_columns: the first stored column of each row
+    :type first_columns: np.ndarray
+    :param out: the (N ebounds, N mc) output buffer
+    :type out: np.ndarray
+    :returns: out
+
+    """
+
+    w0 = weights[0]
+    w1 = weights[1]
+    w2 = weights[2]
+
+    d0 = data[indices[0]]
+    d1 = data[indices[1]]
+    d2 = data[indices[2]]
+
+    n_columns = out.shape[1]
+
+    for i in range(out.shape[0]):
+
+        start = offsets[i]
+        lo = first_columns[i]
+        hi = lo + offsets[i + 1] - start
+
+        for j in range(lo):
+
+            out[i, j] = 0.0
+
+        for j in range(hi, n_columns):
+
+            out[i, j] = 0.0
+
+        row = out[i, lo:hi]
+
+        for k in range(hi - lo):
+
+            row[k] = (
+                w0 * d0[start + k] + w1 * d1[start + k] + w2 * d2[start + k]
+            )
+
+    return out
+
+
+@nb.njit(fastmath=True, parallel=True, cache=True, nogil=True)
+def _batch_banded_interpolation(
+    weights: np.ndarray,
+    indices: np.ndarray,
+    data: np.ndarray,
+    offsets: np.ndarray,
+    first_columns: np.ndarray,
+    out: np.ndarray,
+) -> np.ndarray:
+
+    for n in nb.prange(weights.shape[0]):
+
+        _banded_interpolation(
+            weights[n], indices[n], data, offsets, first_columns, out[n]
+        )
+
+    return out
+
+
+@nb.njit(fastmath=True, cache=True, nogil=True)
+def _banded_block_interpolation(
+    weights: np.ndarray,
+    indices: np.ndarray,
+    data: np.ndarray,
+    offsets: np.ndarray,
+    first_columns: np.ndarray,
+    rows: np.ndarray,
+    start: int,
+    stop: int,
+    out: np.ndarray,
+) -> np.ndarray:
+    """
+    _banded_interpolation of only the given rows and the columns
+    start to stop. Within the block everything outside of the band
+    is set to zero, the rest of out is not touched
+
+    :param weights: the three barycentric weights
+    :type weights: np.ndarray
+    :param indices: the indices of the three vertices
+    :type indices: np.ndarray
+    :param data: the (N grid points, N stored) values
+    :type data: np.ndarray
+    :param offsets: where each row starts in the values
+    :type offsets: np.ndarray
+    :param first_columns: the first stored column of each row
+    :type first_columns: np.ndarray
+    :param rows: the rows to blend
+    :type rows: np.ndarray
+    :param start: the first column to blend
+    :type start: int
+    :param stop: one past the last column to blend
+    :type stop: int
+    :param out: the (N ebounds, N mc) output buffer
+    :type out: np.ndarray
+    :returns: out
+
+    """
+
+    w0 = weights[0]
+    w1 = weights[1]
+    w2 = weights[2]
+
+    d0 = data[indices[0]]
+    d1 = data[indices[1]]
+    d2 = data[indices[2]]
+
+    for r in range(rows.shape[0]):
+
+        i = rows[r]
+
+        first = first_columns[i]
+
+        # the part of the band within the block
+
+        lo = min(max(first, start), stop)
+        hi = min(max(first + offsets[i + 1] - offsets[i], lo), stop)
+
+        block = out[i, start:stop]
+
+        for k in range(lo - start):
+
+            block[k] = 0.0
+
+        for k in range(hi - start, stop - start):
+
+            block[k] = 0.0
+
+        band = block[lo - start : hi - start]
+
+        offset = offsets[i] + lo - first
+
+        v0 = d0[offset : offset + hi - lo]
+        v1 = d1[offset : offset + hi - lo]
+        v2 = d2[offset : offset + hi - lo]
+
+        for k in range(band.shape[0]):
+
+            band[k] = w0 * v0[k] + w1 * v1[k] + w2 * v2[k]
+
+    return out
+
+
+@nb.njit(fastmath=True, cache=True, nogil=True)
+def _banded_values_interpolation(
+    weights: np.ndarray,
+    indices: np.ndarray,
+    data: np.ndarray,
+    out: np.ndarray,
+) -> np.ndarray:
+    """
+    blend only the stored values of the three vertices
+
+    :param weights: the three normalized barycentric weights
+    :type weights: np.ndarray
+    :param indices: the indices of the three vertices
+    :type indices: np.ndarray
+    :param data: the (N grid points, N stored) values
+    :type data: np.ndarray
+    :param out: the (N stored) output buffer
+    :type out: np.ndarray
+    :returns: out
+
+    """
+
+    w0 = weights[0]
+    w1 = weights[1]
+    w2 = weights[2]
+
+    d0 = data[indices[0]]
+    d1 = data[indices[1]]
+    d2 = data[indices[2]]
+
+    for k in range(out.shape[0]):
+
+        out[k] = w0 * d0[k] + w1 * d1[k] + w2 * d2[k]
+
+    return out
+
+
+@nb.njit(fastmath=True, cache=True, nogil=True)
+def _banded_fold(
+    values: np.ndarray,
+    offsets: np.ndarray,
+    first_columns: np.ndarray,
+    fluxes: np.ndarray,
+) -> np.ndarray:
+    """
+    multiply a banded matrix with the fluxes
+
+    :param values: the (N stored) values
+    :type values: np.ndarray
+    :param offsets: where each row starts in the values
+    :type offsets: np.ndarray
+    :param first_columns: the first stored column of each row
+    :type first_columns: np.ndarray
+    :param fluxes: the fluxes in the N mc bins
+    :type fluxes: np.ndarray
+    :returns: the counts in the N ebounds channels
+
+    """
+
+    n_rows = offsets.shape[0] - 1
+
+    out = np.zeros(n_rows)
+
+    for i in range(n_rows):
+
+        start = offsets[i]
+        lo = first_columns[i]
+
+        total = 0.0
+
+        for k in range(start, offsets[i + 1]):
+
+            total += values[k] * fluxes[lo + k - start]
+
+        out[i] = total
+
+    return out
@@ -0,0 +1,335 @@
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Optional, Tuple, Union
+
+import numpy as np
+
+from ..utils.logging import setup_logger
+from .base import MatrixStorage
+
+log = setup_logger(__name__)
+
+
+class LazyMatrixStorage(MatrixStorage):
+    def __init__(
+        self,
+        file_name: Union[str, Path],
+        source_type: str = "hdf5",
+        dataset: str = "matrix",
+        max_resident: int = 64,
+        prefetch: bool = False,
+    ):
+        """
+        Keeps the matrix stack on disk and only reads the vertex
+        matrices that are needed for an interpolation. At most
+        max_resident vertex matrices are kept in memory, the least
+        recently used are dropped first. Optionally the
+        neighbouring vertices of the last simplex are read in a
+        background thread.
+
+        Use the from_hdf5 or from_npy constructors.
+
+        :param file_name: the file holding the stack
+        :type file_name: Union[str, Path]
+        :param source_type: hdf5 or npy
+        :type source_type: str
+        :param dataset: the name of the dataset (HDF5 only)
+        :type dataset: str
+        :param max_resident: the max number of matrices in memory
+        :type max_resident: int
+        :param prefetch: read the neighbouring vertices in the background
+        :type prefetch: bool
+        :returns:
+
+        """
+
+        if source_type not in ("hdf5", "npy"):
+
+            log.error(f"source_type must be hdf5 or npy not {source_type}")
+
+            raise RuntimeError()
+
+        if max_resident < 3:
+
+            log.error("at least the three matrices of a simplex must fit")
+
+            raise RuntimeError()
+
+        self._file_name: Path = Path(file_name)
+        self._source_type: str = source_type
+        self._dataset: str = dataset
+        self._max_resident: int = max_resident
+        self._prefetch: bool = prefetch
+
+        self._open()
+
+    @classmethod
+    def from_hdf5(
+        cls,
+        file_name: Union[str, Path],
+        dataset: str = "matrix",
+        max_resident: int = 64,
+        prefetch: bool = False,
+    ) -> "LazyMatrixStorage":
+        """
+        page the matrices in from an HDF5 dataset. This works
+        best with one chunk per grid point as written by
+        ResponseDatabase.to_hdf5
+
+        :param file_name: the HDF5 file
+        :type file_name: Union[str, Path]
+        :param dataset: the name of the matrix dataset
+        :type dataset: str
+        :param max_resident: the max number of matrices in memory
+        :type max_resident: int
+        :param prefetch: read the neighbouring vertices in the background
+        :type prefetch: bool
+        :returns: LazyMatrixStorage
+
+        """
+
+        return cls(
+            file_name,
+            source_type="hdf5",
+            dataset=dataset,
+            max_resident=max_resident,
+            prefetch=prefetch,
+        )
+
+    @classmethod
+    def from_npy(
+        cls,
+        file_name: Union[str, Path],
+        max_resident: int = 64,
+        prefetch: bool = False,
+    ) -> "LazyMatrixStorage":
+        """
+        page the matrices in from a memory mapped .npy file
+
+        :param file_name: the .npy file
+        :type file_name: Union[str, Path]
+        :param max_resident: the max number of matrices in memory
+        :type max_resident: int
+        :param prefetch: read the neighbouring vertices in the background
+        :type prefetch: bool
+        :returns: LazyMatrixStorage
+
+        """
+
+        return cls(
+            file_name,
+            source_type="npy",
+            max_resident=max_resident,
+            prefetch=prefetch,
+        )
+
+    def _open(self) -> None:
+
+        if self._source_type == "hdf5":
+
+            import h5py
+
+            self._file = h5py.File(self._file_name, "r")
+
+            self._source = self._file[self._dataset]
+
+        else:
+
+            self._file = None
+
+            self._source = np.load(self._file_name, mmap_mode="r")
+
+        self._n_grid_points: int = self._source.shape[0]
+        self._matrix_shape: Tuple[int, int] = tuple(self._source.shape[1:])
+
+        self._resident: "OrderedDict[int, np.ndarray]" = OrderedDict()
+        self._pending: Dict[int, Future] = {}
+        self._lock = threading.Lock()
+        self._read_lock = threading.Lock()
+
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+        if self._prefetch:
+
+            self._executor = ThreadPoolExecutor(max_workers=1)
+
+        self._n_hits: int = 0
+        self._n_reads: int = 0
+
+    @property
+    def n_grid_points(self) -> int:
+
+        return self._n_grid_points
+
+    @property
+    def matrix_shape(self) -> Tuple[int, int]:
+
+        return self._matrix_shape
+
+    @property
+    def dtype(self) -> np.dtype:
+
+        return self._source.dtype
+
+    @property
+    def nbytes(self) -> int:
+
+        with self._lock:
+
+            return sum(m.nbytes for m in self._resident.values())
+
+    @property
+    def n_resident(self) -> int:
+        """
+        the number of vertex matrices currently in memory
+        """
+
+        return len(self._resident)
+
+    @property
+    def n_hits(self) -> int:
+        """
+        the number of requests served from memory
+        """
+        return self._n_hits
+
+    @property
+    def n_reads(self) -> int:
+        """
+        the number of matrices read from disk
+        """
+        return self._n_reads
+
+    def _read(self, index: int) -> np.ndarray:
+
+        # h5py datasets are not safe to read from two
+        # threads at once
+
+        with self._read_lock:
+
+            matrix = np.ascontiguousarray(self._source[index])
+
+        self._n_reads += 1
+
+        return matrix
+
+    def _insert(self, index: int, matrix: np.ndarray) -> None:
+
+        with self._lock:
+
+            self._resident[index] = matrix
+
+            self._resident.move_to_end(index)
+
+            while len(self._resident) > self._max_resident:
+
+                self._resident.popitem(last=False)
+
+    def get_matrix(self, index: int) -> np.ndarray:
+
+        index = int(index)
+
+        with self._lock:
+
+            matrix = self._resident.get(index)
+
+            if matrix is not None:
+
+                self._resident.move_to_end(index)
+
+                self._n_hits += 1
+
+                return matrix
+
+            future = self._pending.get(index)
+
+        if future is not None:
+
+            # it is already on its way
+
+            return future.result()
+
+        matrix = self._read(index)
+
+        self._insert(index, matrix)
+
+        return matrix
+
+    @property
+    def wants_prefetch(self) -> bool:
+
+        return self._prefetch
+
+    def prefetch(self, indices: np.ndarray) -> None:
+
+        if self._executor is None:
+
+            return
+
+        # never try to hold more than fits
+
+        for index in indices[: self._max_resident - 3]:
+
+            index = int(index)
+
+            with self._lock:
+
+                if index in self._resident or index in self._pending:
+
+                    continue
+
+                self._pending[index] = self._executor.submit(
+                    self._background_read, index
+                )
+
+    def _background_read(self, index: int) -> np.ndarray:
+
+        try:
+
+            matrix = self._read(index)
+
+            self._insert(index, matrix)
+
+            return matrix
+
+        finally:
+
+            with self._lock:
+
+                self._pending.pop(index, None)
+
+    def close(self) -> None:
+        """
+        stop the prefetching and close the file
+        """
+
+        if self._executor is not None:
+
+            self._executor.shutdown(wait=True)
+
+            self._executor = None
+
+        if self._file is not None:
+
+            self._file.close()
+
+            self._file = None
+
+    def __getstate__(self):
+
+        # only the location of the data travels, the
+        # receiving process opens the file itself
+
+        return dict(
+            file_name=self._file_name,
+            source_type=self._source_type,
+            dataset=self._dataset,
+            max_resident=self._max_resident,
+            prefetch=self._prefetch,
+        )
+
+    def __setstate__(self, state):
+
+        self.__init__(**state)
@@ -0,0 +1,250 @@
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+from ..utils.logging import setup_logger
+from .base import MatrixStorage
+
+log = setup_logger(__name__)
+
+
+class LowRankMatrixStorage(MatrixStorage):
+    def __init__(
+        self,
+        matrices: np.ndarray,
+        tolerance: float = 1e-3,
+        max_rank: Optional[int] = None,
+    ):
+        """
+        Stores the matrices as the mean matrix plus a small set of
+        basis matrices found by a singular value decomposition of
+        the stack. Each grid point is reduced to its k coefficients,
+        and only the coefficients are blended at runtime.
+
+        The rank is the smallest one for which the residual of the
+        whole stack relative to its norm is below the tolerance. The
+        per matrix errors are in the reconstruction_error report.
+
+        :param matrices: the (N grid points, N ebounds, N mc) stack
+        :type matrices: np.ndarray
+        :param tolerance: the allowed relative residual of the stack
+        :type tolerance: float
+        :param max_rank: an optional upper limit on the rank
+        :type max_rank: Optional[int]
+        :returns:
+
+        """
+
+        matrices = np.asarray(matrices, dtype=float)
+
+        n_grid_points = matrices.shape[0]
+
+        self._matrix_shape: Tuple[int, int] = tuple(matrices.shape[1:])
+
+        flat = matrices.reshape(n_grid_points, -1)
+
+        mean = flat.mean(axis=0)
+
+        centered = flat - mean
+
+        u, s, vt = np.linalg.svd(centered, full_matrices=False)
+
+        # the residual norm if only the first k components are kept
+
+        residual = np.sqrt(np.cumsum((s**2)[::-1])[::-1])
+
+        norm = np.linalg.norm(flat)
+
+        rank = int(np.sum(residual > tolerance * norm))
+
+        rank = max(rank, 1)
+
+        if max_rank is not None:
+
+            rank = min(rank, max_rank)
+
+        self._rank: int = rank
+
+        self._mean: np.ndarray = mean
+
+        self._coefficients: np.ndarray = np.ascontiguousarray(
+            u[:, :rank] * s[:rank]
+        )
+
+        self._basis: np.ndarray = np.ascontiguousarray(vt[:rank])
+
+        # how well do we do on each matrix
+
+        error = np.linalg.norm(
+            centered - self._coefficients.dot(self._basis), axis=1
+        )
+
+        matrix_norm = np.linalg.norm(flat, axis=1)
+
+        relative_error = error / np.where(matrix_norm > 0, matrix_norm, 1.0)
+
+        self._reconstruction_error: Dict[str, float] = dict(
+            rank=rank,
+            relative_residual=float(
+                residual[rank] / norm if rank < len(s) else 0.0
+            ),
+            max_relative_error=float(relative_error.max()),
+            mean_relative_error=float(relative_error.mean()),
+            compression=float(flat.nbytes / self.nbytes),
+        )
+
+        log.info(
+            f"compressed {n_grid_points} matrices to rank {rank} with a max "
+            f"relative error of {relative_error.max():.2e}"
+        )
+
+        # (fluxes, folded mean, folded basis) of the last spectrum,
+        # replaced as a whole so that threads never mix spectra
+
+        self._folded: Optional[Tuple[np.ndarray, np.ndarray, np.ndarray]] = None
+
+    @classmethod
+    def from_storage(
+        cls,
+        storage: MatrixStorage,
+        tolerance: float = 1e-3,
+        max_rank: Optional[int] = None,
+    ) -> "LowRankMatrixStorage":
+        """
+        build from any other storage
+
+        :param storage: the storage to convert
+        :type storage: MatrixStorage
+        :param tolerance: the allowed relative residual of the stack
+        :type tolerance: float
+        :param max_rank: an optional upper limit on the rank
+        :type max_rank: Optional[int]
+        :returns: LowRankMatrixStorage
+
+        """
+
+        return cls(storage.to_array(), tolerance=tolerance, max_rank=max_rank)
+
+    @property
+    def n_grid_points(self) -> int:
+
+        return self._coefficients.shape[0]
+
+    @property
+    def matrix_shape(self) -> Tuple[int, int]:
+
+        return self._matrix_shape
+
+    @property
+    def dtype(self) -> np.dtype:
+
+        return self._basis.dtype
+
+    @property
+    def nbytes(self) -> int:
+
+        return (
+            self._coefficients.nbytes + self._basis.nbytes + self._mean.nbytes
+        )
+
+    @property
+    def rank(self) -> int:
+        """
+        the number of basis matrices
+        """
+
+        return self._rank
+
+    @property
+    def reconstruction_error(self) -> Dict[str, float]:
+        """
+        the rank, the residual of the stack relative to its norm, the
+        max and mean relative error of the matrices and the factor
+        by which the memory is reduced
+        """
+
+        return self._reconstruction_error
+
+    def get_matrix(self, index: int) -> np.ndarray:
+
+        flat = self._mean + self._coefficients[index].dot(self._basis)
+
+        return flat.reshape(self._matrix_shape)
+
+    def interpolate(
+        self, weights: np.ndarray, indices: np.ndarray, out: np.ndarray
+    ) -> np.ndarray:
+
+        # blend the coefficients, not the matrices
+
+        coefficients = weights.dot(self._coefficients[indices])
+
+        flat = out.reshape(-1)
+
+        np.dot(coefficients, self._basis, out=flat)
+
+        # the weights of derivatives do not sum to one
+
+        flat += weights.sum() * self._mean
+
+        return out
+
+    def interpolate_many(
+        self, weights: np.ndarray, indices: np.ndarray, out: np.ndarray
+    ) -> np.ndarray:
+
+        coefficients = np.einsum(
+            "nj,njk->nk", weights, self._coefficients[indices]
+        )
+
+        flat = out.reshape(out.shape[0], -1)
+
+        np.dot(coefficients, self._basis, out=flat)
+
+        flat += weights.sum(axis=1)[:, np.newaxis] * self._mean
+
+        return out
+
+    def interpolate_block(
+        self,
+        weights: np.ndarray,
+        indices: np.ndarray,
+        rows: np.ndarray,
+        start: int,
+        stop: int,
+        out: np.ndarray,
+    ) -> np.ndarray:
+
+        coefficients = weights.dot(self._coefficients[indices])
+
+        basis = self._basis.reshape((self._rank,) + self._matrix_shape)
+
+        mean = self._mean.reshape(self._matrix_shape)
+
+        out[rows, start:stop] = (
+            np.tensordot(coefficients, basis[:, rows, start:stop], axes=1)
+            + weights.sum() * mean[rows, start:stop]
+        )
+
+        return out
+
+    def fold(self, index: int, fluxes: np.ndarray) -> np.ndarray:
+
+        # fold the basis once per spectrum, then each grid
+        # point is a (rank) x (rank, N ebounds) product
+
+        folded = self._folded
+
+        if folded is None or not np.array_equal(fluxes, folded[0]):
+
+            shape = (self._rank,) + self._matrix_shape
+
+            folded = (
+                np.array(fluxes, copy=True),
+                self._mean.reshape(self._matrix_shape).dot(fluxes),
+                self._basis.reshape(shape).dot(fluxes),
+            )
+
+            self._folded = folded
+
+        return folded[1] + self._coefficients[index].dot(folded[2])
@@ -0,0 +1,196 @@
+import multiprocessing
+import sys
+import weakref
+from multiprocessing import resource_tracker
+from multiprocessing.shared_memory import SharedMemory
+from typing import Optional, Tuple
+
+import numpy as np
+
+from ..utils.logging import setup_logger
+from .dense import DenseMatrixStorage
+
+log = setup_logger(__name__)
+
+# the segments created by this process are already
+# known to its resource tracker
+
+_created_here = set()
+
+
+class SharedMatrixStorage(DenseMatrixStorage):
+    def __init__(self, matrices: np.ndarray, name: Optional[str] = None):
+        """
+        Keeps the full stack of matrices in a named shared memory
+        segment. Pickling only sends the name of the segment, so the
+        worker processes of a pool attach to the same physical pages
+        instead of receiving a copy of the matrices each.
+
+        The process creating the storage owns the segment and removes
+        it when the storage is garbage collected or unlink is called.
+        Attached processes see the matrices read only.
+
+        :param matrices: the stack of matrices to copy into the segment
+        :type matrices: np.ndarray
+        :param name: the name of the segment, a random one if None
+        :type name: Optional[str]
+        :returns:
+
+        """
+
+        matrices = np.asarray(matrices)
+
+        shm = SharedMemory(name=name, create=True, size=max(matrices.nbytes, 1))
+
+        log.debug(f"created the shared memory segment {shm.name}")
+
+        _created_here.add(shm.name)
+
+        self._setup(shm, matrices.shape, matrices.dtype, owner=True)
+
+        self._matrices.flags.writeable = True
+
+        self._matrices[...] = matrices
+
+        self._matrices.flags.writeable = False
+
+    @classmethod
+    def attach(
+        cls, name: str, shape: Tuple[int, ...], dtype: np.dtype
+    ) -> "SharedMatrixStorage":
+        """
+        attach to an existing segment created by another storage
+
+        :param name: the name of the segment
+        :type name: str
+        :param shape: the shape of the stack
+        :type shape: Tuple[int, ...]
+        :param dtype: the dtype of the stack
+        :type dtype: np.dtype
+        :returns:
+
+        """
+
+        storage = cls.__new__(cls)
+
+        storage._setup(_attach(name), shape, dtype, owner=False)
+
+        return storage
+
+    def _setup(
+        self,
+        shm: SharedMemory,
+        shape: Tuple[int, ...],
+        dtype: np.dtype,
+        owner: bool,
+    ) -> None:
+
+        self._shm: SharedMemory = shm
+
+        self._owner: bool = owner
+
+        self._is_memory_mapped: bool = False
+
+        self._matrices: np.ndarray = np.ndarray(
+            shape, dtype=dtype, buffer=shm.buf
+        )
+
+        self._matrices.flags.writeable = False
+
+        self._finalizer = weakref.finalize(self, _release, shm, owner)
+
+    @property
+    def name(self) -> str:
+        """
+        the name of the shared memory segment
+        """
+        return self._shm.name
+
+    @property
+    def is_owner(self) -> bool:
+
+        return self._owner
+
+    @property
+    def nbytes(self) -> int:
+
+        # the pages belong to the segment, not to this process
+
+        if not self._owner:
+
+            return 0
+
+        return self._matrices.nbytes
+
+    def unlink(self) -> None:
+        """
+        remove the name of the segment so that no further process
+        can attach. Processes that are attached keep their mapping
+        """
+
+        if self._owner:
+
+            self._finalizer()
+
+    def __getstate__(self):
+
+        return dict(
+            name=self.name,
+            shape=self._matrices.shape,
+            dtype=self._matrices.dtype.str,
+        )
+
+    def __setstate__(self, state):
+
+        self._setup(
+            _attach(state["name"]),
+            tuple(state["shape"]),
+            np.dtype(state["dtype"]),
+            owner=False,
+        )
+
+
+def _attach(name: str) -> SharedMemory:
+
+    if sys.version_info >= (3, 13):
+
+        return SharedMemory(name=name, track=False)
+
+    shm = SharedMemory(name=name)
+
+    # the children of a pool share the resource tracker of the
+    # process that created the segment. Any other process has its
+    # own tracker which would remove the segment when it exits
+
+    if (
+        multiprocessing.parent_process() is None
+        and shm.name not in _created_here
+    ):
+
+        resource_tracker.unregister(shm._name, "shared_memory")
+
+    return shm
+
+
+def _release(shm: SharedMemory, owner: bool) -> None:
+
+    try:
+
+        shm.close()
+
+    except BufferError:
+
+        # an array still points to the memory, it is
+        # unmapped when that is garbage collected
+
+        pass
+
+    if owner:
+
+        try:
+
+            shm.unlink()
+
+        except FileNotFoundError:
+
+            pass
@@ -0,0 +1,250 @@
+from typing import Optional, Tuple
+
+import numpy as np
+
+from .base import MatrixStorage
+from .kernels import (
+    _banded_block_interpolation,
+    _banded_fold,
+    _banded_interpolation,
+    _banded_values_interpolation,
+    _batch_banded_interpolation,
+)
+
+
+class SparseMatrixStorage(MatrixStorage):
+    def __init__(self, matrices: np.ndarray):
+        """
+        Stores only the band of the matrices that holds non zero
+        values. All grid points share one pattern: for each row
+        (channel), the span from the first to the last column that
+        is non zero in any of the matrices. Redistribution matrices
+        are zero away from the photopeak diagonal, so this band is
+        a small part of the matrix.
+
+        Because the pattern is shared, blending three vertices is a
+        contiguous blend of three value arrays, and the result can
+        be handed on either densely or as a CSR matrix.
+
+        :param matrices: the (N grid points, N ebounds, N mc) stack
+        :type matrices: np.ndarray
+        :returns:
+
+        """
+
+        matrices = np.asarray(matrices)
+
+        self._matrix_shape: Tuple[int, int] = tuple(matrices.shape[1:])
+
+        n_rows = self._matrix_shape[0]
+
+        first, last = _find_band(matrices)
+
+        self._first_columns: np.ndarray = first.astype(np.int64)
+
+        self._offsets: np.ndarray = np.zeros(n_rows + 1, dtype=np.int64)
+
+        np.cumsum(last - first, out=self._offsets[1:])
+
+        # the dense positions of the stored values
+
+        self._rows: np.ndarray = np.repeat(np.arange(n_rows), last - first)
+
+        self._columns: np.ndarray = (
+            np.arange(self._offsets[-1])
+            - np.repeat(self._offsets[:-1], last - first)
+            + np.repeat(first, last - first)
+        )
+
+        # (N grid points, N stored) so that the values of
+        # a vertex are contiguous
+
+        self._data: np.ndarray = np.ascontiguousarray(
+            matrices[:, self._rows, self._columns]
+        )
+
+    @classmethod
+    def from_storage(cls, storage: MatrixStorage) -> "SparseMatrixStorage":
+        """
+        build from any other storage
+
+        :param storage: the storage to convert
+        :type storage: MatrixStorage
+        :returns: SparseMatrixStorage
+
+        """
+
+        return cls(storage.to_array())
+
+    @property
+    def n_grid_points(self) -> int:
+
+        return self._data.shape[0]
+
+    @property
+    def matrix_shape(self) -> Tuple[int, int]:
+
+        return self._matrix_shape
+
+    @property
+    def dtype(self) -> np.dtype:
+
+        return self._data.dtype
+
+    @property
+    def nbytes(self) -> int:
+
+        return (
+            self._data.nbytes
+            + self._offsets.nbytes
+            + self._first_columns.nbytes
+        )
+
+    @property
+    def n_stored(self) -> int:
+        """
+        the number of stored elements per matrix
+        """
+
+        return self._data.shape[1]
+
+    @property
+    def density(self) -> float:
+        """
+        the fraction of the matrix elements that are stored
+        """
+
+        return self.n_stored / (self._matrix_shape[0] * self._matrix_shape[1])
+
+    def get_matrix(self, index: int) -> np.ndarray:
+
+        out = np.zeros(self._matrix_shape, dtype=self._data.dtype)
+
+        out[self._rows, self._columns] = self._data[index]
+
+        return out
+
+    def interpolate(
+        self, weights: np.ndarray, indices: np.ndarray, out: np.ndarray
+    ) -> np.ndarray:
+
+        # everything outside of the band is zeroed on every call as
+        # the buffer may have been written to since the last one
+
+        return _banded_interpolation(
+            weights,
+            indices,
+            self._data,
+            self._offsets,
+            self._first_columns,
+            out,
+        )
+
+    def interpolate_many(
+        self, weights: np.ndarray, indices: np.ndarray, out: np.ndarray
+    ) -> np.ndarray:
+
+        return _batch_banded_interpolation(
+            weights,
+            indices,
+            self._data,
+            self._offsets,
+            self._first_columns,
+            out,
+        )
+
+    def interpolate_block(
+        self,
+        weights: np.ndarray,
+        indices: np.ndarray,
+        rows: np.ndarray,
+        start: int,
+        stop: int,
+        out: np.ndarray,
+    ) -> np.ndarray:
+
+        return _banded_block_interpolation(
+            weights,
+            indices,
+            self._data,
+            self._offsets,
+            self._first_columns,
+            rows,
+            start,
+            stop,
+            out,
+        )
+
+    def interpolate_sparse(
+        self,
+        weights: np.ndarray,
+        indices: np.ndarray,
+        out: Optional[np.ndarray] = None,
+    ):
+        """
+        blend the three vertices of a simplex and return the
+        result as a scipy CSR matrix. The values are written into
+        out if given
+
+        :param weights: the normalized barycentric weights
+        :type weights: np.ndarray
+        :param indices: the indices of the vertices
+        :type indices: np.ndarray
+        :param out: an optional (N stored) buffer for the values
+        :type out: Optional[np.ndarray]
+        :returns: scipy.sparse.csr_matrix
+
+        """
+
+        from scipy.sparse import csr_matrix
+
+        if out is None:
+
+            out = np.empty(self.n_stored)
+
+        _banded_values_interpolation(weights, indices, self._data, out)
+
+        return csr_matrix(
+            (out, self._columns, self._offsets), shape=self._matrix_shape
+        )
+
+    def fold(self, index: int, fluxes: np.ndarray) -> np.ndarray:
+
+        return _banded_fold(
+            self._data[index], self._offsets, self._first_columns, fluxes
+        )
+
+
+def _find_band(matrices: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    the first and one past the last column of each row that
+    is non zero in any of the matrices
+    """
+
+    n_columns = matrices.shape[2]
+
+    pattern = np.any(matrices != 0, axis=0)
+
+    has_values = pattern.any(axis=1)
+
+    first = np.where(has_values, pattern.argmax(axis=1), 0)
+
+    last = np.where(has_values, n_columns - pattern[:, ::-1].argmax(axis=1), 0)
+
+    return first, last
+
+
+def band_density(matrices: np.ndarray) -> float:
+    """
+    the fraction of the matrix elements that a SparseMatrixStorage
+    of the matrices would store
+
+    :param matrices: the (N grid points, N ebounds, N mc) stack
+    :type matrices: np.ndarray
+    :returns:
+
+    """
+
+    first, last = _find_band(matrices)
+
+    return (last - first).sum() / (matrices.shape[1] * matrices.shape[2])
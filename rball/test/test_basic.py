@@ -1,12 +1,126 @@
+import json
+import logging
+import pickle
+import queue
+import subprocess
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
 import pytest
 
 import numpy as np
 
 from threeML import *
 
+import rball
 from rball.utils.package_data import get_path_of_data_file
 
-from rball import ResponseDatabase, RBallLike, response_database, GridGenerator
+from rball import (
+    ResponseDatabase,
+    RBallLike,
+    response_database,
+    GridGenerator,
+    MultiResponseDatabase,
+)
+from rball.point_location import PointLocator
+from rball.storage import SparseMatrixStorage
+from rball.utils import logging as rball_logging
+from rball.utils.instrumentation import profile
+from rball.utils.pixel_cache import pixel_nodes
+from rball.utils.synthetic import generate_synthetic_database
+
+
+def test_light_import():
+
+    # a fresh interpreter, the tests have imported everything already
+
+    code = (
+        "import sys, rball;"
+        "print(','.join(sorted(m for m in sys.modules if '.' not in m)))"
+    )
+
+    modules = (
+        subprocess.run(
+            [sys.executable, "-c", code],
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        .stdout.strip()
+        .split(",")
+    )
+
+    for heavy in [
+        "threeML",
+        "astromodels",
+        "matplotlib",
+        "ipyvolume",
+        "pythreejs",
+        "h5py",
+        "stripy",
+        "pkg_resources",
+    ]:
+
+        assert heavy not in modules
+
+    # the lazy objects are still there
+
+    assert rball.RBallLike is RBallLike
+
+    assert "RBallLike" in dir(rball)
+
+
+def test_logging(rsp_database: ResponseDatabase):
+
+    log = rball_logging.setup_logger("rball.test_logging")
+
+    def file_handlers():
+
+        return [h for h in log.handlers if isinstance(h, logging.FileHandler)]
+
+    # the debug messages go to the dev log but
+    # the hot path messages are never formatted
+
+    assert len(file_handlers()) == 2
+
+    assert log.isEnabledFor(logging.DEBUG)
+
+    assert not log.isEnabledFor(rball_logging.TRACE)
+
+    class Unprintable:
+        def __str__(self):
+
+            raise AssertionError("formatted")
+
+    log.log(rball_logging.TRACE, "%s", Unprintable())
+
+    rball_logging.disable_file_logging()
+
+    try:
+
+        assert file_handlers() == []
+
+        assert not log.isEnabledFor(logging.DEBUG)
+
+        rsp_database.locate(10.0, 10.0)
+
+        # the records can go through a queue to a single writer
+
+        records = queue.Queue()
+
+        rball_logging.log_to_queue(records)
+
+        log.debug("to the queue")
+
+        assert records.get_nowait().getMessage() == "to the queue"
+
+        rball_logging.log_to_queue(None)
+
+    finally:
+
+        rball_logging.enable_file_logging()
+
+    assert len(file_handlers()) == 2
 
 
 def test_construction(rsp_database: ResponseDatabase):
@@ -25,6 +139,159 @@ def test_interpolation(rsp_database: ResponseDatabase):
 
     rsp_database.interpolate_to_position(10.0, 10.0)
 
+    # compare the compiled blend against a plain numpy one
+
+    theta, phi = rsp_database._transform_to_instrument_coordinates(10.0, 10.0)
+
+    bbc, tri = rsp_database.locator.triangulation.containing_simplex_and_bcc(
+        theta, phi
+    )
+
+    expected = np.einsum("i,ijk->jk", bbc[0], rsp_database.matrices[tri[0]])
+
+    assert np.allclose(rsp_database.current_response.matrix, expected)
+
+
+def test_batch_interpolation(rsp_database: ResponseDatabase):
+
+    ra = np.array([10.0, 150.0, 300.0])
+    dec = np.array([10.0, 0.0, -60.0])
+
+    stack = rsp_database.interpolate_to_positions(ra, dec)
+
+    assert stack.shape == (3,) + rsp_database.current_response.matrix.shape
+
+    for i in range(3):
+
+        rsp_database.interpolate_to_position(ra[i], dec[i])
+
+        assert np.allclose(stack[i], rsp_database.current_response.matrix)
+
+    out = np.zeros_like(stack)
+
+    rsp_database.interpolate_to_positions(ra, dec, out=out)
+
+    assert np.allclose(out, stack)
+
+
+def test_interpolation_cache(rsp_database: ResponseDatabase):
+
+    rsp_database.interpolate_to_position(10.0, 10.0)
+
+    expected = rsp_database.current_response.matrix.copy()
+
+    rsp_database.enable_cache(max_size=2)
+
+    for ra, dec in [(10.0, 10.0), (10.0, 10.0), (50.0, 10.0), (80.0, 10.0)]:
+
+        rsp_database.interpolate_to_position(ra, dec)
+
+    assert rsp_database.cache_info["hits"] == 1
+
+    assert rsp_database.cache_info["misses"] == 3
+
+    assert rsp_database.cache_info["size"] == 2
+
+    # the first position was evicted
+
+    rsp_database.interpolate_to_position(10.0, 10.0)
+
+    assert rsp_database.cache_info["misses"] == 4
+
+    assert np.all(rsp_database.current_response.matrix == expected)
+
+    # quantized keys
+
+    rsp_database.enable_cache(max_size=2, resolution=0.1)
+
+    rsp_database.interpolate_to_position(10.0, 10.0)
+    rsp_database.interpolate_to_position(10.01, 10.01)
+
+    assert rsp_database.cache_info["hits"] == 1
+
+    rsp_database.disable_cache()
+
+    assert rsp_database.cache_info is None
+
+
+def test_pixel_cache(rsp_database: ResponseDatabase, tmp_path):
+
+    file_name = tmp_path / "nodes.npy"
+
+    n_ra, n_z, ra, dec = pixel_nodes(10.0)
+
+    assert len(ra) == n_ra * (n_z + 1)
+
+    # the pixels have equal areas
+
+    assert np.allclose(np.diff(np.sin(np.deg2rad(dec[::n_ra]))), 2.0 / n_z)
+
+    exact = rsp_database.interpolate_to_positions(ra, dec)
+
+    out = np.empty(exact.shape[1:])
+
+    try:
+
+        for refine in [False, True]:
+
+            rsp_database.enable_pixel_cache(
+                10.0, refine=refine, file_name=file_name
+            )
+
+            assert rsp_database.pixel_cache_info["n_nodes"] == len(ra)
+
+            # the nodes are memory mapped
+
+            assert rsp_database.pixel_cache_info["nbytes"] == 0
+
+            # at the nodes we get the database
+
+            assert np.allclose(
+                rsp_database.interpolate_to_positions(ra, dec), exact
+            )
+
+            test_ra = np.array([3.0, 100.0, 357.0, 10.0])
+            test_dec = np.array([-89.0, 12.0, 45.0, 90.0])
+
+            batch = rsp_database.interpolate_to_positions(test_ra, test_dec)
+
+            for i in range(len(test_ra)):
+
+                rsp_database._interpolate_into(test_ra[i], test_dec[i], out)
+
+                assert np.allclose(out, batch[i])
+
+        # between two nodes of a row the blend is linear
+
+        rsp_database.interpolate_to_position(ra[n_ra] + 2.5, dec[n_ra])
+
+        assert np.allclose(
+            rsp_database.current_response.matrix,
+            0.75 * exact[n_ra] + 0.25 * exact[n_ra + 1],
+        )
+
+        # an existing file is reused
+
+        modified = file_name.stat().st_mtime_ns
+
+        rsp_database.enable_pixel_cache(10.0, file_name=file_name)
+
+        assert file_name.stat().st_mtime_ns == modified
+
+        # and rebuilt when it does not fit
+
+        rsp_database.enable_pixel_cache(20.0, file_name=file_name)
+
+        assert np.load(file_name, mmap_mode="r").shape[0] == len(
+            pixel_nodes(20.0)[2]
+        )
+
+    finally:
+
+        rsp_database.disable_pixel_cache()
+
+    assert rsp_database.pixel_cache_info is None
+
 
 def test_localization(rsp_database: ResponseDatabase):
 
@@ -54,6 +321,504 @@ def test_localization(rsp_database: ResponseDatabase):
     ba.sample()
 
 
+def test_fold_then_blend(rsp_database: ResponseDatabase):
+
+    demo_plugin = RBallLike.from_ogip(
+        "demo",
+        observation=get_path_of_data_file("demo.pha"),
+        spectrum_number=1,
+        response_database=rsp_database,
+        fold_then_blend=True,
+    )
+
+    source_function = Powerlaw(K=1, index=-2, piv=100)
+
+    ps = PointSource("ps", 150.0, 1.0, spectral_shape=source_function)
+
+    model = Model(ps)
+
+    demo_plugin.set_model(model)
+
+    for ra, dec, index in [
+        (150.0, 1.0, -2),
+        (151.0, 2.0, -2),
+        (10.0, -40, -1.5),
+    ]:
+
+        ps.position.ra = ra
+        ps.position.dec = dec
+        source_function.index = index
+
+        demo_plugin.fold_then_blend = True
+
+        fast = demo_plugin.get_model()
+
+        demo_plugin.fold_then_blend = False
+
+        slow = demo_plugin.get_model()
+
+        assert np.allclose(fast, slow)
+
+
+def test_log_like_batch(rsp_database: ResponseDatabase):
+
+    demo_plugin = RBallLike.from_ogip(
+        "demo",
+        observation=get_path_of_data_file("demo.pha"),
+        spectrum_number=1,
+        response_database=rsp_database,
+    )
+
+    source_function = Powerlaw(K=1, index=-2, piv=100)
+
+    ps = PointSource("ps", 150.0, 1.0, spectral_shape=source_function)
+
+    model = Model(ps)
+
+    demo_plugin.set_model(model)
+
+    names = list(model.free_parameters.keys())
+
+    values = []
+
+    for ra, dec, index in [(150.0, 1.0, -2), (10.0, -40, -1.5)]:
+
+        row = {
+            "ps.position.ra": ra,
+            "ps.position.dec": dec,
+            "ps.spectrum.main.Powerlaw.K": 1.0,
+            "ps.spectrum.main.Powerlaw.index": index,
+        }
+
+        values.append([row[name] for name in names])
+
+    # out of the bounds of the index
+
+    values.append(list(values[0]))
+    values[-1][names.index("ps.spectrum.main.Powerlaw.index")] = -20.0
+
+    # and positions off the sphere
+
+    for name, value in [("ps.position.dec", 120.0), ("ps.position.ra", 400.0)]:
+
+        values.append(list(values[0]))
+        values[-1][names.index(name)] = value
+
+    log_likes = demo_plugin.get_log_like_batch(np.array(values))
+
+    assert np.all(log_likes[2:] == -np.inf)
+
+    for row, expected in zip(values[:2], log_likes[:2]):
+
+        for name, value in zip(names, row):
+
+            model.free_parameters[name].value = value
+
+        assert np.isclose(demo_plugin.get_log_like(), expected)
+
+
+def test_instrumentation(rsp_database: ResponseDatabase, tmp_path):
+
+    demo_plugin = RBallLike.from_ogip(
+        "demo",
+        observation=get_path_of_data_file("demo.pha"),
+        spectrum_number=1,
+        response_database=rsp_database,
+    )
+
+    ps = PointSource("ps", 150.0, 1.0, spectral_shape=Powerlaw())
+
+    model = Model(ps)
+
+    demo_plugin.set_model(model)
+
+    rsp_database.enable_cache(max_size=4)
+
+    assert not demo_plugin.instrumentation_enabled
+
+    with profile(demo_plugin) as report:
+
+        assert demo_plugin.instrumentation_enabled
+
+        for ra in [150.0, 151.0, 150.0, 151.0]:
+
+            ps.position.ra.value = ra
+
+            demo_plugin.get_log_like()
+
+    rsp_database.disable_cache()
+
+    assert not demo_plugin.instrumentation_enabled
+
+    assert not rsp_database.instrumentation_enabled
+
+    stages = report.stats["stages"]
+
+    assert stages["lookup"]["calls"] == stages["blend"]["calls"] == 2
+
+    assert stages["cache_hit"]["calls"] == 2
+
+    # the response is interpolated in place
+
+    assert "replace_matrix" not in stages
+
+    assert stages["fold"]["calls"] == 4
+
+    assert report.stats["cache"]["hit_ratio"] == 0.5
+
+    assert (
+        report.stats["memory"]["peak_nbytes"]
+        >= rsp_database.storage.nbytes + 2 * rsp_database.matrices[0].nbytes
+    )
+
+    assert report.wall_time > stages["fold"]["time"]
+
+    report.to_json(tmp_path / "profile.json")
+
+    exported = json.loads((tmp_path / "profile.json").read_text())
+
+    assert exported["stages"]["fold"]["calls"] == 4
+
+    # nothing is counted while disabled
+
+    demo_plugin.get_log_like()
+
+    assert rsp_database.stats()["stages"] == {}
+
+
+def test_position_gradients(rsp_database: ResponseDatabase):
+
+    h = 1e-5
+
+    for ra, dec in [(150.0, 1.0), (10.0, -40.0), (300.0, 60.0)]:
+
+        matrix, d_ra, d_dec = rsp_database.interpolate_with_gradient(ra, dec)
+
+        stack = rsp_database.interpolate_to_positions(
+            [ra, ra + h, ra - h, ra, ra], [dec, dec, dec, dec + h, dec - h]
+        )
+
+        assert np.allclose(matrix, stack[0])
+
+        assert np.allclose(
+            d_ra,
+            (stack[1] - stack[2]) / (2 * h),
+            atol=1e-5 * np.abs(d_ra).max(),
+        )
+
+        assert np.allclose(
+            d_dec,
+            (stack[3] - stack[4]) / (2 * h),
+            atol=1e-5 * np.abs(d_dec).max(),
+        )
+
+    demo_plugin = RBallLike.from_ogip(
+        "demo",
+        observation=get_path_of_data_file("demo.pha"),
+        spectrum_number=1,
+        response_database=rsp_database,
+    )
+
+    ps = PointSource(
+        "ps", 150.0, 1.0, spectral_shape=Powerlaw(K=1, index=-2, piv=100)
+    )
+
+    demo_plugin.set_model(Model(ps))
+
+    def log_like(ra, dec):
+
+        ps.position.ra.value = ra
+        ps.position.dec.value = dec
+
+        return demo_plugin.get_log_like()
+
+    for ra, dec in [(150.0, 1.0), (10.0, -40.0)]:
+
+        log_like(ra, dec)
+
+        gradient = demo_plugin.get_log_like_gradient()
+
+        expected = [
+            (log_like(ra + h, dec) - log_like(ra - h, dec)) / (2 * h),
+            (log_like(ra, dec + h) - log_like(ra, dec - h)) / (2 * h),
+        ]
+
+        assert np.allclose(gradient, expected, rtol=1e-5, atol=1e-6)
+
+
+def test_restricted_response(rsp_database: ResponseDatabase):
+
+    plugins = [
+        RBallLike.from_ogip(
+            name,
+            observation=get_path_of_data_file("demo.pha"),
+            spectrum_number=1,
+            response_database=rsp_database,
+            restrict_response=restrict,
+        )
+        for name, restrict in [("restricted", True), ("full", False)]
+    ]
+
+    restricted, full = plugins
+
+    source_function = Powerlaw(K=1, index=-2, piv=100)
+
+    ps = PointSource("ps", 150.0, 1.0, spectral_shape=source_function)
+
+    model = Model(ps)
+
+    for plugin in plugins:
+
+        plugin.set_active_measurements("10-500")
+
+        plugin.set_model(model)
+
+    assert np.allclose(restricted.get_model(), full.get_model())
+
+    assert np.isclose(restricted.get_log_like(), full.get_log_like())
+
+    # only the active channels are interpolated
+
+    rows, start, stop = restricted.response_handle.block
+
+    assert np.all(rows == np.flatnonzero(restricted._mask))
+
+    assert (start, stop) == (0, rsp_database.monte_carlo_energies.size - 1)
+
+    matrix = restricted.response.matrix
+
+    assert np.all(matrix[~restricted._mask] == 0)
+
+    assert np.allclose(
+        matrix[rows], full.response.matrix[rows], rtol=1e-12, atol=0
+    )
+
+    # the layout follows the mask
+
+    restricted.set_active_measurements("20-300")
+
+    restricted.get_model()
+
+    assert np.all(
+        restricted.response_handle.block[0] == np.flatnonzero(restricted._mask)
+    )
+
+    # and the MC energy window
+
+    edges = rsp_database.monte_carlo_energies
+
+    restricted.mc_energy_window = (10.0, 1000.0)
+
+    restricted.get_model()
+
+    _, start, stop = restricted.response_handle.block
+
+    assert edges[start] < 10.0 < edges[start + 1]
+
+    assert edges[stop - 1] < 1000.0 < edges[stop]
+
+    matrix = restricted.response.matrix
+
+    assert np.all(matrix[:, :start] == 0) and np.all(matrix[:, stop:] == 0)
+
+    # the cache keeps the blocks apart from the full matrices
+
+    rsp_database.enable_cache(max_size=4)
+
+    try:
+
+        for plugin in [restricted, full, restricted]:
+
+            plugin.get_model()
+
+        assert rsp_database.cache_info["hits"] == 1
+
+        assert np.all(restricted.response.matrix == matrix)
+
+    finally:
+
+        rsp_database.disable_cache()
+
+    # the simulation sees the full matrix
+
+    restricted.get_simulated_dataset("sim")
+
+    assert restricted.response_handle.block is not None
+
+    restricted.restrict_response = False
+
+    restricted.get_model()
+
+    assert restricted.response_handle.block is None
+
+    assert np.allclose(restricted.response.matrix, full.response.matrix)
+
+
+def test_sky_scan(rsp_database: ResponseDatabase):
+
+    demo_plugin = RBallLike.from_ogip(
+        "demo",
+        observation=get_path_of_data_file("demo.pha"),
+        spectrum_number=1,
+        response_database=rsp_database,
+    )
+
+    source_function = Powerlaw(K=1, index=-2, piv=100)
+
+    ps = PointSource("ps", 10.0, -40.0, spectral_shape=source_function)
+
+    demo_plugin.set_model(Model(ps))
+
+    scan = demo_plugin.scan_sky()
+
+    assert scan.n_positions == rsp_database.n_grid_points
+
+    # the sub grid adds the midpoints of the edges
+
+    fine = demo_plugin.scan_sky(subdivisions=1)
+
+    n_edges = 3 * len(rsp_database.locator.simplices) // 2
+
+    assert fine.n_positions == rsp_database.n_grid_points + n_edges
+
+    assert np.allclose(fine.log_like[: scan.n_positions], scan.log_like)
+
+    # the model was not changed by the scan
+
+    assert source_function.K.value == 1.0
+
+    assert (ps.position.ra.value, ps.position.dec.value) == (10.0, -40.0)
+
+    best = scan.best_positions(3)
+
+    assert np.allclose(best[0], scan.best_position)
+
+    # the profile likelihood is that of the best fit normalization
+
+    for ra, dec in best:
+
+        idx = np.flatnonzero((scan.ra == ra) & (scan.dec == dec))[0]
+
+        ps.position.ra.value = ra
+        ps.position.dec.value = dec
+
+        source_function.K.value = scan.scale[idx]
+
+        assert np.isclose(demo_plugin.get_log_like(), scan.log_like[idx])
+
+        for factor in [0.9, 1.1]:
+
+            source_function.K.value = scan.scale[idx] * factor
+
+            assert demo_plugin.get_log_like() < scan.log_like[idx]
+
+    source_function.K.value = 1.0
+
+    demo_plugin.scan_sky(set_position=True)
+
+    assert np.allclose(
+        (ps.position.ra.value, ps.position.dec.value), scan.best_position
+    )
+
+
+def test_response_handles(rsp_database: ResponseDatabase):
+
+    positions = [(10.0, 10.0), (150.0, -30.0), (300.0, 60.0)]
+
+    expected = rsp_database.interpolate_to_positions(*np.array(positions).T)
+
+    handles = [rsp_database.create_handle() for _ in positions]
+
+    for handle, (ra, dec) in zip(handles, positions):
+
+        handle.interpolate_to_position(ra, dec)
+
+    # the handles do not overwrite each other or the database
+
+    for i, handle in enumerate(handles):
+
+        assert handle.current_sky_position == positions[i]
+
+        assert np.allclose(handle.current_response.matrix, expected[i])
+
+    assert rsp_database.current_sky_position != positions[-1]
+
+    # nor do plugins sharing the database
+
+    plugins = [
+        RBallLike.from_ogip(
+            f"demo{i}",
+            observation=get_path_of_data_file("demo.pha"),
+            spectrum_number=1,
+            response_database=rsp_database,
+            free_position=False,
+        )
+        for i in range(2)
+    ]
+
+    for plugin, (ra, dec) in zip(plugins, positions):
+
+        ps = PointSource(
+            "ps", ra, dec, spectral_shape=Powerlaw(K=1, index=-2, piv=100)
+        )
+
+        plugin.set_model(Model(ps))
+
+    for i, plugin in enumerate(plugins):
+
+        assert np.allclose(
+            plugin.response_handle.current_response.matrix, expected[i]
+        )
+
+    # the response is interpolated in place and folds with the new matrix
+
+    response = handles[0].current_response
+
+    matrix = response.matrix
+
+    handles[0].interpolate_to_position(*positions[1])
+
+    assert response.matrix is matrix
+
+    assert np.allclose(matrix, expected[1])
+
+    fluxes = np.ones(matrix.shape[1])
+
+    assert np.allclose(response.convolve(fluxes), expected[1].dot(fluxes))
+
+
+def test_threaded_response_handles(rsp_database: ResponseDatabase):
+
+    rng = np.random.default_rng(1)
+
+    ra = rng.uniform(0, 360, size=(4, 50))
+    dec = rng.uniform(-80, 80, size=(4, 50))
+
+    def walk(i):
+
+        handle = rsp_database.create_handle()
+
+        matrices = []
+
+        for r, d in zip(ra[i], dec[i]):
+
+            handle.interpolate_to_position(r, d)
+
+            matrices.append(handle.current_response.matrix.copy())
+
+        return np.array(matrices)
+
+    with ThreadPoolExecutor(4) as pool:
+
+        results = list(pool.map(walk, range(4)))
+
+    for i in range(4):
+
+        expected = rsp_database.interpolate_to_positions(ra[i], dec[i])
+
+        assert np.allclose(results[i], expected)
+
+
 def test_grid_generator():
 
     gg = GridGenerator(refinement_levels=2)
@@ -63,3 +828,106 @@ def test_grid_generator():
     assert np.alltrue(gg.phi == gg.lons)
 
     assert len(gg.xyz) == gg.n_grid_points
+
+
+def test_synthetic_database():
+
+    db = generate_synthetic_database(
+        refinement_levels=1, n_channels=32, n_mc=40, seed=1
+    )
+
+    assert db.n_grid_points == GridGenerator(1).n_grid_points
+
+    assert db.storage.matrix_shape == (32, 40)
+
+    assert db.metadata["refinement_levels"] == 1
+
+    # the area is largest at the boresight
+
+    db.interpolate_to_position(0.0, 0.0)
+
+    on_axis = db.current_response.matrix.sum()
+
+    db.interpolate_to_position(180.0, 0.0)
+
+    assert db.current_response.matrix.sum() < 0.1 * on_axis
+
+    # and the redistribution is a band
+
+    assert isinstance(db.storage, SparseMatrixStorage)
+
+
+def test_walking_point_location():
+
+    gg = GridGenerator(refinement_levels=3)
+
+    walker = PointLocator(gg.theta, gg.phi)
+    cold = pickle.loads(
+        pickle.dumps(PointLocator(gg.theta, gg.phi, warm_start=False))
+    )
+
+    values = np.random.uniform(size=gg.n_grid_points)
+
+    lon = np.random.uniform(0, 2 * np.pi, size=200)
+    lat = np.arcsin(np.random.uniform(-1, 1, size=200))
+
+    # compare against the stripy search
+
+    bbc, tri = walker.triangulation.containing_simplex_and_bcc(lon, lat)
+
+    expected = (bbc * values[tri]).sum(axis=1)
+
+    for locator in (walker, cold):
+
+        for i in range(200):
+
+            w, s = locator.locate(lon[i], lat[i])
+
+            assert np.isclose(w.dot(values[s]), expected[i])
+
+        w, s = locator.locate_many(lon, lat)
+
+        assert np.allclose((w * values[s]).sum(axis=1), expected)
+
+    stats = walker.walk_statistics
+
+    assert stats["n_queries"] == 400
+
+    assert sum(stats["walk_length_histogram"]) + stats["n_fallbacks"] == 400
+
+    assert cold.walk_statistics["n_fallbacks"] == 400
+
+
+def test_multi_response_database(rsp_database: ResponseDatabase):
+
+    matrices = rsp_database.matrices
+
+    ebounds = rsp_database.ebounds
+
+    multi_db = MultiResponseDatabase(
+        matrices=dict(a=matrices, b=matrices[:, :64]),
+        theta=rsp_database.theta,
+        phi=rsp_database.phi,
+        ebounds=dict(a=ebounds, b=ebounds[:65]),
+        monte_carlo_energies=rsp_database.monte_carlo_energies,
+    )
+
+    assert multi_db.detectors == ["a", "b"]
+
+    assert multi_db["a"].locator is multi_db["b"].locator
+
+    multi_db.interpolate_to_position(10.0, 10.0)
+
+    rsp_database.interpolate_to_position(10.0, 10.0)
+
+    expected = rsp_database.current_response.matrix
+
+    assert np.allclose(multi_db["a"].current_response.matrix, expected)
+
+    assert np.allclose(multi_db["b"].current_response.matrix, expected[:64])
+
+    stacks = multi_db.interpolate_to_positions([10.0, 20.0], [10.0, 20.0])
+
+    assert np.allclose(stacks["a"][0], expected)
+
+    assert np.allclose(stacks["b"][0], expected[:64])
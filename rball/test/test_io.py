@@ -0,0 +1,130 @@
+import numpy as np
+import pytest
+
+from rball import ResponseDatabase
+from rball.point_location import PointLocator, grid_hash
+
+
+@pytest.mark.parametrize("compression", [None, "gzip", "lzf"])
+def test_hdf5_round_trip(rsp_database: ResponseDatabase, tmp_path, compression):
+
+    db = ResponseDatabase(
+        list_of_matrices=rsp_database.matrices,
+        theta=rsp_database.theta,
+        phi=rsp_database.phi,
+        ebounds=rsp_database.ebounds,
+        monte_carlo_energies=rsp_database.monte_carlo_energies,
+        metadata=dict(refinement_level=2, frame="instrument"),
+    )
+
+    file_name = tmp_path / "db.h5"
+
+    db.to_hdf5(file_name, compression=compression)
+
+    # do not clobber files
+
+    with pytest.raises(RuntimeError):
+
+        db.to_hdf5(file_name)
+
+    new_db = ResponseDatabase.from_hdf5(file_name)
+
+    assert np.all(new_db.matrices == db.matrices)
+
+    assert np.all(new_db.theta == db.theta)
+
+    assert np.all(new_db.phi == db.phi)
+
+    assert new_db.metadata["refinement_level"] == 2
+
+    assert new_db.metadata["frame"] == "instrument"
+
+    # None is skipped, values HDF5 can not store are
+    # rejected before anything is written
+
+    db.metadata["comment"] = None
+
+    db.to_hdf5(file_name, overwrite=True)
+
+    assert "comment" not in ResponseDatabase.from_hdf5(file_name).metadata
+
+    db.metadata["comment"] = dict(a=1)
+
+    bad_file_name = tmp_path / "bad.h5"
+
+    with pytest.raises(RuntimeError):
+
+        db.to_hdf5(bad_file_name)
+
+    assert not bad_file_name.exists()
+
+    # the triangulation is read back instead of rebuilt
+
+    assert np.all(new_db.locator.simplices == db.locator.simplices)
+
+    new_db.interpolate_to_position(10.0, 10.0)
+    db.interpolate_to_position(10.0, 10.0)
+
+    assert np.allclose(
+        new_db.current_response.matrix, db.current_response.matrix
+    )
+
+
+def _triangles(locator: PointLocator):
+
+    # the ordered triangles independent of the rotation of the
+    # vertices and the order of the simplices
+
+    return {
+        tuple(np.roll(s, -np.argmin(s))) for s in locator.simplices.tolist()
+    }
+
+
+def test_triangulation_cache(rsp_database: ResponseDatabase, tmp_path):
+
+    theta = rsp_database.theta
+    phi = rsp_database.phi
+
+    locator = PointLocator.from_cache(theta, phi, cache_dir=tmp_path)
+
+    assert (tmp_path / f"{grid_hash(theta, phi)}.npz").exists()
+
+    cached = PointLocator.from_cache(theta, phi, cache_dir=tmp_path)
+
+    assert np.all(cached.simplices == locator.simplices)
+
+    assert np.all(cached.neighbours == locator.neighbours)
+
+    w1, s1 = cached.locate(0.3, 0.2)
+    w2, s2 = locator.locate(0.3, 0.2)
+
+    assert np.allclose(w1, w2)
+
+    assert np.all(s1 == s2)
+
+    # broken or outdated files are rebuilt
+
+    file_name = tmp_path / f"{grid_hash(theta, phi)}.npz"
+
+    file_name.write_bytes(b"PK\x03\x04garbage")
+
+    rebuilt = PointLocator.from_cache(theta, phi, cache_dir=tmp_path)
+
+    assert _triangles(rebuilt) == _triangles(locator)
+
+    np.savez(
+        file_name,
+        version=0,
+        grid_hash=grid_hash(theta, phi),
+        points=locator.points,
+        simplices=locator.simplices[:, ::-1],
+        neighbours=locator.neighbours,
+    )
+
+    rebuilt = PointLocator.from_cache(theta, phi, cache_dir=tmp_path)
+
+    assert _triangles(rebuilt) == _triangles(locator)
+
+    # a different grid gets its own file
+
+    assert grid_hash(theta, phi) != grid_hash(theta[::-1], phi[::-1])
@@ -0,0 +1,375 @@
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor
+import pickle
+
+import numpy as np
+import pytest
+
+from rball import ResponseDatabase
+from rball.storage import (
+    DenseMatrixStorage,
+    LazyMatrixStorage,
+    LowRankMatrixStorage,
+    SharedMatrixStorage,
+    SparseMatrixStorage,
+    build_storage,
+)
+
+
+def _copy_database(rsp_database: ResponseDatabase, storage):
+
+    return ResponseDatabase(
+        list_of_matrices=storage,
+        theta=rsp_database.theta,
+        phi=rsp_database.phi,
+        ebounds=rsp_database.ebounds,
+        monte_carlo_energies=rsp_database.monte_carlo_energies,
+    )
+
+
+@pytest.mark.parametrize("prefetch", [False, True])
+def test_lazy_hdf5(rsp_database: ResponseDatabase, tmp_path, prefetch):
+
+    file_name = tmp_path / "db.h5"
+
+    rsp_database.to_hdf5(file_name)
+
+    lazy_db = ResponseDatabase.from_hdf5(
+        file_name, lazy=True, max_resident=8, prefetch=prefetch
+    )
+
+    for ra, dec in [(10.0, 10.0), (10.5, 10.2), (200.0, -45.0)]:
+
+        rsp_database.interpolate_to_position(ra, dec)
+        lazy_db.interpolate_to_position(ra, dec)
+
+        assert np.allclose(
+            lazy_db.current_response.matrix,
+            rsp_database.current_response.matrix,
+        )
+
+    assert lazy_db.storage.n_resident <= 8
+
+    lazy_db.storage.close()
+
+
+def test_lazy_npy_pickle(rsp_database: ResponseDatabase, tmp_path):
+
+    file_name = tmp_path / "db.npy"
+
+    np.save(file_name, rsp_database.matrices)
+
+    lazy_db = _copy_database(
+        rsp_database, LazyMatrixStorage.from_npy(file_name, max_resident=4)
+    )
+
+    # only the file location is pickled
+
+    assert len(pickle.dumps(lazy_db.storage)) < 1000
+
+    new_db = pickle.loads(pickle.dumps(lazy_db))
+
+    new_db.interpolate_to_position(10.0, 10.0)
+    rsp_database.interpolate_to_position(10.0, 10.0)
+
+    assert np.allclose(
+        new_db.current_response.matrix, rsp_database.current_response.matrix
+    )
+
+
+def _interpolate_in_worker(db: ResponseDatabase) -> np.ndarray:
+
+    db.interpolate_to_position(10.0, 10.0)
+
+    return db.current_response.matrix
+
+
+def test_shared_storage(rsp_database: ResponseDatabase):
+
+    shared_db = ResponseDatabase(
+        list_of_matrices=rsp_database.matrices,
+        theta=rsp_database.theta,
+        phi=rsp_database.phi,
+        ebounds=rsp_database.ebounds,
+        monte_carlo_energies=rsp_database.monte_carlo_energies,
+        storage_type="shared",
+    )
+
+    storage = shared_db.storage
+
+    assert isinstance(storage, SharedMatrixStorage)
+
+    assert storage.is_owner
+
+    # only the name of the segment is pickled
+
+    assert len(pickle.dumps(storage)) < 1000
+
+    attached = pickle.loads(pickle.dumps(storage))
+
+    assert attached.name == storage.name
+
+    assert not attached.is_owner
+
+    assert attached.nbytes == 0
+
+    assert np.all(attached.to_array() == rsp_database.matrices)
+
+    rsp_database.interpolate_to_position(10.0, 10.0)
+
+    with multiprocessing.get_context("spawn").Pool(1) as pool:
+
+        matrix = pool.apply(_interpolate_in_worker, (shared_db,))
+
+    assert np.allclose(matrix, rsp_database.current_response.matrix)
+
+
+def test_sparse_storage(rsp_database: ResponseDatabase):
+
+    # cut the tails of the redistribution to get a band
+
+    matrices = rsp_database.matrices.copy()
+
+    matrices[matrices < 1e-3 * matrices.max()] = 0
+
+    sparse_db = ResponseDatabase(
+        list_of_matrices=matrices,
+        theta=rsp_database.theta,
+        phi=rsp_database.phi,
+        ebounds=rsp_database.ebounds,
+        monte_carlo_energies=rsp_database.monte_carlo_energies,
+    )
+
+    assert isinstance(sparse_db.storage, SparseMatrixStorage)
+
+    assert sparse_db.storage.nbytes < matrices.nbytes
+
+    dense_db = _copy_database(rsp_database, DenseMatrixStorage(matrices))
+
+    ra = np.array([10.0, 150.0, 300.0])
+    dec = np.array([10.0, 0.0, -60.0])
+
+    for i in range(3):
+
+        sparse_db.interpolate_to_position(ra[i], dec[i])
+        dense_db.interpolate_to_position(ra[i], dec[i])
+
+        assert np.allclose(
+            sparse_db.current_response.matrix,
+            dense_db.current_response.matrix,
+        )
+
+    assert np.allclose(
+        sparse_db.interpolate_to_positions(ra, dec),
+        dense_db.interpolate_to_positions(ra, dec),
+    )
+
+    weights, simplex = dense_db.locate(10.0, 10.0)
+
+    fluxes = np.random.uniform(size=matrices.shape[2])
+
+    csr = sparse_db.storage.interpolate_sparse(weights, simplex)
+
+    dense_db.interpolate_to_position(10.0, 10.0)
+
+    assert np.allclose(csr.toarray(), dense_db.current_response.matrix)
+
+    for v in simplex:
+
+        assert np.allclose(
+            sparse_db.storage.fold(v, fluxes), matrices[v].dot(fluxes)
+        )
+
+    # writes to the response outside of the band do not survive
+
+    sparse_db.current_response.matrix[:] = 1.0
+
+    sparse_db.interpolate_to_position(10.0, 10.0)
+
+    assert np.allclose(
+        sparse_db.current_response.matrix, dense_db.current_response.matrix
+    )
+
+    # scattered non zero columns give a wide band, which is kept dense
+
+    scattered = np.zeros_like(matrices)
+
+    scattered[:, :, ::5] = 1.0
+
+    assert isinstance(build_storage(scattered), DenseMatrixStorage)
+
+
+def test_low_rank_storage(rsp_database: ResponseDatabase):
+
+    low_rank_db = ResponseDatabase(
+        list_of_matrices=rsp_database.matrices,
+        theta=rsp_database.theta,
+        phi=rsp_database.phi,
+        ebounds=rsp_database.ebounds,
+        monte_carlo_energies=rsp_database.monte_carlo_energies,
+        storage_type="low_rank",
+        storage_options=dict(tolerance=1e-6),
+    )
+
+    storage = low_rank_db.storage
+
+    assert isinstance(storage, LowRankMatrixStorage)
+
+    assert storage.rank < rsp_database.n_grid_points
+
+    assert storage.reconstruction_error["max_relative_error"] < 1e-4
+
+    ra = np.array([10.0, 150.0, 300.0])
+    dec = np.array([10.0, 0.0, -60.0])
+
+    stack = rsp_database.interpolate_to_positions(ra, dec)
+
+    scale = stack.max()
+
+    assert np.allclose(
+        low_rank_db.interpolate_to_positions(ra, dec), stack, atol=1e-4 * scale
+    )
+
+    low_rank_db.interpolate_to_position(ra[0], dec[0])
+
+    assert np.allclose(
+        low_rank_db.current_response.matrix, stack[0], atol=1e-4 * scale
+    )
+
+    fluxes = np.random.uniform(size=stack.shape[2])
+
+    for v in range(3):
+
+        expected = rsp_database.matrices[v].dot(fluxes)
+
+        assert np.allclose(
+            storage.fold(v, fluxes), expected, atol=1e-4 * expected.max()
+        )
+
+    # the blend is linear in weights which do not sum to one
+
+    weights = np.array([0.5, -0.2, 0.1])
+
+    blend = storage.interpolate(
+        weights, np.arange(3), np.empty(stack.shape[1:])
+    )
+
+    expected = np.tensordot(weights, rsp_database.matrices[:3], axes=1)
+
+    assert np.allclose(blend, expected, atol=1e-4 * scale)
+
+    # threads folding different spectra do not mix them
+
+    spectra = [np.random.uniform(size=stack.shape[2]) for _ in range(4)]
+
+    def fold_all(fluxes):
+
+        return [storage.fold(v, fluxes) for v in range(10) for _ in range(5)]
+
+    with ThreadPoolExecutor(4) as pool:
+
+        results = list(pool.map(fold_all, spectra * 4))
+
+    for fluxes, result in zip(spectra * 4, results):
+
+        for i, folded in enumerate(result):
+
+            expected = rsp_database.matrices[i // 5].dot(fluxes)
+
+            assert np.allclose(folded, expected, atol=1e-4 * expected.max())
+
+
+@pytest.mark.parametrize("precision", ["float32", "float16", "uint16"])
+def test_reduced_precision_storage(rsp_database: ResponseDatabase, precision):
+
+    matrices = rsp_database.matrices
+
+    reduced_db = ResponseDatabase(
+        list_of_matrices=matrices,
+        theta=rsp_database.theta,
+        phi=rsp_database.phi,
+        ebounds=rsp_database.ebounds,
+        monte_carlo_energies=rsp_database.monte_carlo_energies,
+        storage_options=dict(precision=precision),
+    )
+
+    storage = reduced_db.storage
+
+    assert isinstance(storage, DenseMatrixStorage)
+
+    assert storage.precision == precision
+
+    assert storage.nbytes < matrices.nbytes
+
+    error = storage.precision_error["max_relative_error"]
+
+    assert 0 < error < 1e-3
+
+    assert storage.get_matrix(3).dtype == np.float64
+
+    assert np.abs(storage.to_array() - matrices).max() <= error * np.abs(
+        matrices
+    ).max() * (1 + 1e-6)
+
+    ra = np.array([10.0, 150.0, 300.0])
+    dec = np.array([10.0, 0.0, -60.0])
+
+    stack = rsp_database.interpolate_to_positions(ra, dec)
+
+    tolerance = error * matrices.max()
+
+    assert np.allclose(
+        reduced_db.interpolate_to_positions(ra, dec), stack, atol=tolerance
+    )
+
+    reduced_db.interpolate_to_position(ra[1], dec[1])
+
+    assert reduced_db.current_response.matrix.dtype == np.float64
+
+    assert np.allclose(
+        reduced_db.current_response.matrix, stack[1], atol=tolerance
+    )
+
+
+@pytest.mark.parametrize(
+    "storage_type, options",
+    [
+        ("dense", {}),
+        ("dense", dict(precision="float16")),
+        ("dense", dict(precision="uint16")),
+        ("sparse", {}),
+        ("low_rank", {}),
+    ],
+)
+def test_block_interpolation(
+    rsp_database: ResponseDatabase, storage_type, options
+):
+
+    storage = build_storage(
+        rsp_database.matrices, storage_type=storage_type, **options
+    )
+
+    weights = np.array([0.2, 0.3, 0.5])
+    indices = np.array([3, 17, 40])
+
+    full = storage.interpolate(weights, indices, np.empty(storage.matrix_shape))
+
+    # a gap in the channels and a window of the MC bins
+
+    rows = np.concatenate([np.arange(5, 30), np.arange(40, 100)])
+
+    start, stop = 20, 90
+
+    out = np.full(storage.matrix_shape, -1.0)
+
+    storage.interpolate_block(weights, indices, rows, start, stop, out)
+
+    assert np.allclose(out[rows, start:stop], full[rows, start:stop])
+
+    # the rest is not touched
+
+    untouched = np.ones(storage.matrix_shape, dtype=bool)
+
+    untouched[np.ix_(rows, np.arange(start, stop))] = False
+
+    assert np.all(out[untouched] == -1.0)
@@ -1,5 +1,4 @@
 import numpy as np
-from stripy.spherical_meshes import icosahedral_mesh
 
 
 class GridGenerator:
@@ -15,6 +14,8 @@ class GridGenerator:
         :returns:
 
         """
+        from stripy.spherical_meshes import icosahedral_mesh
+
         self._mesh = icosahedral_mesh(
             refinement_levels=refinement_levels, include_face_points=True
         )
@@ -0,0 +1,230 @@
+import json
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional, Union
+
+import numpy as np
+
+# the clock of all stages
+
+perf_counter = time.perf_counter
+
+
+class StageTimers:
+    def __init__(self):
+        """
+        Call counts and cumulative wall time of the stages of the
+        hot path (e.g. lookup, blend, fold) and the
+        peak memory seen while they ran.
+
+        The owners keep None instead of a StageTimers while
+        instrumentation is off, so that the hot path only pays for
+        an is None check. A stage is timed as
+
+            start = perf_counter()
+            ...
+            start = timers.record("lookup", start)
+            ...
+            timers.record("blend", start)
+
+        :returns:
+
+        """
+
+        self._lock = threading.Lock()
+
+        self._calls: Dict[str, int] = {}
+        self._times: Dict[str, float] = {}
+
+        self._peak_nbytes: int = 0
+
+    def record(self, stage: str, start: float) -> float:
+        """
+        add a call of a stage that started at start
+
+        :param stage: the name of the stage
+        :type stage: str
+        :param start: the perf_counter at the start of the call
+        :type start: float
+        :returns: the perf_counter at the end, i.e. the
+        start of the next stage
+
+        """
+
+        stop = perf_counter()
+
+        with self._lock:
+
+            self._calls[stage] = self._calls.get(stage, 0) + 1
+
+            self._times[stage] = self._times.get(stage, 0.0) + stop - start
+
+        return stop
+
+    def update_peak(self, nbytes: int) -> None:
+
+        if nbytes > self._peak_nbytes:
+
+            self._peak_nbytes = nbytes
+
+    @property
+    def peak_nbytes(self) -> int:
+
+        return self._peak_nbytes
+
+    def reset(self) -> None:
+
+        with self._lock:
+
+            self._calls.clear()
+            self._times.clear()
+
+            self._peak_nbytes = 0
+
+    def __getstate__(self):
+
+        # the counters belong to the process that collected them
+
+        return {}
+
+    def __setstate__(self, state):
+
+        self.__init__()
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        """
+        the calls, the total and the mean time in seconds of each stage
+        """
+
+        with self._lock:
+
+            return {
+                stage: dict(
+                    calls=calls,
+                    time=self._times[stage],
+                    mean_time=self._times[stage] / calls,
+                )
+                for stage, calls in self._calls.items()
+            }
+
+
+def hit_ratio(hits: int, misses: int) -> Optional[float]:
+
+    if hits + misses == 0:
+
+        return None
+
+    return hits / (hits + misses)
+
+
+def to_json(
+    stats: Dict[str, Any], file_name: Optional[Union[str, Path]] = None
+) -> str:
+    """
+    serialize a stats dict and optionally write it to a file
+
+    :param stats: the stats, e.g. from ResponseDatabase.stats()
+    :type stats: Dict[str, Any]
+    :param file_name: the file to write to
+    :type file_name: Optional[Union[str, Path]]
+    :returns: the JSON string
+
+    """
+
+    text = json.dumps(stats, indent=2, default=_to_builtin)
+
+    if file_name is not None:
+
+        Path(file_name).write_text(text)
+
+    return text
+
+
+def _to_builtin(value: Any) -> Any:
+
+    if isinstance(value, np.ndarray):
+
+        return value.tolist()
+
+    if isinstance(value, np.generic):
+
+        return value.item()
+
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+class Profile:
+    def __init__(self):
+        """
+        the stats collected by profile()
+        """
+
+        self._stats: Optional[Dict[str, Any]] = None
+
+        self._wall_time: Optional[float] = None
+
+    @property
+    def stats(self) -> Optional[Dict[str, Any]]:
+        """
+        the stats of the profiled object, None while profiling
+        """
+
+        return self._stats
+
+    @property
+    def wall_time(self) -> Optional[float]:
+        """
+        the wall time of the profiled block in seconds
+        """
+
+        return self._wall_time
+
+    def to_json(self, file_name: Optional[Union[str, Path]] = None) -> str:
+
+        return to_json(
+            dict(wall_time=self._wall_time, **(self._stats or {})), file_name
+        )
+
+
+@contextmanager
+def profile(target) -> Iterator[Profile]:
+    """
+    collect the stats of a ResponseDatabase or RBallLike over a
+    block, e.g. a sampling run. The counters are reset at the start
+    and instrumentation is switched off at the end unless it was
+    already on
+
+        with profile(plugin) as report:
+
+            bayes.sample()
+
+        report.to_json("profile.json")
+
+    :param target: a ResponseDatabase or RBallLike
+    :returns: the Profile which is filled when the block exits
+
+    """
+
+    report = Profile()
+
+    was_enabled = target.instrumentation_enabled
+
+    target.enable_instrumentation(reset=True)
+
+    start = perf_counter()
+
+    try:
+
+        yield report
+
+    finally:
+
+        report._wall_time = perf_counter() - start
+
+        report._stats = target.stats()
+
+        if not was_enabled:
+
+            target.disable_instrumentation()
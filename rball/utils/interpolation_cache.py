@@ -0,0 +1,142 @@
+import threading
+from collections import OrderedDict
+from typing import Dict, Hashable, Optional
+
+import numpy as np
+
+
+class InterpolationCache:
+    def __init__(self, max_size: int = 128, resolution: Optional[float] = None):
+        """
+        A least recently used cache of interpolated matrices keyed
+        on the sky position.
+
+        With no resolution only exactly equal positions are hits.
+        With a resolution (in degrees) positions are snapped to a grid
+        of that spacing first so that nearly identical positions
+        share an entry.
+
+        :param max_size: the max number of matrices held
+        :type max_size: int
+        :param resolution: the quantization of the keys in degree
+        :type resolution: Optional[float]
+        :returns:
+
+        """
+
+        self._max_size: int = max_size
+        self._resolution: Optional[float] = resolution
+
+        self._store: "OrderedDict[Hashable, np.ndarray]" = OrderedDict()
+
+        self._lock = threading.Lock()
+
+        self._hits: int = 0
+        self._misses: int = 0
+
+    def key(self, ra: float, dec: float) -> Hashable:
+
+        if self._resolution is None:
+
+            return (float(ra), float(dec))
+
+        return (
+            int(np.floor(ra / self._resolution + 0.5)),
+            int(np.floor(dec / self._resolution + 0.5)),
+        )
+
+    def get(self, key: Hashable) -> Optional[np.ndarray]:
+
+        with self._lock:
+
+            matrix = self._store.get(key)
+
+            if matrix is None:
+
+                self._misses += 1
+
+                return None
+
+            self._store.move_to_end(key)
+
+            self._hits += 1
+
+            return matrix
+
+    def put(self, key: Hashable, matrix: np.ndarray) -> None:
+        """
+        store a copy of the matrix
+
+        :param key: the key from key()
+        :type key: Hashable
+        :param matrix: the interpolated matrix
+        :type matrix: np.ndarray
+        :returns:
+
+        """
+
+        with self._lock:
+
+            self._store[key] = matrix.copy()
+
+            self._store.move_to_end(key)
+
+            while len(self._store) > self._max_size:
+
+                self._store.popitem(last=False)
+
+    def clear(self) -> None:
+
+        with self._lock:
+
+            self._store.clear()
+
+            self._hits = 0
+            self._misses = 0
+
+    def reset_info(self) -> None:
+        """
+        reset the hits and misses but keep the matrices
+        """
+
+        with self._lock:
+
+            self._hits = 0
+            self._misses = 0
+
+    @property
+    def nbytes(self) -> int:
+        """
+        the bytes of the cached matrices
+        """
+
+        with self._lock:
+
+            # all entries have the shape of the database matrices
+
+            for matrix in self._store.values():
+
+                return len(self._store) * matrix.nbytes
+
+        return 0
+
+    @property
+    def info(self) -> Dict[str, int]:
+
+        return dict(
+            hits=self._hits,
+            misses=self._misses,
+            size=len(self._store),
+            max_size=self._max_size,
+        )
+
+    def __getstate__(self):
+
+        # the cached matrices are not sent to other
+        # processes, only the settings
+
+        return dict(max_size=self._max_size, resolution=self._resolution)
+
+    def __setstate__(self, state):
+
+        self.__init__(**state)
@@ -272,11 +272,13 @@ class LogFilter(object):
         return logRecord.levelno != self.__level
 
 
-# now create the developer handler that rotates every day and keeps
-# 10 days worth of backup
-rball_dev_log_handler = handlers.TimedRotatingFileHandler(
-    get_path_of_log_file("dev.log"), when="D", interval=1, backupCount=10
-)
+# the messages of the hot path (e.g. every interpolation) are
+# logged at this level below DEBUG. No handler takes it by default,
+# so these messages are dropped before they are formatted
+
+TRACE = 5
+
+logging.addLevelName(TRACE, "TRACE")
 
 # lots of info written out
 
@@ -285,22 +287,71 @@ _dev_formatter = logging.Formatter(
     datefmt="%Y-%m-%d %H:%M:%S",
 )
 
-rball_dev_log_handler.setFormatter(_dev_formatter)
-rball_dev_log_handler.setLevel(logging.DEBUG)
-# now set up the usr log which will save the info
-
-rball_usr_log_handler = handlers.TimedRotatingFileHandler(
-    get_path_of_log_file("usr.log"), when="D", interval=1, backupCount=10
+_usr_formatter = logging.Formatter(
+    "%(asctime)s | %(levelname)s | %(message)s", datefmt="%Y-%m-%d %H:%M:%S"
 )
 
-rball_usr_log_handler.setLevel(logging.INFO)
+# file logging can be switched off with RBALL_FILE_LOGGING=0, e.g.
+# for the worker processes of a pool
 
-# lots of info written out
-_usr_formatter = logging.Formatter(
-    "%(asctime)s | %(levelname)s | %(message)s", datefmt="%Y-%m-%d %H:%M:%S"
+_file_logging = os.environ.get("RBALL_FILE_LOGGING", "1").lower() not in (
+    "0",
+    "false",
+    "no",
+    "off",
 )
 
-rball_usr_log_handler.setFormatter(_usr_formatter)
+# the file handlers are only created when they are first needed
+
+_file_handlers = []
+
+_queue_handler = None
+
+_warnings_silenced = False
+
+_loggers = []
+
+
+def _get_file_handlers():
+
+    if not _file_handlers:
+
+        # now create the developer handler that rotates every day and
+        # keeps 10 days worth of backup. The files are only opened
+        # when the first message is written
+
+        rball_dev_log_handler = handlers.TimedRotatingFileHandler(
+            get_path_of_log_file("dev.log"),
+            when="D",
+            interval=1,
+            backupCount=10,
+            delay=True,
+        )
+
+        rball_dev_log_handler.setFormatter(_dev_formatter)
+        rball_dev_log_handler.setLevel(logging.DEBUG)
+
+        # now set up the usr log which will save the info
+
+        rball_usr_log_handler = handlers.TimedRotatingFileHandler(
+            get_path_of_log_file("usr.log"),
+            when="D",
+            interval=1,
+            backupCount=10,
+            delay=True,
+        )
+
+        rball_usr_log_handler.setLevel(logging.INFO)
+        rball_usr_log_handler.setFormatter(_usr_formatter)
+
+        if _warnings_silenced:
+
+            rball_usr_log_handler.addFilter(warning_filter)
+
+        _file_handlers.extend([rball_dev_log_handler, rball_usr_log_handler])
+
+    return _file_handlers
+
 
 # now set up the console logger
 name = "test"
@@ -325,13 +376,145 @@ rball_console_log_handler.setLevel("INFO")
 warning_filter = LogFilter(logging.WARNING)
 
 
+def _active_handlers():
+
+    active = [rball_console_log_handler]
+
+    if _queue_handler is not None:
+
+        active.append(_queue_handler)
+
+    elif _file_logging:
+
+        active.extend(_get_file_handlers())
+
+    return active
+
+
+def _configure(log):
+
+    active = _active_handlers()
+
+    for handler in list(log.handlers):
+
+        if handler not in active:
+
+            log.removeHandler(handler)
+
+    for handler in active:
+
+        if handler not in log.handlers:
+
+            log.addHandler(handler)
+
+    # the logger drops what no handler would write
+    # before the message is formatted
+
+    log.setLevel(min(handler.level for handler in active))
+
+
+def _reconfigure():
+
+    for log in _loggers:
+
+        _configure(log)
+
+
+def enable_file_logging():
+    """
+    write the dev and usr logs to ~/.log/rball
+    """
+
+    global _file_logging
+
+    _file_logging = True
+
+    _reconfigure()
+
+
+def disable_file_logging():
+    """
+    only log to the console. Can also be set
+    with the environment variable RBALL_FILE_LOGGING=0
+    """
+
+    global _file_logging
+
+    _file_logging = False
+
+    _reconfigure()
+
+
+def log_to_queue(queue):
+    """
+    send the records that would go to the log files to a queue
+    instead, e.g. in the workers of a process pool, so that only
+    the process running start_log_listener writes the files.
+    None goes back to the files
+
+        queue = multiprocessing.Queue()
+        listener = start_log_listener(queue)
+
+        pool = multiprocessing.Pool(
+            initializer=log_to_queue, initargs=(queue,)
+        )
+        ...
+        pool.close()
+        pool.join()
+        listener.stop()
+
+    :param queue: a multiprocessing queue or None
+    :returns:
+
+    """
+
+    global _queue_handler
+
+    if queue is None:
+
+        _queue_handler = None
+
+    else:
+
+        _queue_handler = handlers.QueueHandler(queue)
+
+        _queue_handler.setLevel(logging.DEBUG)
+
+    _reconfigure()
+
+
+def start_log_listener(queue):
+    """
+    write the records that the workers send to a queue with
+    log_to_queue into the log files. Stop the returned listener
+    when the workers are done
+
+    :param queue: the multiprocessing queue
+    :returns: the started QueueListener
+
+    """
+
+    listener = handlers.QueueListener(
+        queue, *_get_file_handlers(), respect_handler_level=True
+    )
+
+    listener.start()
+
+    return listener
+
+
 def silence_warnings():
     """
     supress warning messages in console and file usr logs
     """
 
-    rball_usr_log_handler.addFilter(warning_filter)
-    rball_console_log_handler.addFilter(warning_filter)
+    global _warnings_silenced
+
+    _warnings_silenced = True
+
+    for handler in [rball_console_log_handler] + _file_handlers[1:]:
+
+        handler.addFilter(warning_filter)
 
 
 def activate_warnings():
@@ -339,14 +522,21 @@ def activate_warnings():
     supress warning messages in console and file usr logs
     """
 
-    rball_usr_log_handler.removeFilter(warning_filter)
-    rball_console_log_handler.removeFilter(warning_filter)
+    global _warnings_silenced
+
+    _warnings_silenced = False
+
+    for handler in [rball_console_log_handler] + _file_handlers[1:]:
+
+        handler.removeFilter(warning_filter)
 
 
 def update_logging_level(level):
 
     rball_console_log_handler.setLevel(level)
 
+    _reconfigure()
+
 
 def setup_logger(name):
 
@@ -354,16 +544,14 @@ def setup_logger(name):
     # and then add it to the print stream
     log = logging.getLogger(name)
 
-    # this must be set to allow debug messages through
-    log.setLevel(logging.DEBUG)
-
-    # add the handlers
+    # add the handlers and set the level to let
+    # through what they write
 
-    log.addHandler(rball_dev_log_handler)
+    _configure(log)
 
-    log.addHandler(rball_console_log_handler)
+    if log not in _loggers:
 
-    log.addHandler(rball_usr_log_handler)
+        _loggers.append(log)
 
     # we do not want to duplicate teh messages in the parents
     log.propagate = False
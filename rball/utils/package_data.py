@@ -1,9 +1,8 @@
 import os
+from importlib.resources import files
 from pathlib import Path
 from shutil import copyfile
 
-import pkg_resources
-
 
 def get_path_of_data_dir() -> Path:
     """
@@ -12,7 +11,7 @@ def get_path_of_data_dir() -> Path:
     :returns:
 
     """
-    file_path: str = pkg_resources.resource_filename("rball", "data")
+    file_path: str = str(files("rball") / "data")
 
     return Path(file_path)
 
@@ -54,9 +53,9 @@ def get_path_of_log_dir() -> Path:
     """
     p: Path = Path("~/.log/rball").expanduser()
 
-    if not p.exists():
+    # many workers may start at once
 
-        p.mkdir(parents=True)
+    p.mkdir(parents=True, exist_ok=True)
 
     return p
 
@@ -82,15 +81,32 @@ def get_path_of_user_config() -> Path:
     """
     config_path: Path = Path().home() / ".config" / "rball"
 
-    if not config_path.exists():
-
-        config_path.mkdir(parents=True)
+    config_path.mkdir(parents=True, exist_ok=True)
 
     return config_path
 
 
+def get_path_of_triangulation_cache() -> Path:
+    """
+    get the path of the directory where the triangulations
+    of the grids are cached
+
+    :returns:
+
+    """
+    cache_path: Path = get_path_of_user_config() / "triangulations"
+
+    # many workers may start at once, so do not fail if
+    # another one just created it
+
+    cache_path.mkdir(parents=True, exist_ok=True)
+
+    return cache_path
+
+
 __all__ = [
     "get_path_of_data_file",
     "get_path_of_data_dir",
     "get_path_of_user_config",
+    "get_path_of_triangulation_cache",
 ]
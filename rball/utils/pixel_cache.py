@@ -0,0 +1,272 @@
+import math
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+
+from ..storage import MatrixStorage
+from .logging import setup_logger
+
+log = setup_logger(__name__)
+
+
+def pixel_nodes(resolution: float) -> Tuple[int, int, np.ndarray, np.ndarray]:
+    """
+    the nodes of an equal area pixelization of the sky: the pixels
+    are equally spaced in RA and sin(Dec) with a width of about
+    resolution degrees at the equator. The nodes are the corners of
+    the pixels, node (i, j) has the index j * n_ra + i
+
+    :param resolution: the width of the pixels in degree
+    :type resolution: float
+    :returns: (n_ra, n_z, ra, dec) with n_ra nodes in RA, n_z + 1
+    nodes in sin(Dec) and the (n_ra * (n_z + 1),) RA and Dec of the
+    nodes in degree
+
+    """
+
+    n_ra = int(math.ceil(360.0 / resolution))
+
+    n_z = int(math.ceil(2.0 / math.radians(resolution)))
+
+    ra = np.arange(n_ra) * (360.0 / n_ra)
+
+    dec = np.rad2deg(np.arcsin(np.linspace(-1.0, 1.0, n_z + 1)))
+
+    ra, dec = np.meshgrid(ra, dec)
+
+    return n_ra, n_z, ra.ravel(), dec.ravel()
+
+
+class PixelCache:
+    def __init__(
+        self,
+        storage: MatrixStorage,
+        resolution: float,
+        refine: bool = False,
+    ):
+        """
+        The responses pre interpolated onto the nodes of an equal
+        area pixelization (see pixel_nodes). A position is looked up
+        by index arithmetic instead of a simplex search.
+
+        Without refinement the matrix of the nearest node is used.
+        With refinement the pixel is split into two triangles and the
+        three nodes of the triangle containing the position are
+        blended linearly in RA and sin(Dec), like the simplices of
+        the database.
+
+        :param storage: the matrices of the nodes
+        :type storage: MatrixStorage
+        :param resolution: the resolution the nodes were made with
+        :type resolution: float
+        :param refine: blend the nodes around a position
+        :type refine: bool
+        :returns:
+
+        """
+
+        n_ra, n_z, _, _ = pixel_nodes(resolution)
+
+        if storage.n_grid_points != n_ra * (n_z + 1):
+
+            log.error(
+                f"expected {n_ra * (n_z + 1)} nodes for a resolution of"
+                f" {resolution} deg not {storage.n_grid_points}"
+            )
+
+            raise AssertionError()
+
+        self._storage: MatrixStorage = storage
+
+        self._resolution: float = resolution
+
+        self._refine: bool = refine
+
+        self._n_ra: int = n_ra
+        self._n_z: int = n_z
+
+        self._d_ra: float = 360.0 / n_ra
+        self._d_z: float = 2.0 / n_z
+
+    @property
+    def storage(self) -> MatrixStorage:
+
+        return self._storage
+
+    @property
+    def resolution(self) -> float:
+
+        return self._resolution
+
+    @property
+    def refine(self) -> bool:
+
+        return self._refine
+
+    @property
+    def n_nodes(self) -> int:
+
+        return self._storage.n_grid_points
+
+    @property
+    def nbytes(self) -> int:
+
+        return self._storage.nbytes
+
+    @property
+    def info(self) -> Dict[str, Any]:
+
+        return dict(
+            resolution=self._resolution,
+            refine=self._refine,
+            n_nodes=self.n_nodes,
+            nbytes=self.nbytes,
+        )
+
+    def lookup(self, ra: float, dec: float) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        the weights and indices of the nodes of a position
+
+        :param ra: the RA in degree
+        :type ra: float
+        :param dec: the Dec in degree
+        :type dec: float
+        :returns: (weights, indices) of three nodes
+
+        """
+
+        x = (ra % 360.0) / self._d_ra
+
+        y = (math.sin(math.radians(dec)) + 1.0) / self._d_z
+
+        if not self._refine:
+
+            index = (
+                min(int(y + 0.5), self._n_z) * self._n_ra
+                + int(x + 0.5) % self._n_ra
+            )
+
+            return np.array([1.0, 0.0, 0.0]), np.array([index] * 3)
+
+        i = int(x)
+        j = min(int(y), self._n_z - 1)
+
+        fx = x - i
+        fz = min(y - j, 1.0)
+
+        i0 = (i % self._n_ra) + j * self._n_ra
+        i1 = ((i + 1) % self._n_ra) + j * self._n_ra
+
+        if fx >= fz:
+
+            return (
+                np.array([1.0 - fx, fx - fz, fz]),
+                np.array([i0, i1, i1 + self._n_ra]),
+            )
+
+        return (
+            np.array([1.0 - fz, fz - fx, fx]),
+            np.array([i0, i0 + self._n_ra, i1 + self._n_ra]),
+        )
+
+    def lookup_many(
+        self, ra: np.ndarray, dec: np.ndarray
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        the weights and indices of the nodes of many positions
+
+        :param ra: the RAs in degree
+        :type ra: np.ndarray
+        :param dec: the Decs in degree
+        :type dec: np.ndarray
+        :returns: (N, 3) weights and (N, 3) indices
+
+        """
+
+        x = (ra % 360.0) / self._d_ra
+
+        y = (np.sin(np.deg2rad(dec)) + 1.0) / self._d_z
+
+        weights = np.zeros((len(x), 3))
+
+        if not self._refine:
+
+            index = (
+                np.minimum(np.floor(y + 0.5).astype(np.int64), self._n_z)
+                * self._n_ra
+                + np.floor(x + 0.5).astype(np.int64) % self._n_ra
+            )
+
+            weights[:, 0] = 1.0
+
+            return weights, np.repeat(index[:, np.newaxis], 3, axis=1)
+
+        i = np.floor(x).astype(np.int64)
+        j = np.minimum(np.floor(y).astype(np.int64), self._n_z - 1)
+
+        fx = x - i
+        fz = np.minimum(y - j, 1.0)
+
+        i0 = (i % self._n_ra) + j * self._n_ra
+        i1 = ((i + 1) % self._n_ra) + j * self._n_ra
+
+        lower = fx >= fz
+
+        weights[:, 0] = np.where(lower, 1.0 - fx, 1.0 - fz)
+        weights[:, 1] = np.abs(fx - fz)
+        weights[:, 2] = np.where(lower, fz, fx)
+
+        indices = np.stack(
+            [
+                i0,
+                np.where(lower, i1, i0 + self._n_ra),
+                i1 + self._n_ra,
+            ],
+            axis=1,
+        )
+
+        return weights, indices
+
+    def interpolate(
+        self,
+        ra: float,
+        dec: float,
+        out: np.ndarray,
+        block: Optional[Tuple[np.ndarray, int, int]] = None,
+    ) -> None:
+        """
+        write the matrix at a position into out
+
+        :param ra: the RA in degree
+        :type ra: float
+        :param dec: the Dec in degree
+        :type dec: float
+        :param out: the buffer to write the matrix to
+        :type out: np.ndarray
+        :param block: only write these (rows, start column, stop column)
+        :type block: Optional[Tuple[np.ndarray, int, int]]
+        :returns:
+
+        """
+
+        weights, indices = self.lookup(ra, dec)
+
+        if block is not None:
+
+            self._storage.interpolate_block(weights, indices, *block, out)
+
+        elif self._refine:
+
+            self._storage.interpolate(weights, indices, out)
+
+        else:
+
+            np.copyto(out, self._storage.get_matrix(indices[0]))
+
+    def interpolate_many(
+        self, ra: np.ndarray, dec: np.ndarray, out: np.ndarray
+    ) -> None:
+
+        weights, indices = self.lookup_many(ra, dec)
+
+        self._storage.interpolate_many(weights, indices, out)
@@ -0,0 +1,177 @@
+from typing import Optional, Tuple
+
+import numpy as np
+
+from .grid_generator import GridGenerator
+
+
+def synthetic_matrices(
+    grid: GridGenerator,
+    ebounds: np.ndarray,
+    monte_carlo_energies: np.ndarray,
+    resolution: float = 0.1,
+    max_area: float = 100.0,
+    n_sigma: float = 5.0,
+    seed: Optional[int] = None,
+) -> np.ndarray:
+    """
+    build a stack of response matrices for the points of a grid
+    that look like those of a scintillator: a Gaussian energy
+    redistribution with a constant relative width (cut after
+    n_sigma so that the matrices are banded) and an effective area
+    that falls with the angle to the boresight at theta = phi = 0
+    and rises and falls with energy
+
+    :param grid: the grid of the database
+    :type grid: GridGenerator
+    :param ebounds: the edges of the channels in keV
+    :type ebounds: np.ndarray
+    :param monte_carlo_energies: the edges of the MC bins in keV
+    :type monte_carlo_energies: np.ndarray
+    :param resolution: the relative energy resolution (sigma / E)
+    :type resolution: float
+    :param max_area: the peak effective area in cm2
+    :type max_area: float
+    :param n_sigma: the redistribution is zero beyond this
+    :type n_sigma: float
+    :param seed: the seed of the small random variations
+    between the grid points
+    :type seed: Optional[int]
+    :returns: the (N grid points, N ebounds, N mc) stack
+
+    """
+
+    rng = np.random.default_rng(seed)
+
+    # the redistribution of the true energies into the channels
+
+    true_energy = np.sqrt(monte_carlo_energies[:-1] * monte_carlo_energies[1:])
+
+    channel_energy = np.sqrt(ebounds[:-1] * ebounds[1:])
+
+    channel_width = np.diff(ebounds)
+
+    sigma = resolution * true_energy
+
+    pull = (channel_energy[:, np.newaxis] - true_energy) / sigma
+
+    redistribution = np.where(
+        np.abs(pull) < n_sigma,
+        np.exp(-0.5 * pull**2) * channel_width[:, np.newaxis],
+        0.0,
+    )
+
+    norm = redistribution.sum(axis=0)
+
+    redistribution /= np.where(norm > 0, norm, 1.0)
+
+    # the effective area rises to ~100 keV and falls after 1 MeV
+
+    log_energy = np.log10(true_energy)
+
+    spectral_area = np.exp(-0.5 * ((log_energy - 2.5) / 0.8) ** 2)
+
+    # the instrument looks along theta = phi = 0
+
+    cos_angle = grid.xyz[:, 0]
+
+    angular_area = 0.05 + 0.95 * np.clip(cos_angle, 0.0, None)
+
+    # the spectrum hardens off axis and each grid point gets
+    # a percent level random variation
+
+    hardening = 1.0 + 0.2 * (1.0 - cos_angle)
+
+    variation = 1.0 + 0.01 * rng.standard_normal(grid.n_grid_points)
+
+    area = (
+        max_area
+        * (angular_area * variation)[:, np.newaxis]
+        * spectral_area[np.newaxis, :] ** hardening[:, np.newaxis]
+    )
+
+    return redistribution[np.newaxis, :, :] * area[:, np.newaxis, :]
+
+
+def synthetic_energies(
+    n_channels: int = 128, n_mc: int = 140
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    the log spaced channel (8 keV to 40 MeV) and MC
+    (5 keV to 50 MeV) edges of a synthetic database
+
+    :param n_channels: the number of channels
+    :type n_channels: int
+    :param n_mc: the number of MC energy bins
+    :type n_mc: int
+    :returns: (ebounds, monte_carlo_energies)
+
+    """
+
+    ebounds = np.geomspace(8.0, 4.0e4, n_channels + 1)
+
+    monte_carlo_energies = np.geomspace(5.0, 5.0e4, n_mc + 1)
+
+    return ebounds, monte_carlo_energies
+
+
+def generate_synthetic_database(
+    refinement_levels: int = 2,
+    n_channels: int = 128,
+    n_mc: int = 140,
+    resolution: float = 0.1,
+    seed: Optional[int] = None,
+    **kwargs,
+):
+    """
+    generate a ResponseDatabase with synthetic matrices on an
+    icosahedral grid. The size of the database is set by the
+    refinement level of the grid and the number of channels and
+    MC energy bins, so it can be used to size and benchmark
+    databases that we do not have simulations for
+
+    :param refinement_levels: the refinement of the GridGenerator
+    :type refinement_levels: int
+    :param n_channels: the number of channels
+    :type n_channels: int
+    :param n_mc: the number of MC energy bins
+    :type n_mc: int
+    :param resolution: the relative energy resolution
+    :type resolution: float
+    :param seed: the seed of the random variations
+    :type seed: Optional[int]
+    :param kwargs: passed to the ResponseDatabase, e.g. the
+    storage_type or cache_triangulation
+    :returns: ResponseDatabase
+
+    """
+
+    from ..response_database import ResponseDatabase
+
+    grid = GridGenerator(refinement_levels=refinement_levels)
+
+    ebounds, monte_carlo_energies = synthetic_energies(n_channels, n_mc)
+
+    matrices = synthetic_matrices(
+        grid,
+        ebounds,
+        monte_carlo_energies,
+        resolution=resolution,
+        seed=seed,
+    )
+
+    metadata = dict(
+        synthetic=True,
+        refinement_levels=refinement_levels,
+        resolution=resolution,
+    )
+
+    return ResponseDatabase(
+        list_of_matrices=matrices,
+        theta=grid.theta,
+        phi=grid.phi,
+        ebounds=ebounds,
+        monte_carlo_energies=monte_carlo_energies,
+        metadata=metadata,
+        **kwargs,
+    )